@@ -0,0 +1,333 @@
+"""
+تحلیل‌های آماری روی کل پورتفوی که به صورت تکه‌ای یا افزایشی به‌روز می‌شوند.
+"""
+
+import numpy as np
+import pandas as pd
+
+from ingest import گسترش_فشرده
+
+
+class StreamingCorrelation:
+    # انباشتگر کوواریانس برای همبستگی جفتی (مانند DataFrame.corr با حذف جفتی NaN).
+    # هر تکه فقط چند ضرب ماتریسی k×k اضافه می‌کند؛ سطرهای حذف‌شده با remove
+    # کم می‌شوند، پس تغییر چند سطر نیاز به محاسبه دوباره کل جدول ندارد.
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        k = len(self.columns)
+        self.shift = None
+        self.count = np.zeros((k, k))   # تعداد سطرهایی که هر دو ستون مقدار دارند
+        self.sum = np.zeros((k, k))     # جمع ستون i روی سطرهای معتبر جفت (i, j)
+        self.sumsq = np.zeros((k, k))   # جمع مربع ستون i روی همان سطرها
+        self.cross = np.zeros((k, k))   # جمع حاصل‌ضرب ستون i و j
+
+    def _parts(self, values):
+        # داده حول یک نقطه ثابت جابه‌جا می‌شود تا تفریق جمع‌های بزرگ دقت را از بین نبرد
+        x = np.asarray(values, dtype=np.float64) - self.shift
+        valid = ~np.isnan(x)
+        x0 = np.where(valid, x, 0.0)
+        m = valid.astype(np.float64)
+        return m.T @ m, x0.T @ m, (x0 * x0).T @ m, x0.T @ x0
+
+    def add(self, values):
+        if self.shift is None:
+            with np.errstate(all="ignore"):
+                shift = np.nanmean(np.asarray(values, dtype=np.float64), axis=0)
+            self.shift = np.nan_to_num(shift) if len(values) else np.zeros(len(self.columns))
+        if len(values):
+            for total, part in zip((self.count, self.sum, self.sumsq, self.cross), self._parts(values)):
+                total += part
+        return self
+
+    def remove(self, values):
+        if len(values):
+            for total, part in zip((self.count, self.sum, self.sumsq, self.cross), self._parts(values)):
+                total -= part
+        return self
+
+    def corr(self):
+        with np.errstate(all="ignore"):
+            n = self.count
+            cov = self.cross - self.sum * self.sum.T / n
+            var_i = self.sumsq - self.sum ** 2 / n
+            var_j = var_i.T
+            result = cov / np.sqrt(var_i * var_j)
+        result[n < 2] = np.nan
+        np.clip(result, -1, 1, out=result)
+        return pd.DataFrame(result, index=self.columns, columns=self.columns)
+
+    def replace(self, old_hashes, old_values, new_hashes, new_values):
+        # جایگزینی جدول قبلی با جدید از روی هش سطرها به صورت چندمجموعه‌ای: از هر هش فقط
+        # اختلاف تعداد تکرارش کم یا اضافه می‌شود، پس تغییر تعداد سطرهای تکراری هم دیده می‌شود
+        self.remove(old_values[self._surplus(old_hashes, new_hashes)])
+        self.add(new_values[self._surplus(new_hashes, old_hashes)])
+        return self
+
+    @staticmethod
+    def _surplus(hashes, other):
+        # اندیس سطرهایی از hashes که تعداد تکرار هششان از همان هش در other بیشتر است
+        # (برای هر هش، اولین سطرش به تعداد اختلاف تکرار می‌شود؛ سطرهای هم‌هش مقدار یکسان دارند)
+        keys, first, counts = np.unique(hashes, return_index=True, return_counts=True)
+        other_keys, other_counts = np.unique(other, return_counts=True)
+        pos = np.searchsorted(other_keys, keys)
+        hit = pos < len(other_keys)
+        hit[hit] = other_keys[pos[hit]] == keys[hit]
+        matched = np.zeros(len(keys), dtype=np.int64)
+        matched[hit] = other_counts[pos[hit]]
+        return np.repeat(first, np.maximum(counts - matched, 0))
+
+
+# شاخص‌هایی که مقدار کمترشان بهتر است؛ صدک آن‌ها معکوس گزارش می‌شود
+LOWER_IS_BETTER = {"Cost/Income", "Debt/Equity", "زمان تصمیم سرمایه‌گذاری"}
+
+
+class PeerPercentiles:
+    # مقادیر هر شاخص در گروه همتا یک بار مرتب می‌شوند (برای کل گروه و برای هر زیربخش)؛
+    # صدک هر مقدار بعد از آن فقط دو جستجوی دودویی است و نیازی به پیمایش دوباره همتاها نیست.
+
+    def __init__(self, peers, columns, group_col=None):
+        self.columns = list(columns)
+        self.group_col = group_col
+        # مقادیر دقیق ورودی، چه ستون فشرده (float32) باشد چه نه، تا مقدارهای برابر برابر بمانند
+        values = گسترش_فشرده(peers[self.columns]).to_numpy(dtype=np.float64)
+        self.sorted = self._sorted_columns(values)
+        self.groups = {}
+        if group_col is not None and group_col in peers.columns:
+            keys = peers[group_col].to_numpy()
+            for group in pd.unique(keys):
+                if not pd.isna(group):
+                    self.groups[group] = self._sorted_columns(values[keys == group])
+
+    @staticmethod
+    def _sorted_columns(values):
+        return [np.sort(col[~np.isnan(col)]) for col in values.T]
+
+    def _lookup(self, sorted_columns, values):
+        # صدک میانه‌رتبه: (تعداد کوچک‌تر + نصف تعداد برابر) / n؛ برای «کمتر بهتر» معکوس می‌شود
+        out = np.full(values.shape, np.nan)
+        for j, (col, ref) in enumerate(zip(self.columns, sorted_columns)):
+            if len(ref) == 0:
+                continue
+            x = values[:, j]
+            below = np.searchsorted(ref, x, side="left")
+            upto = np.searchsorted(ref, x, side="right")
+            pct = (below + upto) / 2 / len(ref) * 100
+            if col in LOWER_IS_BETTER:
+                pct = 100 - pct
+            out[:, j] = np.where(np.isnan(x), np.nan, pct)
+        return out
+
+    def percentiles(self, df, by_group=False):
+        # جدول N×K صدک هر شرکت در هر شاخص؛ با by_group نسبت به همتایان همان زیربخش
+        values = گسترش_فشرده(df[self.columns]).to_numpy(dtype=np.float64)
+        if not by_group or self.group_col not in df.columns:
+            result = self._lookup(self.sorted, values)
+        else:
+            result = np.full(values.shape, np.nan)
+            keys = df[self.group_col].to_numpy()
+            for group, sorted_columns in self.groups.items():
+                hit = keys == group
+                if hit.any():
+                    result[hit] = self._lookup(sorted_columns, values[hit])
+        return pd.DataFrame(result, index=df.index, columns=self.columns)
+
+
+class RollupCube:
+    # تجمیع سلسله‌مراتبی (هلدینگ ← زیرهلدینگ ← شرکت ← صندوق) از روی برگ‌ها.
+    # برای هر گره فقط جمع‌ها نگه داشته می‌شوند (تعداد، جمع وزن، جمع محورها و جمع وزنی
+    # محورها)، پس ویرایش یک برگ با کم و اضافه کردن سهمش در مسیر تا ریشه اعمال می‌شود.
+    # امتیاز کل هر گره و رتبه‌اش میان هم‌والدها هم با وزن‌های محور نگه داشته می‌شوند و
+    # update فقط گره‌های مسیر و گروه‌های هم‌والد آن‌ها را دوباره حساب می‌کند؛ باز کردن یک
+    # گره فقط سطرهای فرزندانش را می‌خواند.
+
+    def __init__(self, names, parents, values, weights=None, axis_weights=None):
+        names = pd.Series(names, dtype=object).astype(str).to_numpy()
+        parents = pd.Series(parents, dtype=object)
+        parents = parents.where(parents.notna() & (parents.astype(str).str.strip() != ""), None).to_numpy()
+        values = np.asarray(values, dtype=np.float64)
+        n = len(names)
+
+        self.nodes = list(pd.unique(np.concatenate([names, [p for p in parents if p is not None]])))
+        self.index = index = {name: i for i, name in enumerate(self.nodes)}
+        self.parent = np.full(len(self.nodes), -1)
+        for name, parent in zip(names, parents):
+            if parent is not None:
+                self.parent[index[name]] = index[str(parent)]
+        self.row_node = np.array([index[name] for name in names], dtype=np.int64)
+
+        # فرزندان هر گره پشت سر هم (CSR) به ترتیب ظهور؛ ریشه‌ها گروه شماره m هستند
+        m = len(self.nodes)
+        self._group = np.where(self.parent >= 0, self.parent, m)
+        self._child_nodes = np.argsort(self._group, kind="stable")
+        self._child_ptr = np.searchsorted(self._group[self._child_nodes], np.arange(m + 2))
+
+        # برگ: سطری که هیچ گره‌ای زیر آن نیست؛ سطرهای میانی در تجمیع شمرده نمی‌شوند
+        has_child = np.zeros(len(self.nodes), dtype=bool)
+        has_child[self.parent[self.parent >= 0]] = True
+        self.leaf = ~has_child[self.row_node]
+
+        # جفت‌های (سطر، جد) به ترتیب سطر، برای پخش سهم هر برگ روی همه اجدادش
+        rows, ancestors = [], []
+        current = self.row_node.copy()
+        alive = np.ones(n, dtype=bool)
+        for _ in range(len(self.nodes) + 1):
+            if not alive.any():
+                break
+            rows.append(np.flatnonzero(alive))
+            ancestors.append(current[alive])
+            current = np.where(alive, self.parent[current], -1)
+            alive = current >= 0
+        else:
+            raise ValueError("ساختار سلسله‌مراتب حلقه دارد")
+        rows, ancestors = np.concatenate(rows), np.concatenate(ancestors)
+        order = np.argsort(rows, kind="stable")
+        self._pair_row, self._pair_node = rows[order], ancestors[order]
+        self._row_ptr = np.searchsorted(self._pair_row, np.arange(n + 1))
+        self.depth = self._depths()
+
+        # مقدار قبلی NaN یعنی سطر هنوز سهمی در جمع‌ها ندارد
+        self.values = np.full_like(values, np.nan)
+        self.weights = np.zeros(n)
+        k = values.shape[1]
+        m = len(self.nodes)
+        self.count = np.zeros(m)
+        self.weight_sum = np.zeros(m)
+        self.sums = np.zeros((m, k))
+        self.weighted_sums = np.zeros((m, k))
+        self.axis_weights = None
+        self.score = np.full(m, np.nan)
+        self.weighted_score = np.full(m, np.nan)
+        self.rank_in_parent = np.full(m, np.nan)
+        self.update(np.arange(n), values, np.ones(n) if weights is None else weights)
+        if axis_weights is not None:
+            self.set_axis_weights(axis_weights)
+
+    def _depths(self):
+        depth = np.zeros(len(self.nodes), dtype=np.int64)
+        current = self.parent.copy()
+        while (current >= 0).any():
+            depth[current >= 0] += 1
+            current = np.where(current >= 0, self.parent[current], -1)
+        return depth
+
+    @staticmethod
+    def _ranges(starts, stops):
+        # اندیس‌های به هم چسبیده بازه‌های [start, stop)
+        lengths = stops - starts
+        flat = np.repeat(starts - np.concatenate([[0], np.cumsum(lengths)[:-1]]), lengths) + np.arange(lengths.sum())
+        return flat, lengths
+
+    def _pairs(self, rows):
+        flat, lengths = self._ranges(self._row_ptr[rows], self._row_ptr[rows + 1])
+        return np.repeat(np.arange(len(rows)), lengths), self._pair_node[flat]
+
+    def _accumulate(self, rows, values, weights, sign):
+        keep = self.leaf[rows]
+        rows, values, weights = rows[keep], values[keep], weights[keep]
+        valid = ~np.isnan(values).any(axis=1)
+        rows, values, weights = rows[valid], values[valid], weights[valid]
+        local, nodes = self._pairs(rows)
+        self._add(self.count, nodes, np.ones(len(nodes)), sign)
+        self._add(self.weight_sum, nodes, weights[local], sign)
+        for j in range(values.shape[1]):
+            self._add(self.sums[:, j], nodes, values[local, j], sign)
+            self._add(self.weighted_sums[:, j], nodes, values[local, j] * weights[local], sign)
+
+    @staticmethod
+    def _add(target, nodes, amounts, sign):
+        # چند سطر ویرایش‌شده فقط خانه‌های مسیرشان را لمس می‌کنند؛ دسته‌های بزرگ با bincount
+        if len(nodes) * 8 < len(target):
+            np.add.at(target, nodes, sign * amounts)
+        else:
+            target += sign * np.bincount(nodes, weights=amounts, minlength=len(target))
+
+    def update(self, rows, values, weights):
+        # rows: اندیس سطرهای تغییرکرده؛ values/weights: مقدار تازه همان سطرها
+        rows = np.asarray(rows, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+        # وزن خالی (مثلاً AUM نامعلوم) فقط از میانگین وزنی کنار می‌رود
+        weights = np.nan_to_num(np.asarray(weights, dtype=np.float64), nan=0.0)
+        self._accumulate(rows, self.values[rows], self.weights[rows], -1)
+        self._accumulate(rows, values, weights, +1)
+        self.values[rows] = values
+        self.weights[rows] = weights
+        if self.axis_weights is not None:
+            touched = np.unique(self._pairs(rows)[1])
+            self._score(touched)
+            self._rank(np.unique(self._group[touched]))
+        return self
+
+    def set_axis_weights(self, axis_weights):
+        # وزن‌های محور (درصد) برای امتیاز کل؛ با وزن تازه امتیاز و رتبه همه گره‌ها از نو حساب می‌شود
+        w = np.asarray(axis_weights, dtype=np.float64) / 100
+        if self.axis_weights is not None and np.array_equal(w, self.axis_weights):
+            return self
+        self.axis_weights = w
+        self._score(np.arange(len(self.nodes)))
+        self._rank(np.arange(len(self.nodes) + 1))
+        return self
+
+    def _means(self, nodes):
+        # گره بدون برگ معتبر (یا بدون وزن) میانگین ندارد؛ باقی‌مانده گرد کردن جمع‌ها پس از
+        # کم کردن آخرین سهم نباید به ±inf تبدیل شود
+        count, weight_sum = self.count[nodes, None], self.weight_sum[nodes, None]
+        with np.errstate(all="ignore"):
+            return (
+                np.where(count > 0, self.sums[nodes] / count, np.nan),
+                np.where(weight_sum > 0, self.weighted_sums[nodes] / weight_sum, np.nan),
+            )
+
+    def _score(self, nodes):
+        means, weighted = self._means(nodes)
+        self.score[nodes] = means @ self.axis_weights
+        self.weighted_score[nodes] = weighted @ self.axis_weights
+
+    def _rank(self, groups):
+        # رتبه min نزولی امتیاز کل وزنی میان فرزندان هر گروه؛ امتیاز نامعتبر رتبه ندارد
+        flat, lengths = self._ranges(self._child_ptr[groups], self._child_ptr[groups + 1])
+        members = self._child_nodes[flat]
+        self.rank_in_parent[members] = np.nan
+        group = np.repeat(groups, lengths)
+        score = self.weighted_score[members]
+        valid = ~np.isnan(score)
+        members, group, score = members[valid], group[valid], score[valid]
+        order = np.lexsort((-score, group))
+        members, group, score = members[order], group[order], score[order]
+        pos = np.arange(len(members))
+        new_group = np.r_[True, group[1:] != group[:-1]]
+        new_value = new_group | np.r_[True, score[1:] != score[:-1]]
+        group_start = np.maximum.accumulate(np.where(new_group, pos, 0))
+        run_start = np.maximum.accumulate(np.where(new_value, pos, 0))
+        self.rank_in_parent[members] = run_start - group_start + 1
+
+    def _children(self, node):
+        target = len(self.nodes) if node is None else self.index[node]
+        return self._child_nodes[self._child_ptr[target]:self._child_ptr[target + 1]]
+
+    def children(self, node=None):
+        # فرزندان یک گره (یا ریشه‌ها برای None) به ترتیب ظهور در داده
+        return [self.nodes[i] for i in self._children(node)]
+
+    def table(self, columns, nodes=None):
+        # جدول تجمیع گره‌های nodes (نام‌ها؛ None یعنی همه) از جمع‌ها و امتیازهای نگه‌داشته‌شده
+        if nodes is None:
+            return self._table(columns, np.arange(len(self.nodes)))
+        return self._table(columns, np.array([self.index[n] for n in nodes], dtype=np.int64))
+
+    def children_table(self, columns, node=None):
+        # باز کردن یک گره: فقط سطرهای فرزندانش ساخته می‌شود
+        return self._table(columns, self._children(node))
+
+    def _table(self, columns, idx):
+        means, _ = self._means(idx)
+        result = pd.DataFrame(means, columns=columns)
+        result.insert(0, "گره", [self.nodes[i] for i in idx])
+        result.insert(1, "والد", [self.nodes[p] if p >= 0 else None for p in self.parent[idx]])
+        result.insert(2, "سطح", self.depth[idx])
+        result.insert(3, "تعداد زیرمجموعه", self.count[idx].astype(np.int64))
+        result.insert(4, "جمع وزن", self.weight_sum[idx])
+        result["امتیاز کل"] = self.score[idx]
+        result["امتیاز کل وزنی"] = self.weighted_score[idx]
+        result["رتبه در والد"] = pd.array(self.rank_in_parent[idx], dtype="Float64").astype("Int64")
+        return result
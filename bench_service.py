@@ -0,0 +1,180 @@
+"""
+بار‌سنج محلی سرویس امتیازدهی (service.py): توان عملیاتی و صدک‌های تأخیر.
+
+سرویس در یک پردازه جدا بالا می‌آید (یا با --url یک سرویس در حال اجرا
+استفاده می‌شود) و چند مشتری هم‌زمان asyncio، هر کدام روی یک اتصال
+keep-alive، درخواست‌های دسته‌ای می‌فرستند. سناریوها:
+
+    nocache   شرکت‌ها در هر درخواست، سرویس با کش محورهای خاموش (--cache-mb 0)
+    upload    شرکت‌ها در هر درخواست، همان داده؛ محورها از کش اثر انگشت
+    dataset   فقط شناسه dataset و وزن‌ها؛ بدون ارسال و تجزیه دوباره شرکت‌ها
+
+    python bench_service.py
+    python bench_service.py --companies 5000 --weights 64 --concurrency 16 --requests 400
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from bench_suite import هلدینگ_مصنوعی
+from scenarios import نمونه_سیمپلکس
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+LOAD_SCENARIOS = ["nocache", "upload", "dataset"]
+LOAD_COMPANIES = 1_000
+LOAD_WEIGHTS = 16
+LOAD_CONCURRENCY = 8
+LOAD_REQUESTS = 200
+LOAD_WARMUP = 5
+
+
+def بدنه_درخواست(companies, weights, dataset=None):
+    request = {"weights": weights}
+    if dataset is None:
+        request["companies"] = companies
+    else:
+        request["dataset"] = dataset
+    return json.dumps(request, ensure_ascii=False).encode("utf-8")
+
+
+async def _ارسال(reader, writer, host, body):
+    writer.write(
+        f"POST /score HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body
+    )
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    payload = await reader.readexactly(length)
+    if status != 200:
+        raise RuntimeError(f"HTTP {status}: {payload[:200].decode('utf-8', 'replace')}")
+    return payload
+
+
+async def _یک_درخواست(host, port, body):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        return await _ارسال(reader, writer, host, body)
+    finally:
+        writer.close()
+
+
+async def بار(host, port, body, requests, concurrency, warmup=LOAD_WARMUP):
+    # هر مشتری یک اتصال keep-alive دارد و درخواست بعدی را پس از پاسخ قبلی می‌فرستد
+    latencies = []
+    remaining = iter(range(requests))
+
+    async def client():
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            for _ in range(warmup):
+                await _ارسال(reader, writer, host, body)
+            for _ in remaining:
+                start = time.perf_counter()
+                await _ارسال(reader, writer, host, body)
+                latencies.append(time.perf_counter() - start)
+        finally:
+            writer.close()
+
+    clients = [client() for _ in range(concurrency)]
+    start = time.perf_counter()
+    await asyncio.gather(*clients)
+    return latencies, time.perf_counter() - start
+
+
+def _سرویس(cache_mb, workers):
+    args = [sys.executable, os.path.join(ROOT, "service.py"), "--port", "0", "--cache-mb", str(cache_mb)]
+    if workers:
+        args += ["--workers", str(workers)]
+    proc = subprocess.Popen(args, cwd=ROOT, stdout=subprocess.PIPE, text=True)
+    line = proc.stdout.readline()
+    if not line.startswith("listening on http://"):
+        proc.kill()
+        raise RuntimeError("service did not start")
+    host, port = line.strip().removeprefix("listening on http://").rsplit(":", 1)
+    return proc, host, int(port)
+
+
+def اجرای_سناریو(name, host, port, companies, weights, requests, concurrency):
+    body = بدنه_درخواست(companies, weights)
+    if name == "dataset":
+        first = asyncio.run(_یک_درخواست(host, port, body))
+        body = بدنه_درخواست(None, weights, json.loads(first)["dataset"])
+    latencies, elapsed = asyncio.run(بار(host, port, body, requests, concurrency))
+    lat = np.array(latencies) * 1e3
+    p50, p90, p99 = np.percentile(lat, [50, 90, 99])
+    return {
+        "scenario": name,
+        "requests": len(lat),
+        "request_bytes": len(body),
+        "throughput_rps": len(lat) / elapsed,
+        "scores_per_s": len(lat) * len(companies["شرکت"]) * len(weights) / elapsed,
+        "p50_ms": p50, "p90_ms": p90, "p99_ms": p99, "max_ms": lat.max(), "mean_ms": statistics.fmean(lat),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load benchmark for the local scoring service")
+    parser.add_argument("--scenarios", nargs="+", choices=LOAD_SCENARIOS, default=LOAD_SCENARIOS)
+    parser.add_argument("--companies", type=int, default=LOAD_COMPANIES, help="Companies per request")
+    parser.add_argument("--weights", type=int, default=LOAD_WEIGHTS, help="Weight vectors per request")
+    parser.add_argument("--concurrency", type=int, default=LOAD_CONCURRENCY)
+    parser.add_argument("--requests", type=int, default=LOAD_REQUESTS, help="Timed requests per scenario")
+    parser.add_argument("--workers", type=int, help="Service scoring threads (service default if omitted)")
+    parser.add_argument("--url", help="Use a running service (host:port) instead of starting one")
+    parser.add_argument("--output", help="Write the results as JSON")
+    args = parser.parse_args(argv)
+
+    # داده ستونی (نگاشت ستون -> مقادیر) کوچک‌ترین بدنه JSON را می‌دهد
+    companies = هلدینگ_مصنوعی(args.companies).to_dict("list")
+    weights = نمونه_سیمپلکس(args.weights, seed=0).round(2).tolist()
+
+    results = []
+    for name in args.scenarios:
+        if args.url:
+            proc = None
+            host, port = args.url.removeprefix("http://").rsplit(":", 1)
+            port = int(port)
+        else:
+            proc, host, port = _سرویس(0 if name == "nocache" else 256, args.workers)
+        try:
+            result = اجرای_سناریو(name, host, port, companies, weights, args.requests, args.concurrency)
+        finally:
+            if proc is not None:
+                proc.terminate()
+                proc.wait()
+        results.append(result)
+        print(
+            f"{name:<8} {result['throughput_rps']:8.1f} req/s {result['scores_per_s']:12,.0f} scores/s  "
+            f"p50 {result['p50_ms']:7.1f}  p90 {result['p90_ms']:7.1f}  p99 {result['p99_ms']:7.1f} ms  "
+            f"(body {result['request_bytes'] / 1024:,.0f} KiB)"
+        )
+
+    if args.output:
+        meta = {
+            "platform": platform.platform(), "cpu_count": os.cpu_count(), "companies": args.companies,
+            "weights": args.weights, "concurrency": args.concurrency, "workers": args.workers,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"meta": meta, "results": results}, f, ensure_ascii=False, indent=1)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
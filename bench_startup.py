@@ -0,0 +1,122 @@
+"""
+سنجش شروع سرد و اولین نقاشی داشبورد.
+
+هر تکرار در یک پردازه تازه پایتون اجرا می‌شود تا هیچ ماژولی از قبل بارگذاری
+نشده باشد. برای هر تکرار زمان کل پردازه (شروع سرد)، زمان اولین اجرای کامل
+اسکریپت با streamlit.testing (اولین نقاشی)، زمان اجرای دوباره و هزینه باز
+کردن هر بخش تنبل (expanderهای key="section_...") اندازه گرفته می‌شود.
+
+    python bench_startup.py
+    python bench_startup.py --rev HEAD~1 --repeat 5    # مقایسه با نسخه دیگری از dash.py
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SCRIPT = os.path.join(ROOT, "dash.py")
+APP_TIMEOUT = 600
+
+
+def بخش_های_تنبل(script):
+    with open(script, encoding="utf-8") as f:
+        return re.findall(r'key="(section_\w+)", on_change="rerun"', f.read())
+
+
+def _اجرای_فرزند(script, sections, launched):
+    # داخل پردازه تازه: فقط streamlit.testing قبل از شروع زمان‌سنج اولین نقاشی بارگذاری می‌شود؛
+    # شروع سرد از لحظه ساخت پردازه در والد تا پایان اولین اجرا شمرده می‌شود
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(script, default_timeout=APP_TIMEOUT)
+    start = time.perf_counter()
+    at.run()
+    result = {
+        "cold_start": time.time() - launched,
+        "first_paint": time.perf_counter() - start,
+        "images": len(at.get("image")),
+        "matplotlib": "matplotlib" in sys.modules,
+        "exception": bool(at.exception),
+    }
+    start = time.perf_counter()
+    at.run()
+    result["rerun"] = time.perf_counter() - start
+
+    opened = {}
+    for key in sections:
+        at.session_state[key] = True
+        start = time.perf_counter()
+        at.run()
+        opened[key] = time.perf_counter() - start
+        at.session_state[key] = False
+    result["sections"] = opened
+    return result
+
+
+def اندازه_گیری(script, repeat=3):
+    sections = بخش_های_تنبل(script)
+    runs = []
+    for _ in range(repeat):
+        proc = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--launched", repr(time.time()),
+             "--child", script, *sections],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+        )
+        runs.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+    return runs
+
+
+def _نسخه_از_git(rev):
+    # اسکریپت باید کنار ماژول‌های برنامه باشد تا importهایش پیدا شوند
+    source = subprocess.run(
+        ["git", "show", f"{rev}:dash.py"], cwd=ROOT, capture_output=True, check=True
+    ).stdout
+    path = os.path.join(ROOT, "_bench_" + re.sub(r"\W", "_", rev) + "_dash.py")
+    with open(path, "wb") as f:
+        f.write(source)
+    return path
+
+
+def گزارش(label, runs):
+    median = lambda key: statistics.median(run[key] for run in runs)
+    last = runs[-1]
+    print(f"== {label} ({len(runs)} تکرار، میانه)")
+    print(f"  شروع سرد (پردازه تازه تا پایان اولین اجرا): {median('cold_start'):7.3f} s")
+    print(f"  اولین نقاشی (اولین اجرای اسکریپت):          {median('first_paint'):7.3f} s")
+    print(f"  اجرای دوباره:                               {median('rerun'):7.3f} s")
+    print(f"  تصاویر در اولین نقاشی: {last['images']}   matplotlib بارگذاری شد: {last['matplotlib']}"
+          + ("   خطا در اجرا!" if any(run["exception"] for run in runs) else ""))
+    for key in last["sections"]:
+        print(f"  باز کردن {key:<24} {statistics.median(run['sections'][key] for run in runs):7.3f} s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cold-start and first-paint benchmark for dash.py")
+    parser.add_argument("--script", default=DEFAULT_SCRIPT, help="Streamlit script to measure")
+    parser.add_argument("--rev", help="Also measure dash.py from this git revision for comparison")
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh processes per script")
+    parser.add_argument("--child", nargs="+", help=argparse.SUPPRESS)
+    parser.add_argument("--launched", type=float, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(_اجرای_فرزند(args.child[0], args.child[1:], args.launched)))
+        return
+
+    if args.rev:
+        path = _نسخه_از_git(args.rev)
+        try:
+            گزارش(args.rev, اندازه_گیری(path, args.repeat))
+        finally:
+            os.remove(path)
+    گزارش(os.path.relpath(args.script, ROOT), اندازه_گیری(args.script, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""
+بنچمارک مرحله‌به‌مرحله داشبورد روی هلدینگ‌های مصنوعی با 10² تا 10⁶ شرکت.
+
+داده مصنوعی همان ستون‌های default_data را دارد (شرکت و همه KPIهای
+ingest.KPI_SCHEMA) و با seed ثابت ساخته می‌شود. هر مرحله جدا زمان‌سنجی
+می‌شود: محورها، امتیاز کل و رتبه، همبستگی، رسم هر نمودار تا PNG و
+خروجی CSV/JSON. نتیجه در یک فایل JSON نوشته می‌شود و می‌تواند با یک خط
+پایه ذخیره‌شده مقایسه شود؛ اگر مرحله‌ای از آستانه‌اش کندتر شده باشد
+کد خروج 1 است. خط پایه فقط روی همان ماشین معنا دارد.
+
+    python bench_suite.py --sizes 100 10000 --repeat 5
+    python bench_suite.py --save-baseline bench_baseline.json
+    python bench_suite.py --baseline bench_baseline.json
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from analytics import StreamingCorrelation
+from charts import (
+    CHART_ROW_LIMIT,
+    CHART_TOP_N,
+    رندر_png,
+    برش_برترین,
+    سری_رادار,
+    رسم_امتیاز_کل,
+    رسم_توزیع_امتیاز_کل,
+    رسم_شاخص_مالی,
+    رسم_رادار,
+    رسم_مقایسه_محورها,
+    رسم_هزینه_درآمد,
+    رسم_توزیع_هزینه_درآمد,
+    رسم_درآمد_کارمند,
+    رسم_اهرم,
+    رسم_توزیع_اهرم,
+    رسم_حاکمیت,
+    رسم_ماتریس_عملکرد,
+    رسم_چگالی_ماتریس_عملکرد,
+    رسم_همبستگی,
+    کتابخانه_نمودار,
+)
+from export import بایت_های_خروجی
+from ingest import DEFAULT_CHUNKSIZE, ID_COL, KPI_SCHEMA, فشرده_سازی, مقادیر_float64
+from scoring import DEFAULT_WEIGHTS, axis_cols, جدول_امتیاز, ماتریس_محورها
+
+BENCH_SIZES = [10**2, 10**3, 10**4, 10**5, 10**6]
+BENCH_REPEAT = 3
+BENCH_SEED = 0
+BENCH_EXPORT_FORMATS = ["csv", "json"]
+DEFAULT_OUTPUT = "bench_results.json"
+
+# نسبت مجاز زمان فعلی به خط پایه پیش از اعلام پسرفت؛ کلید پیشوند نام مرحله است
+REGRESSION_THRESHOLDS = {"figure:": 1.5, "export:": 1.35}
+DEFAULT_THRESHOLD = 1.25
+# مراحلی که در هر دو اجرا کوتاه‌تر از این باشند (ثانیه) نویز حساب می‌شوند
+NOISE_FLOOR_S = 0.005
+
+# میانگین و انحراف معیار هر KPI در داده مصنوعی، در همان محدوده شرکت‌های default_data
+SYNTHETIC_KPIS = {
+    "ROE": (18, 4),
+    "ROI": (16, 4),
+    "EVA": (13, 3),
+    "رشد سود خالص": (11, 3),
+    "نسبت سود به درآمد": (26, 4),
+    "Cost/Income": (43, 6),
+    "درآمد به ازای کارمند": (230, 50),
+    "AUM/تحلیلگر": (33, 6),
+    "زمان تصمیم سرمایه‌گذاری": (4.5, 1.5),
+    "رشد AUM": (13, 4),
+    "نوآوری مالی": (4, 1.5),
+    "درآمد پایدار": (68, 7),
+    "رضایت مشتری (NPS)": (87, 6),
+    "Compliance": (88, 4),
+    "Debt/Equity": (0.55, 0.15),
+    "کنترل داخلی": (84, 5),
+    "شفافیت گزارش": (89, 4),
+    "هم‌افزایی": (62, 7),
+    "پروژه‌های مشترک": (3, 1),
+    "سهم بازار": (6, 2),
+}
+
+# همان ستون‌های پیش‌فرض بخش همبستگی داشبورد
+CORRELATION_METRICS = [
+    "ROE", "ROI", "EVA", "Cost/Income", "درآمد به ازای کارمند",
+    "رضایت مشتری (NPS)", "Compliance", "Debt/Equity",
+]
+
+
+def هلدینگ_مصنوعی(n, seed=BENCH_SEED):
+    rng = np.random.default_rng(seed)
+    data = {ID_COL: [f"شرکت {i}" for i in range(n)]}
+    for col in KPI_SCHEMA:
+        mean, sd = SYNTHETIC_KPIS[col]
+        _, lo, hi = KPI_SCHEMA[col]
+        values = rng.normal(mean, sd, n)
+        data[col] = np.clip(values, lo, hi).round(2)
+    return pd.DataFrame(data)
+
+
+def _همبستگی(df):
+    # مسیر ساخت کامل انباشتگر در داشبورد: تکه‌های ثابت و سپس corr
+    values = np.column_stack([مقادیر_float64(df[col]) for col in CORRELATION_METRICS])
+    acc = StreamingCorrelation(CORRELATION_METRICS)
+    for start in range(0, len(values), DEFAULT_CHUNKSIZE):
+        acc.add(values[start:start + DEFAULT_CHUNKSIZE])
+    return acc.corr()
+
+
+def مراحل_نمودار(scored, corr):
+    # نام -> تابع بدون آرگومان؛ برش داده و حالت خلاصه مانند بخش‌های 5 تا 13 داشبورد
+    large = len(scored) > CHART_ROW_LIMIT
+    score = scored["امتیاز کل"].to_numpy()
+
+    def top(data):
+        return برش_برترین(data, score, CHART_TOP_N) if large else data
+
+    figures = {
+        "fig1": (lambda: رسم_توزیع_امتیاز_کل(scored[["امتیاز کل"]])) if large
+        else (lambda: رسم_امتیاز_کل(scored[["شرکت", "امتیاز کل"]])),
+        "fig2": lambda: رسم_شاخص_مالی(top(scored[["شرکت", "ROE", "ROI", "EVA"]])),
+        "fig3": lambda: رسم_رادار(سری_رادار(scored[["شرکت"] + axis_cols], score)),
+        "fig4": lambda: رسم_مقایسه_محورها(top(scored[["شرکت"] + axis_cols])),
+        "fig5": (lambda: رسم_توزیع_هزینه_درآمد(scored[["Cost/Income"]])) if large
+        else (lambda: رسم_هزینه_درآمد(scored[["شرکت", "Cost/Income"]])),
+        "fig6": lambda: رسم_درآمد_کارمند(top(scored[["شرکت", "درآمد به ازای کارمند"]])),
+        "fig7": (lambda: رسم_توزیع_اهرم(scored[["Debt/Equity"]])) if large
+        else (lambda: رسم_اهرم(scored[["شرکت", "Debt/Equity"]])),
+        "fig8": lambda: رسم_حاکمیت(top(scored[["شرکت", "Compliance", "کنترل داخلی"]])),
+        "fig9": (lambda: رسم_چگالی_ماتریس_عملکرد(scored[["امتیاز بهره‌وری", "امتیاز مالی"]])) if large
+        else (lambda: رسم_ماتریس_عملکرد(scored[["شرکت", "امتیاز بهره‌وری", "امتیاز مالی", "سهم بازار"]])),
+        "fig10": lambda: رسم_همبستگی(corr),
+    }
+    return {f"figure:{name}": (lambda draw=draw: رندر_png(draw())) for name, draw in figures.items()}
+
+
+def _زمان(fn, repeat):
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        runs.append(time.perf_counter() - start)
+    return result, runs
+
+
+def اجرای_بنچمارک(sizes=BENCH_SIZES, repeat=BENCH_REPEAT, formats=BENCH_EXPORT_FORMATS, log=print):
+    # matplotlib پیش از زمان‌سنجی بارگذاری می‌شود؛ هزینه import در bench_startup.py سنجیده می‌شود
+    رندر_png(کتابخانه_نمودار().figure())
+    results = []
+
+    def record(stage, n, runs):
+        results.append({
+            "stage": stage, "rows": n, "median_s": statistics.median(runs), "min_s": min(runs), "runs": runs,
+        })
+        log(f"{n:>9,} {stage:<18} {statistics.median(runs) * 1e3:10.1f} ms")
+
+    for n in sizes:
+        # همان نوع‌های فشرده‌ای که ingest.بارگذاری به داشبورد می‌دهد
+        df = فشرده_سازی(هلدینگ_مصنوعی(n))
+        axes, runs = _زمان(lambda: ماتریس_محورها(df), repeat)
+        record("axes", n, runs)
+        scored, runs = _زمان(lambda: جدول_امتیاز(df, axes, *DEFAULT_WEIGHTS), repeat)
+        record("total_rank", n, runs)
+        corr, runs = _زمان(lambda: _همبستگی(df), repeat)
+        record("correlation", n, runs)
+        for stage, render in مراحل_نمودار(scored, corr).items():
+            record(stage, n, _زمان(render, repeat)[1])
+        for fmt in formats:
+            record(f"export:{fmt}", n, _زمان(lambda: بایت_های_خروجی(scored, fmt), repeat)[1])
+
+    return {
+        "meta": {
+            "created": datetime.datetime.now().isoformat(timespec="seconds"),
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "cpu_count": os.cpu_count(),
+            "repeat": repeat,
+            "seed": BENCH_SEED,
+        },
+        "results": results,
+    }
+
+
+def آستانه(stage, default=None):
+    if default is not None:
+        return default
+    for prefix, limit in REGRESSION_THRESHOLDS.items():
+        if stage.startswith(prefix):
+            return limit
+    return DEFAULT_THRESHOLD
+
+
+def مقایسه_با_پایه(current, baseline, threshold=None):
+    # جدول مرحله × اندازه‌هایی که در هر دو اجرا هستند، با نسبت میانه فعلی به خط پایه
+    base = {(r["stage"], r["rows"]): r["median_s"] for r in baseline["results"]}
+    rows = []
+    for r in current["results"]:
+        key = (r["stage"], r["rows"])
+        if key not in base:
+            continue
+        ratio = r["median_s"] / base[key] if base[key] > 0 else float("inf")
+        limit = آستانه(r["stage"], threshold)
+        noise = max(r["median_s"], base[key]) < NOISE_FLOOR_S
+        rows.append({
+            "stage": r["stage"], "rows": r["rows"], "baseline_s": base[key], "current_s": r["median_s"],
+            "ratio": ratio, "threshold": limit, "regression": ratio > limit and not noise,
+        })
+    return pd.DataFrame(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stage benchmark of the dashboard on synthetic holdings")
+    parser.add_argument("--sizes", nargs="+", type=int, default=BENCH_SIZES)
+    parser.add_argument("--repeat", type=int, default=BENCH_REPEAT)
+    parser.add_argument("--formats", nargs="+", default=BENCH_EXPORT_FORMATS, help="Export formats to time")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Where to write the JSON results")
+    parser.add_argument("--baseline", help="Compare against this results file; exit 1 on regression")
+    parser.add_argument("--save-baseline", help="Also write the results to this baseline file")
+    parser.add_argument("--threshold", type=float, help="Override every per-stage regression threshold")
+    args = parser.parse_args(argv)
+
+    current = اجرای_بنچمارک(args.sizes, args.repeat, args.formats)
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(current, f, ensure_ascii=False, indent=1)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline["meta"].get("platform") != current["meta"]["platform"]:
+            print(f"warning: baseline was recorded on {baseline['meta'].get('platform')}", file=sys.stderr)
+        report = مقایسه_با_پایه(current, baseline, args.threshold)
+        if report.empty:
+            print("no stage/size in common with the baseline")
+            return 0
+        with pd.option_context("display.max_rows", None, "display.width", 200):
+            print(report.round({"baseline_s": 4, "current_s": 4, "ratio": 2}).to_string(index=False))
+        regressions = report[report["regression"]]
+        print(f"{len(regressions)} regression(s) out of {len(report)} comparisons")
+        return 1 if len(regressions) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
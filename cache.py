@@ -0,0 +1,128 @@
+"""
+کش‌های محدود به حافظه و کلیدهای محتوایی جدول‌ها.
+
+BoundedLRU برای چند نخ امن است تا یک نمونه بین همه نشست‌های یک پردازه
+مشترک باشد. get_or_compute هر کلید را فقط یک بار محاسبه می‌کند: نشست‌هایی
+که هم‌زمان به همان کلید می‌رسند منتظر همان محاسبه می‌مانند و نتیجه‌اش را
+می‌گیرند. مقدارهای کش‌شده بین نشست‌ها مشترک‌اند و نباید در جا تغییر کنند.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+
+class _Flight:
+    # محاسبه در جریان یک کلید؛ منتظرها پس از done نتیجه را از همین شیء می‌خوانند
+    __slots__ = ("done", "value", "ok")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.ok = False
+
+
+class BoundedLRU:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()  # key -> (value, nbytes)
+        self._flights = {}  # key -> _Flight
+        self._lock = threading.Lock()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._items
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, key):
+        with self._lock:
+            return self._get(key)
+
+    def _get(self, key):
+        item = self._items.get(key)
+        if item is None:
+            return None
+        self._items.move_to_end(key)
+        return item[0]
+
+    def put(self, key, value, nbytes):
+        with self._lock:
+            if key in self._items:
+                self.nbytes -= self._items.pop(key)[1]
+            # مقداری که به تنهایی از سقف بزرگ‌تر است کش نمی‌شود
+            if nbytes > self.max_bytes:
+                return
+            self._items[key] = (value, nbytes)
+            self.nbytes += nbytes
+            while self.nbytes > self.max_bytes:
+                _, (_, evicted) = self._items.popitem(last=False)
+                self.nbytes -= evicted
+
+    def get_or_compute(self, key, compute, sizeof):
+        # sizeof(value) اندازه مقدار را به بایت برای سقف حافظه برمی‌گرداند
+        with self._lock:
+            value = self._get(key)
+            if value is not None:
+                self.hits += 1
+                return value
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.ok:
+                return flight.value
+            # محاسبه نشست دیگر خطا داد یا با rerun قطع شد؛ این نشست خودش محاسبه می‌کند
+            return self.get_or_compute(key, compute, sizeof)
+
+        try:
+            value = compute()
+            flight.value, flight.ok = value, True
+            self.put(key, value, sizeof(value))
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return value
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._items),
+                "nbytes": self.nbytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+def امضای_ستونها(df):
+    return repr(list(zip(df.columns, df.dtypes.astype(str))))
+
+
+def هش_سطرها(df):
+    # یک هش 64 بیتی برای محتوای هر سطر (بدون ایندکس)
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+
+def اثر_انگشت_داده(df, row_hashes=None):
+    # هش محتوای جدول: مقادیر (برداری)، ایندکس، نام و نوع ستون‌ها
+    if row_hashes is None:
+        row_hashes = هش_سطرها(df)
+    h = hashlib.blake2b(digest_size=16)
+    h.update(امضای_ستونها(df).encode("utf-8"))
+    h.update(row_hashes.tobytes())
+    h.update(pd.util.hash_pandas_object(df.index).to_numpy().tobytes())
+    return h.hexdigest()
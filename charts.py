@@ -0,0 +1,466 @@
+"""
+رسم نمودارهای داشبورد با matplotlib.
+
+هر تابع رسم یک برش کوچک از داده (فقط ستون‌هایی که نمودار می‌خواند) را
+می‌گیرد و یک Figure برمی‌گرداند؛ کش تصاویر و نمایش در dash.py است.
+matplotlib فقط هنگام اولین رسم بارگذاری می‌شود.
+"""
+
+import io
+
+import numpy as np
+import pandas as pd
+
+from scoring import QUADRANTS, axis_cols, برترین_ها, ربع_عملکرد
+
+# بالاتر از این تعداد شرکت، نمودارها به حالت خلاصه (برترین‌ها/توزیع) می‌روند
+CHART_ROW_LIMIT = 30
+CHART_TOP_N = 12
+# نمودار رادار: حداکثر سری تک‌شرکتی و تعداد باندهای صدکی برای پورتفوی بزرگ
+RADAR_MAX_SERIES = 10
+RADAR_BANDS = 5
+# ماتریس عملکرد: تعداد برچسب نام شرکت در هر ربع
+MATRIX_LABELS_PER_QUADRANT = 3
+QUADRANT_COLORS = ['tab:gray', 'tab:red', 'goldenrod', 'tab:green']
+# حداکثر اندازه ماتریس همبستگی که مقدار خانه‌هایش روی نمودار نوشته می‌شود
+CORR_ANNOTATE_MAX = 10
+
+
+def کتابخانه_نمودار():
+    # matplotlib فقط هنگام اولین رسم واقعی بارگذاری می‌شود؛ صفحه اول و تصاویر کش‌شده به آن نیازی ندارند
+    import matplotlib.pyplot as plt
+
+    # تنظیمات فونت فارسی برای matplotlib
+    plt.rcParams['font.family'] = 'DejaVu Sans'
+    plt.rcParams['axes.unicode_minus'] = False
+    return plt
+
+
+def رندر_png(fig, dpi=200):
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", dpi=dpi, bbox_inches="tight")
+    کتابخانه_نمودار().close(fig)
+    return buf.getvalue()
+
+
+def برش_برترین(data, score, n):
+    # n شرکت برتر بر اساس score و یک ردیف «سایر» با میانگین بقیه شرکت‌ها
+    top = برترین_ها(score, n)
+    rest = np.ones(len(data), dtype=bool)
+    rest[top] = False
+    head = data.iloc[top]
+    if not rest.any():
+        return head.reset_index(drop=True)
+    others = data.iloc[np.flatnonzero(rest)].mean(numeric_only=True)
+    others["شرکت"] = f"Others ({rest.sum()})"
+    return pd.concat([head, pd.DataFrame([others])], ignore_index=True)
+
+
+def رسم_هیستوگرام(values, xlabel, title, bands=(), above='#1f77b4', bins=40):
+    # bands: [(حد بالا، رنگ), ...] برای رنگ‌آمیزی ستون‌ها مانند نمودار میله‌ای اصلی
+    plt = کتابخانه_نمودار()
+    values = values[~np.isnan(values)]
+    counts, edges = np.histogram(values, bins=bins)
+    centers = (edges[:-1] + edges[1:]) / 2
+    colors = np.full(len(centers), above, dtype=object)
+    for limit, color in reversed(bands):
+        colors[centers < limit] = color
+
+    fig, ax = plt.subplots(figsize=(8, 5))
+    ax.bar(edges[:-1], counts, width=np.diff(edges), align='edge', color=colors, edgecolor='white')
+    ax.axvline(x=values.mean(), color='black', linestyle=':', alpha=0.7, label=f'Mean ({values.mean():.1f})')
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel('Companies')
+    ax.set_title(title)
+    ax.grid(axis='y', alpha=0.3)
+    return fig, ax
+
+
+def رسم_امتیاز_کل(data):
+    plt = کتابخانه_نمودار()
+    fig1, ax1 = plt.subplots(figsize=(8, 5))
+    colors = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728']
+    bars = ax1.barh(data["شرکت"], data["امتیاز کل"], color=colors[:len(data)])
+    ax1.set_xlabel("Total Score")
+    ax1.set_title("Company Total Score Comparison")
+    ax1.grid(axis='x', alpha=0.3)
+
+    for i, bar in enumerate(bars):
+        width = bar.get_width()
+        ax1.text(width, bar.get_y() + bar.get_height()/2, 
+                f'{width:.1f}', ha='left', va='center', fontsize=9)
+
+    plt.tight_layout()
+    return fig1
+
+
+def رسم_توزیع_امتیاز_کل(data):
+    plt = کتابخانه_نمودار()
+    fig1, ax1 = رسم_هیستوگرام(data["امتیاز کل"].to_numpy(), "Total Score", "Total Score Distribution")
+    ax1.legend()
+    plt.tight_layout()
+    return fig1
+
+
+def رسم_شاخص_مالی(data):
+    plt = کتابخانه_نمودار()
+    fig2, ax2 = plt.subplots(figsize=(8, 5))
+    x = np.arange(len(data["شرکت"]))
+    width = 0.25
+
+    ax2.bar(x - width, data["ROE"], width, label='ROE', alpha=0.8)
+    ax2.bar(x, data["ROI"], width, label='ROI', alpha=0.8)
+    ax2.bar(x + width, data["EVA"], width, label='EVA', alpha=0.8)
+
+    ax2.set_ylabel('Value')
+    ax2.set_title('Key Financial Metrics')
+    ax2.set_xticks(x)
+    ax2.set_xticklabels(data["شرکت"], rotation=20, ha='right')
+    ax2.legend()
+    ax2.grid(axis='y', alpha=0.3)
+
+    plt.tight_layout()
+    return fig2
+
+
+def سری_رادار(data, score, max_series=RADAR_MAX_SERIES, bands=RADAR_BANDS):
+    # تا max_series شرکت هر شرکت یک سری است؛ بیشتر از آن، میانگین محورها
+    # در هر باند صدکی امتیاز کل (با bincount، بدون حلقه روی شرکت‌ها)
+    if len(data) <= max_series:
+        return data[["شرکت"] + axis_cols].reset_index(drop=True)
+
+    values = data[axis_cols].to_numpy(dtype=np.float64)
+    valid = ~np.isnan(score) & ~np.isnan(values).any(axis=1)
+    score, values = score[valid], values[valid]
+
+    edges = np.quantile(score, np.linspace(0, 1, bands + 1)[1:-1])
+    band = np.searchsorted(edges, score, side="right")
+    counts = np.bincount(band, minlength=bands)
+    sums = np.stack(
+        [np.bincount(band, weights=values[:, j], minlength=bands) for j in range(len(axis_cols))],
+        axis=1,
+    )
+
+    # از باند بالا به پایین؛ باندهای خالی (به خاطر امتیازهای برابر) حذف می‌شوند
+    order = [b for b in range(bands - 1, -1, -1) if counts[b]]
+    step = 100 // bands
+    profiles = pd.DataFrame(sums[order] / counts[order, None], columns=axis_cols)
+    profiles.insert(0, "شرکت", [f"P{b * step}-P{(b + 1) * step} ({counts[b]})" for b in order])
+    return profiles
+
+
+def رسم_رادار(data):
+    from matplotlib.collections import LineCollection, PolyCollection
+    from matplotlib.lines import Line2D
+
+    plt = کتابخانه_نمودار()
+    fig3, ax3 = plt.subplots(figsize=(10, 8), subplot_kw=dict(projection='polar'))
+
+    values = data[axis_cols].to_numpy(dtype=np.float64)
+    n = len(values)
+
+    angles = np.linspace(0, 2 * np.pi, len(axis_cols), endpoint=False)
+    theta = np.append(angles, angles[0])
+    closed = np.concatenate([values, values[:, :1]], axis=1)
+    # رأس‌های همه سری‌ها در یک آرایه S×6×2 برای یک مجموعه چندضلعی و یک مجموعه خط
+    verts = np.stack([np.broadcast_to(theta, closed.shape), closed], axis=-1)
+
+    cmap = plt.colormaps['tab10' if n <= 10 else 'turbo']
+    colors = cmap(np.arange(n)) if n <= 10 else cmap(np.linspace(0, 1, n))
+
+    ax3.add_collection(PolyCollection(verts, facecolors=colors, edgecolors='none', alpha=0.15))
+    ax3.add_collection(LineCollection(verts, colors=colors, linewidths=2))
+    ax3.scatter(
+        verts[:, :-1, 0].ravel(), verts[:, :-1, 1].ravel(),
+        c=np.repeat(colors, len(axis_cols), axis=0), s=25, zorder=3,
+    )
+
+    ax3.set_xticks(angles)
+    ax3.set_xticklabels(['Financial', 'Efficiency', 'Growth', 'Risk Gov', 'Synergy'], fontsize=10)
+    ax3.set_ylim(0, np.nanmax(values) * 1.1)
+    ax3.set_title("Multi-dimensional Performance Comparison", size=14, pad=20)
+    handles = [Line2D([], [], color=c, marker='o', linewidth=2) for c in colors]
+    ax3.legend(handles, data["شرکت"].tolist(), loc='upper right', bbox_to_anchor=(1.3, 1.0))
+    ax3.grid(True)
+
+    plt.tight_layout()
+    return fig3
+
+
+def رسم_مقایسه_محورها(data):
+    plt = کتابخانه_نمودار()
+    fig4, ax4 = plt.subplots(figsize=(12, 6))
+    x = np.arange(len(data["شرکت"]))
+    width = 0.15
+
+    for i, col in enumerate(axis_cols):
+        ax4.bar(
+            x + i*width - (len(axis_cols)*width/2 - width/2),
+            data[col],
+            width=width,
+            label=col.replace("امتیاز ", "")
+        )
+
+    ax4.set_xticks(x)
+    ax4.set_xticklabels(data["شرکت"], rotation=15, ha='right')
+    ax4.set_ylabel('Score')
+    ax4.set_title('Detailed Axis Comparison Between Companies')
+    ax4.legend(loc="best", fontsize=9, ncol=2)
+    ax4.grid(axis='y', alpha=0.3)
+
+    plt.tight_layout()
+    return fig4
+
+
+def رسم_هزینه_درآمد(data):
+    plt = کتابخانه_نمودار()
+    fig5, ax5 = plt.subplots(figsize=(8, 5))
+    bars = ax5.barh(data["شرکت"], data["Cost/Income"], 
+                    color=['green' if x < 45 else 'orange' if x < 50 else 'red' 
+                           for x in data["Cost/Income"]])
+    ax5.set_xlabel('Cost/Income (%)')
+    ax5.set_title('Cost Efficiency (Lower is Better)')
+    ax5.axvline(x=45, color='green', linestyle='--', alpha=0.5, label='Excellent (<45%)')
+    ax5.axvline(x=50, color='orange', linestyle='--', alpha=0.5, label='Warning (>50%)')
+    ax5.legend()
+    ax5.grid(axis='x', alpha=0.3)
+
+    for i, bar in enumerate(bars):
+        width = bar.get_width()
+        ax5.text(width, bar.get_y() + bar.get_height()/2, 
+                f'{width:.1f}%', ha='left', va='center', fontsize=9)
+
+    plt.tight_layout()
+    return fig5
+
+
+def رسم_توزیع_هزینه_درآمد(data):
+    plt = کتابخانه_نمودار()
+    fig5, ax5 = رسم_هیستوگرام(
+        data["Cost/Income"].to_numpy(), 'Cost/Income (%)', 'Cost Efficiency Distribution (Lower is Better)',
+        bands=[(45, 'green'), (50, 'orange')], above='red',
+    )
+    ax5.axvline(x=45, color='green', linestyle='--', alpha=0.5, label='Excellent (<45%)')
+    ax5.axvline(x=50, color='orange', linestyle='--', alpha=0.5, label='Warning (>50%)')
+    ax5.legend()
+    plt.tight_layout()
+    return fig5
+
+
+def رسم_درآمد_کارمند(data):
+    plt = کتابخانه_نمودار()
+    fig6, ax6 = plt.subplots(figsize=(8, 5))
+    bars = ax6.barh(data["شرکت"], data["درآمد به ازای کارمند"], color='#2ecc71')
+    ax6.set_xlabel('Revenue per Employee')
+    ax6.set_title('Employee Productivity')
+    ax6.grid(axis='x', alpha=0.3)
+
+    for i, bar in enumerate(bars):
+        width = bar.get_width()
+        # شرکتی که این KPI را ندارد (خالی یا نامعتبر) میله و برچسب ندارد
+        if np.isnan(width):
+            continue
+        ax6.text(width, bar.get_y() + bar.get_height()/2, 
+                f'{int(width)}', ha='left', va='center', fontsize=9)
+
+    plt.tight_layout()
+    return fig6
+
+
+def رسم_اهرم(data):
+    plt = کتابخانه_نمودار()
+    fig7, ax7 = plt.subplots(figsize=(8, 5))
+    colors_debt = ['green' if x < 0.5 else 'orange' if x < 0.7 else 'red' 
+                   for x in data["Debt/Equity"]]
+    bars = ax7.barh(data["شرکت"], data["Debt/Equity"], color=colors_debt)
+    ax7.set_xlabel('Debt/Equity Ratio')
+    ax7.set_title('Leverage Risk Assessment')
+    ax7.axvline(x=0.5, color='green', linestyle='--', alpha=0.5, label='Safe (<0.5)')
+    ax7.axvline(x=0.7, color='red', linestyle='--', alpha=0.5, label='Risky (>0.7)')
+    ax7.legend()
+    ax7.grid(axis='x', alpha=0.3)
+
+    for i, bar in enumerate(bars):
+        width = bar.get_width()
+        ax7.text(width, bar.get_y() + bar.get_height()/2, 
+                f'{width:.2f}', ha='left', va='center', fontsize=9)
+
+    plt.tight_layout()
+    return fig7
+
+
+def رسم_توزیع_اهرم(data):
+    plt = کتابخانه_نمودار()
+    fig7, ax7 = رسم_هیستوگرام(
+        data["Debt/Equity"].to_numpy(), 'Debt/Equity Ratio', 'Leverage Risk Distribution',
+        bands=[(0.5, 'green'), (0.7, 'orange')], above='red',
+    )
+    ax7.axvline(x=0.5, color='green', linestyle='--', alpha=0.5, label='Safe (<0.5)')
+    ax7.axvline(x=0.7, color='red', linestyle='--', alpha=0.5, label='Risky (>0.7)')
+    ax7.legend()
+    plt.tight_layout()
+    return fig7
+
+
+def رسم_حاکمیت(data):
+    plt = کتابخانه_نمودار()
+    fig8, ax8 = plt.subplots(figsize=(8, 5))
+    x = np.arange(len(data["شرکت"]))
+    width = 0.35
+
+    ax8.bar(x - width/2, data["Compliance"], width, label='Compliance', alpha=0.8)
+    ax8.bar(x + width/2, data["کنترل داخلی"], width, label='Internal Control', alpha=0.8)
+
+    ax8.set_ylabel('Score')
+    ax8.set_title('Governance Quality')
+    ax8.set_xticks(x)
+    ax8.set_xticklabels(data["شرکت"], rotation=20, ha='right')
+    ax8.legend()
+    ax8.grid(axis='y', alpha=0.3)
+    ax8.set_ylim(0, 100)
+
+    plt.tight_layout()
+    return fig8
+
+
+def رسم_صدک(pct):
+    plt = کتابخانه_نمودار()
+    pct = pct.sort_values()
+    colors = np.where(pct < 25, 'tab:red', np.where(pct < 75, 'goldenrod', 'tab:green'))
+    fig, ax = plt.subplots(figsize=(8, 6))
+    ax.barh(pct.index, pct.fillna(0).to_numpy(), color=colors)
+    ax.axvline(x=50, color='black', linestyle=':', alpha=0.7)
+    ax.set_xlim(0, 100)
+    ax.set_xlabel('Peer percentile (higher is better)')
+    ax.grid(axis='x', alpha=0.3)
+    fig.tight_layout()
+    return fig
+
+
+def رسم_روند(history):
+    # یک نمودار برای هر ستون history به جز ستون دوره
+    metrics = [col for col in history.columns if col != "دوره"]
+    plt = کتابخانه_نمودار()
+    fig, axes = plt.subplots(1, len(metrics), figsize=(5 * len(metrics), 3.5), squeeze=False)
+    for ax, metric in zip(axes[0], metrics):
+        ax.plot(history["دوره"], history[metric], marker='o', color='tab:blue')
+        ax.set_title(metric)
+        ax.grid(alpha=0.3)
+        ax.tick_params(axis='x', rotation=45)
+        if metric == "رتبه":
+            ax.invert_yaxis()
+    fig.tight_layout()
+    return fig
+
+
+def رسم_ربعها(ax, eff, fin):
+    # خطوط میانگین
+    avg_eff = np.nanmean(eff)
+    avg_fin = np.nanmean(fin)
+
+    ax.axhline(y=avg_fin, color='red', linestyle='--', alpha=0.5, label='Avg Financial')
+    ax.axvline(x=avg_eff, color='blue', linestyle='--', alpha=0.5, label='Avg Efficiency')
+
+    # برچسب‌های چهار ربع
+    ax.text(ax.get_xlim()[1]*0.95, ax.get_ylim()[1]*0.95, 'Stars', 
+            ha='right', va='top', fontsize=12, weight='bold', 
+            bbox=dict(boxstyle='round', facecolor='lightgreen', alpha=0.5))
+    ax.text(ax.get_xlim()[0]*1.05, ax.get_ylim()[1]*0.95, 'Cash Cows', 
+            ha='left', va='top', fontsize=12, weight='bold',
+            bbox=dict(boxstyle='round', facecolor='lightyellow', alpha=0.5))
+    ax.text(ax.get_xlim()[1]*0.95, ax.get_ylim()[0]*1.05, 'Question Marks', 
+            ha='right', va='bottom', fontsize=12, weight='bold',
+            bbox=dict(boxstyle='round', facecolor='lightcoral', alpha=0.5))
+    ax.text(ax.get_xlim()[0]*1.05, ax.get_ylim()[0]*1.05, 'Dogs', 
+            ha='left', va='bottom', fontsize=12, weight='bold',
+            bbox=dict(boxstyle='round', facecolor='lightgray', alpha=0.5))
+
+
+def شرکت_های_شاخص(eff, fin, quadrant, per_quadrant):
+    # فاصله استانداردشده از نقطه میانگین؛ k نقطه دورتر در هر ربع
+    distance = np.hypot(
+        (eff - np.nanmean(eff)) / (np.nanstd(eff) or 1),
+        (fin - np.nanmean(fin)) / (np.nanstd(fin) or 1),
+    )
+    picked = []
+    for q in range(len(QUADRANTS)):
+        in_q = np.flatnonzero(quadrant == q)
+        picked.append(in_q[برترین_ها(distance[in_q], per_quadrant)])
+    return np.concatenate(picked)
+
+
+def رسم_ماتریس_عملکرد(data):
+    plt = کتابخانه_نمودار()
+    fig9, ax9 = plt.subplots(figsize=(10, 7))
+
+    eff = data["امتیاز بهره‌وری"].to_numpy(dtype=np.float64)
+    fin = data["امتیاز مالی"].to_numpy(dtype=np.float64)
+    quadrant = ربع_عملکرد(eff, fin)
+
+    # همه نقاط در یک فراخوانی scatter؛ رنگ = ربع، اندازه = سهم بازار
+    ax9.scatter(
+        eff, fin, s=data["سهم بازار"].to_numpy(dtype=np.float64) * 50,
+        c=np.asarray(QUADRANT_COLORS)[quadrant], alpha=0.6, edgecolors='grey', linewidths=0.5,
+    )
+
+    # برچسب فقط برای شرکت‌های شاخص: دورترین نقاط از مرکز میانگین در هر ربع
+    names = data["شرکت"].to_numpy()
+    for i in شرکت_های_شاخص(eff, fin, quadrant, MATRIX_LABELS_PER_QUADRANT):
+        ax9.annotate(names[i], (eff[i], fin[i]), xytext=(5, 5), textcoords='offset points', fontsize=9)
+
+    رسم_ربعها(ax9, eff, fin)
+
+    ax9.set_xlabel('Efficiency Score', fontsize=11)
+    ax9.set_ylabel('Financial Score', fontsize=11)
+    ax9.set_title('Performance Matrix (Bubble size = Market Share)', fontsize=13)
+    ax9.grid(True, alpha=0.3)
+    ax9.legend(loc='upper left', fontsize=9)
+
+    plt.tight_layout()
+    return fig9
+
+
+def رسم_چگالی_ماتریس_عملکرد(data):
+    plt = کتابخانه_نمودار()
+    fig9, ax9 = plt.subplots(figsize=(10, 7))
+
+    eff = data["امتیاز بهره‌وری"].to_numpy()
+    fin = data["امتیاز مالی"].to_numpy()
+    hb = ax9.hexbin(eff, fin, gridsize=40, cmap='Blues', mincnt=1)
+    plt.colorbar(hb, ax=ax9, label='Companies')
+
+    رسم_ربعها(ax9, eff, fin)
+
+    ax9.set_xlabel('Efficiency Score', fontsize=11)
+    ax9.set_ylabel('Financial Score', fontsize=11)
+    ax9.set_title('Performance Matrix (Company Density)', fontsize=13)
+    ax9.grid(True, alpha=0.3)
+    ax9.legend(loc='upper left', fontsize=9)
+
+    plt.tight_layout()
+    return fig9
+
+
+def رسم_همبستگی(corr_df):
+    plt = کتابخانه_نمودار()
+    labels = corr_df.columns.tolist()
+
+    fig10, ax10 = plt.subplots(figsize=(10, 8))
+    im = ax10.imshow(corr_df.to_numpy(), cmap='RdYlGn', aspect='auto', vmin=-1, vmax=1)
+
+    ax10.set_xticks(np.arange(len(labels)))
+    ax10.set_yticks(np.arange(len(labels)))
+    ax10.set_xticklabels(labels, rotation=45, ha='right', fontsize=9)
+    ax10.set_yticklabels(labels, fontsize=9)
+
+    # افزودن مقادیر فقط وقتی ماتریس آن‌قدر کوچک است که اعداد خوانا باشند
+    if len(labels) <= CORR_ANNOTATE_MAX:
+        for i in range(len(labels)):
+            for j in range(len(labels)):
+                ax10.text(j, i, f'{corr_df.iloc[i, j]:.2f}',
+                          ha="center", va="center", color="black", fontsize=8)
+
+    ax10.set_title("Correlation Matrix of Key Metrics", fontsize=13, pad=20)
+    plt.colorbar(im, ax=ax10)
+    plt.tight_layout()
+    return fig10
@@ -1,19 +1,120 @@
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
 import numpy as np
-from matplotlib import font_manager
+import hashlib
 import warnings
 
+from analytics import LOWER_IS_BETTER, PeerPercentiles, RollupCube, StreamingCorrelation
+from cache import BoundedLRU, امضای_ستونها, اثر_انگشت_داده, هش_سطرها
+from charts import (
+    CHART_ROW_LIMIT,
+    CHART_TOP_N,
+    رندر_png,
+    برش_برترین,
+    سری_رادار,
+    رسم_امتیاز_کل,
+    رسم_توزیع_امتیاز_کل,
+    رسم_شاخص_مالی,
+    رسم_رادار,
+    رسم_مقایسه_محورها,
+    رسم_هزینه_درآمد,
+    رسم_توزیع_هزینه_درآمد,
+    رسم_درآمد_کارمند,
+    رسم_اهرم,
+    رسم_توزیع_اهرم,
+    رسم_حاکمیت,
+    رسم_صدک,
+    رسم_روند,
+    رسم_ماتریس_عملکرد,
+    رسم_چگالی_ماتریس_عملکرد,
+    رسم_همبستگی,
+)
+from export import EXPORT_FORMATS, بایت_های_خروجی
+from history import HistoryStore
+from ingest import (
+    AUM_COL,
+    DEFAULT_CHUNKSIZE,
+    KPI_SCHEMA,
+    PARENT_COL,
+    SECTOR_COL,
+    CompanyIndex,
+    بارگذاری,
+    فشرده_سازی,
+    گسترش_فشرده,
+    مقادیر_float64,
+)
+from profiling import PROFILE_BUFFER_SIZE, SectionProfiler
+from scoring import (
+    QUADRANTS,
+    RECOMMENDATION_RULES,
+    RULE_OPERATORS,
+    SEVERITIES,
+    axis_cols,
+    برترین_ها,
+    جدول_هشدار,
+    جدول_امتیاز,
+    ماتریس_محورها,
+    توصیه_ها,
+    ربع_عملکرد,
+)
+from scenarios import (
+    DEFAULT_ERROR_MODELS,
+    بازه_اطمینان_رتبه,
+    تحلیل_حساسیت_وزن,
+    شبکه_وزن,
+    نمونه_سیمپلکس,
+)
+
 warnings.filterwarnings('ignore')
 
-# تنظیمات فونت فارسی برای matplotlib
-plt.rcParams['font.family'] = 'DejaVu Sans'
-plt.rcParams['axes.unicode_minus'] = False
+# سقف حافظه کش‌های مشترک بین همه نشست‌های این پردازه (مگابایت)
+SHARED_AXIS_CACHE_MB = 128
+SHARED_SCORE_CACHE_MB = 256
+SHARED_FIGURE_CACHE_MB = 64
+SHARED_EXPORT_CACHE_MB = 256
+# تعداد جدول‌های ورودی (فایل‌های بارگذاری‌شده) و نمایه‌های شرکت که بین نشست‌ها نگه داشته می‌شود
+SHARED_DATA_ENTRIES = 8
+# سقف حافظه کش نتایج شبیه‌سازی مونت‌کارلو برای هر نشست (مگابایت)
+MC_CACHE_BUDGET_MB = 16
+# فایل SQLite تاریخچه دوره‌ای امتیازها
+HISTORY_PATH = "history.sqlite"
+TREND_METRICS = ["امتیاز کل", "رتبه", "Cost/Income", "ROE"]
+# بالاتر از این تعداد شرکت، انتخابگر Drilldown فقط نتایج جستجو را فهرست می‌کند
+DRILLDOWN_OPTIONS_MAX = 200
+
+
+@st.cache_resource(show_spinner=False)
+def پروفایلر():
+    # یک بافر حلقوی مشترک برای همه نشست‌ها تا پنل مدیریت اجراهای همه کاربران را ببیند
+    return SectionProfiler()
+
+
+profiler = پروفایلر()
+profile_run = profiler.begin_run()
+# پنل پروفایل فقط با ?admin=1 در آدرس نمایش داده می‌شود
+profile_admin = st.query_params.get("admin") == "1"
+if profile_admin:
+    profiler.track_memory = st.session_state.get("profile_memory", False)
+
+
+@st.cache_resource(show_spinner=False)
+def کش_مشترک():
+    # نتایج با اثر انگشت داده (و وزن‌ها) کلید می‌خورند و بین همه نشست‌ها مشترک‌اند؛
+    # بیننده‌هایی که همان داده را با همان وزن‌ها باز کنند نتیجه یک محاسبه را می‌گیرند
+    return {
+        "axes": BoundedLRU(SHARED_AXIS_CACHE_MB * 2**20),
+        "scores": BoundedLRU(SHARED_SCORE_CACHE_MB * 2**20),
+        "figures": BoundedLRU(SHARED_FIGURE_CACHE_MB * 2**20),
+        "exports": BoundedLRU(SHARED_EXPORT_CACHE_MB * 2**20),
+    }
+
+
+shared_cache = کش_مشترک()
 
 # -------------------------------------------------
 # 0. تنظیمات صفحه
 # -------------------------------------------------
+profiler.section("0. تنظیمات صفحه")
 st.set_page_config(
     page_title="داشبورد ارزیابی هلدینگ مالی",
     page_icon="📊",
@@ -26,7 +127,7 @@ st.caption("مدل تمرکز: سودآوری و بهره‌وری عملیات
 # -------------------------------------------------
 # 1. داده اولیه
 # -------------------------------------------------
-
+profiler.section("1. داده اولیه")
 default_data = [
     {
         "شرکت": "سبدگردان الف",
@@ -122,18 +223,83 @@ default_data = [
     },
 ]
 
-raw_df = pd.DataFrame(default_data)
-
 st.sidebar.header("تنظیمات ورودی 📥")
+
+
+def منبع_داده(df, issues=None):
+    # جدول ورودی مشترک بین نشست‌ها، با هش سطرها و اثر انگشتی که فقط یک بار محاسبه می‌شوند
+    row_hashes = هش_سطرها(df)
+    return {"df": df, "issues": issues, "hashes": row_hashes, "fingerprint": اثر_انگشت_داده(df, row_hashes)}
+
+
+@st.cache_resource(max_entries=SHARED_DATA_ENTRIES, show_spinner="در حال خواندن فایل...")
+def بارگذاری_فایل(digest, name, _file):
+    # فایل با هش محتوایش کلید می‌خورد؛ همه نشست‌هایی که همان فایل را بارگذاری کنند
+    # یک جدول مشترک می‌گیرند و rerun دوباره فایل را نمی‌خواند
+    _file.seek(0)
+    return منبع_داده(*بارگذاری(_file, name))
+
+
+@st.cache_resource(show_spinner=False)
+def داده_پیش_فرض():
+    return منبع_داده(فشرده_سازی(pd.DataFrame(default_data)))
+
+
+def هش_فایل(uploaded, slot="upload_digest"):
+    # هش محتوای فایل یک بار برای هر آپلود این نشست محاسبه می‌شود؛ هر آپلودکننده جای خودش را دارد
+    cached = st.session_state.get(slot)
+    if cached is None or cached[0] != uploaded.file_id:
+        digest = hashlib.blake2b(uploaded.getvalue(), digest_size=16).hexdigest()
+        cached = st.session_state[slot] = (uploaded.file_id, digest)
+    return cached[1]
+
+
+uploaded_file = st.sidebar.file_uploader(
+    "بارگذاری فایل KPI شرکت‌ها (CSV / Parquet / Excel)",
+    type=["csv", "parquet", "xlsx"],
+)
+
+source = None
+editor_key = "editor_table"
+if uploaded_file is not None:
+    try:
+        source = بارگذاری_فایل(هش_فایل(uploaded_file), uploaded_file.name, uploaded_file)
+    except ValueError as e:
+        st.sidebar.error(f"خطا در خواندن فایل: {e}")
+    else:
+        raw_df, ingest_issues = source["df"], source["issues"]
+        editor_key = f"editor_table_{uploaded_file.file_id}"
+        st.sidebar.success(f"{len(raw_df)} شرکت از فایل بارگذاری شد.")
+        if len(ingest_issues):
+            st.sidebar.warning(f"⚠️ {len(ingest_issues)} مقدار نامعتبر یا خارج از محدوده پیدا شد.")
+            with st.sidebar.expander("جزئیات اعتبارسنجی"):
+                st.dataframe(ingest_issues, use_container_width=True, hide_index=True)
+
+if source is None:
+    source = داده_پیش_فرض()
+    raw_df = source["df"]
+
 st.sidebar.write("اگر می‌خوای داده واقعی وارد کنی، می‌تونی از این جدول ادیت‌پذیر استفاده کنی:")
 
-edited_df = st.sidebar.data_editor(raw_df, num_rows="dynamic", key="editor_table")
+# ویرایشگر نمای float64 جدول فشرده را می‌گیرد؛ با int8 و float32 مقدار خارج از بازه
+# خطا می‌دهد و اعشار ستون صحیح بریده می‌شود
+edited_df = st.sidebar.data_editor(گسترش_فشرده(raw_df, integers=True), num_rows="dynamic", key=editor_key)
+# کپی هنگام نوشتن: تا وقتی نشست جدول را ویرایش نکرده، جدول مشترک جای کپی ویرایشگر
+# استفاده می‌شود و فقط نشستی که ویرایش کند نسخه خودش را دارد
+editor_edits = st.session_state.get(editor_key) or {}
+if any(editor_edits.get(k) for k in ("edited_rows", "added_rows", "deleted_rows")):
+    # نسخه ویرایش‌شده هم فشرده می‌شود و تا جای ممکن نوع ستون‌های منبع را نگه می‌دارد
+    # تا هش سطرهای ویرایش‌نشده عوض نشود و محورهایشان از کش برداشته شود
+    edited_df = فشرده_سازی(edited_df, like=raw_df)
+else:
+    edited_df = raw_df
 
 st.sidebar.info("پس از تغییر جدول سمت چپ، داشبورد پایین بر اساس همین داده محاسبه می‌شود.")
 
 # -------------------------------------------------
 # تنظیمات وزن‌ها
 # -------------------------------------------------
+profiler.section("تنظیمات وزن‌ها")
 st.sidebar.divider()
 st.sidebar.subheader("⚖️ تنظیم وزن محورها")
 st.sidebar.caption("مجموع وزن‌ها باید 100% باشد")
@@ -148,90 +314,194 @@ total_weight = weight_financial + weight_efficiency + weight_growth + weight_ris
 if total_weight != 100:
     st.sidebar.warning(f"⚠️ مجموع وزن‌ها {total_weight}% است. لطفاً آن را به 100% تنظیم کنید.")
 
+st.sidebar.divider()
+st.sidebar.subheader("📉 نمایش نمودارها")
+chart_row_limit = st.sidebar.number_input(
+    "حداکثر تعداد شرکت برای نمودار تک‌به‌تک", min_value=5, value=CHART_ROW_LIMIT, step=5
+)
+chart_top_n = st.sidebar.number_input(
+    "تعداد شرکت برتر در حالت خلاصه", min_value=3, max_value=50, value=CHART_TOP_N
+)
+
 # -------------------------------------------------
-# 2. توابع محاسبه KPI محوری
+# 2. امتیازدهی و کش امتیازها (LRU مشترک بین نشست‌ها با سقف حافظه)
+# فرمول‌های محورها و رتبه‌بندی در scoring.py و کش‌ها در cache.py هستند.
 # -------------------------------------------------
+profiler.section("2. امتیازدهی و کش امتیازها")
 
-def محور_مالی(row):
-    return (
-        row["ROE"]
-        + row["ROI"]
-        + row["EVA"]
-        + row["رشد سود خالص"]
-        + row["نسبت سود به درآمد"]
-    ) / 5.0
+def ماتریس_محورها_افزایشی(df, row_hashes, base):
+    # از حالت پایه (جدول مشترک یا آخرین نسخه ویرایش‌شده همین نشست) فقط سطرهایی
+    # که محتوایشان تازه است (ویرایش یا اضافه شده) دوباره محاسبه می‌شوند.
+    signature = امضای_ستونها(df)
 
+    if base is None or base["signature"] != signature or len(base["hashes"]) == 0:
+        axes = ماتریس_محورها(df)
+    else:
+        order = np.argsort(base["hashes"], kind="stable")
+        sorted_hashes = base["hashes"][order]
+        pos = np.searchsorted(sorted_hashes, row_hashes)
+        pos = np.minimum(pos, len(sorted_hashes) - 1)
+        hit = sorted_hashes[pos] == row_hashes
+
+        axes = np.empty((len(df), len(axis_cols)), dtype=np.float64)
+        axes[hit] = base["axes"][order[pos[hit]]]
+        miss = np.flatnonzero(~hit)
+        if len(miss):
+            axes[miss] = ماتریس_محورها(df.iloc[miss])
+
+    # ماتریس بین نشست‌ها و با ستون‌های محور جدول امتیاز (بدون کپی) مشترک است
+    axes.flags.writeable = False
+    return {"signature": signature, "hashes": row_hashes, "axes": axes}
+
+
+def امتیازدهی_با_کش(df, w_fin, w_eff, w_grow, w_risk, w_syn):
+    # جدول مشترک بدون هش دوباره؛ نسخه ویرایش‌شده نشست هش و اثر انگشت خودش را دارد
+    if df is source["df"]:
+        row_hashes, fingerprint = source["hashes"], source["fingerprint"]
+    else:
+        row_hashes = هش_سطرها(df)
+        fingerprint = اثر_انگشت_داده(df, row_hashes)
+    # نسخه داده برای ساختارهایی که فقط با تغییر داده (نه وزن‌ها) باید از نو ساخته شوند
+    st.session_state["data_version"] = fingerprint
+    key = (fingerprint, w_fin, w_eff, w_grow, w_risk, w_syn)
+
+    def محورها():
+        axis_cache = shared_cache["axes"]
+        base = axis_cache.get(st.session_state.get("axis_version")) or axis_cache.get(source["fingerprint"])
+        return ماتریس_محورها_افزایشی(df, row_hashes, base)
+
+    def امتیاز():
+        # تغییر وزن: محورها از کش مشترک برداشته می‌شوند و فقط ضرب ماتریسی و رتبه‌بندی انجام می‌شود
+        with profiler.measure("امتیازدهی (محاسبه)"):
+            axes = shared_cache["axes"].get_or_compute(
+                fingerprint, محورها, lambda state: state["hashes"].nbytes + state["axes"].nbytes
+            )["axes"]
+            return جدول_امتیاز(df, axes, w_fin, w_eff, w_grow, w_risk, w_syn)
+
+    # جدول امتیاز ستون‌های محور را با کش محورها و ستون‌های جدول مشترک را با منبع
+    # شریک است؛ فقط حافظه‌ای که خودش نگه می‌دارد به سقف کش امتیازها حساب می‌شود
+    shared = axis_cols + (list(df.columns) if df is source["df"] else [])
+    result = shared_cache["scores"].get_or_compute(
+        key, امتیاز, lambda result: int(result.drop(columns=shared, errors="ignore").memory_usage(deep=True).sum())
+    )
+    st.session_state["axis_version"] = fingerprint
+    return result, key
 
-def محور_بهره_وری(row):
-    return (
-        (100 - row["Cost/Income"]) +
-        (row["درآمد به ازای کارمند"] / 3) +
-        row["AUM/تحلیلگر"] +
-        ((10 - row["زمان تصمیم سرمایه‌گذاری"]) * 10)
-    ) / 4.0
 
+# -------------------------------------------------
+# کش تصاویر نمودارها
+# هر نمودار فقط با برش داده‌ای که می‌خواند کلید می‌خورد؛ اگر آن برش
+# تغییر نکرده باشد تصویر PNG قبلی (از هر نشستی) بدون رسم مجدد نمایش داده می‌شود.
+# -------------------------------------------------
 
-def محور_رشد_پایدار(row):
-    return (
-        row["رشد AUM"] +
-        row["نوآوری مالی"] * 10 +
-        row["درآمد پایدار"] +
-        row["رضایت مشتری (NPS)"]
-    ) / 4.0
+def نمایش_نمودار(name, data, draw):
+    def رسم():
+        with profiler.measure(f"نمودار {name}"):
+            return رندر_png(draw(data))
 
+    png = shared_cache["figures"].get_or_compute((name, اثر_انگشت_داده(data)), رسم, len)
+    st.image(png, use_container_width=True)
 
-def محور_ریسک_و_حاکمیت(row):
-    سلامت_اهرم = (1 - min(row["Debt/Equity"] / 2, 1)) * 100
-    return (
-        row["Compliance"] +
-        سلامت_اهرم +
-        row["کنترل داخلی"] +
-        row["شفافیت گزارش"]
-    ) / 4.0
 
+scored_df, score_version = امتیازدهی_با_کش(
+    edited_df, weight_financial, weight_efficiency, weight_growth, weight_risk, weight_synergy
+)
 
-def محور_هم_افزایی(row):
-    return (
-        row["هم‌افزایی"] +
-        row["پروژه‌های مشترک"] * 15 +
-        row["سهم بازار"] * 10
-    ) / 3.0
+large_portfolio = len(scored_df) > chart_row_limit
 
+profiler.section("نوار کناری: تاریخچه، همتایان و قواعد")
 
-def محاسبه_امتیازها(df, w_fin, w_eff, w_grow, w_risk, w_syn):
-    df = df.copy()
+@st.cache_resource
+def انبار_تاریخچه(path):
+    # یک اتصال مشترک برای همه نشست‌ها
+    return HistoryStore(path)
 
-    df["امتیاز مالی"] = df.apply(محور_مالی, axis=1)
-    df["امتیاز بهره‌وری"] = df.apply(محور_بهره_وری, axis=1)
-    df["امتیاز رشد پایدار"] = df.apply(محور_رشد_پایدار, axis=1)
-    df["امتیاز ریسک و حاکمیت"] = df.apply(محور_ریسک_و_حاکمیت, axis=1)
-    df["امتیاز هم‌افزایی"] = df.apply(محور_هم_افزایی, axis=1)
 
-    df["امتیاز کل"] = (
-        (w_fin/100) * df["امتیاز مالی"] +
-        (w_eff/100) * df["امتیاز بهره‌وری"] +
-        (w_grow/100) * df["امتیاز رشد پایدار"] +
-        (w_risk/100) * df["امتیاز ریسک و حاکمیت"] +
-        (w_syn/100) * df["امتیاز هم‌افزایی"]
-    )
+history_store = انبار_تاریخچه(HISTORY_PATH)
 
-    df["رتبه"] = df["امتیاز کل"].rank(ascending=False, method="min").astype(int)
-    return df
+st.sidebar.divider()
+st.sidebar.subheader("🗂️ تاریخچه دوره‌ها")
+history_period = st.sidebar.text_input("دوره (مثلاً 1403-Q1)")
+if st.sidebar.button("ذخیره امتیازهای فعلی برای این دوره", disabled=not history_period.strip()):
+    try:
+        saved = history_store.append(scored_df, history_period.strip())
+    except ValueError as e:
+        st.sidebar.error(f"خطا در ذخیره تاریخچه: {e}")
+    else:
+        st.sidebar.success(f"{saved} شرکت برای دوره {history_period.strip()} ذخیره شد.")
 
+# گروه همتا برای صدک‌ها: فایل جداگانه (مثلاً کل صنعت) یا در نبود آن، خود شرکت‌های هلدینگ
+st.sidebar.divider()
+st.sidebar.subheader("📐 گروه همتا")
+peer_file = st.sidebar.file_uploader(
+    "فایل KPI همتایان (اختیاری)", type=["csv", "parquet", "xlsx"], key="peer_file"
+)
+# اثر انگشت گروه همتا از منبع مشترک (یا نسخه داده همین نشست) برداشته می‌شود، نه با هش دوباره هر rerun
+peer_df, peer_version = scored_df, st.session_state["data_version"]
+if peer_file is not None:
+    try:
+        peer_source = بارگذاری_فایل(هش_فایل(peer_file, "peer_digest"), peer_file.name, peer_file)
+        peer_df, peer_version = peer_source["df"], peer_source["fingerprint"]
+    except ValueError as e:
+        st.sidebar.error(f"خطا در خواندن فایل همتایان: {e}")
+    else:
+        st.sidebar.success(f"{len(peer_df):,} همتا بارگذاری شد.")
+peer_by_sector = st.sidebar.checkbox(
+    "مقایسه با همتایان همان زیربخش",
+    disabled=SECTOR_COL not in peer_df.columns or SECTOR_COL not in scored_df.columns,
+)
 
-scored_df = محاسبه_امتیازها(edited_df, weight_financial, weight_efficiency, weight_growth, weight_risk, weight_synergy)
+
+@st.cache_resource(max_entries=4)
+def شاخص_همتایان(fingerprint, _peers):
+    # آرایه‌های مرتب هر شاخص یک بار برای هر گروه همتا ساخته می‌شوند
+    return PeerPercentiles(_peers, list(KPI_SCHEMA), SECTOR_COL)
+
+
+peer_index = شاخص_همتایان(peer_version, peer_df)
+
+# آستانه و شدت قواعد توصیه؛ همین قواعد هم در Drilldown و هم در جدول هشدار هلدینگ به کار می‌روند
+with st.sidebar.expander("⚙️ قواعد توصیه"):
+    rules_table = st.data_editor(
+        pd.DataFrame(
+            [(name, col, op, threshold, severity, True)
+             for name, (col, op, threshold, severity, _) in RECOMMENDATION_RULES.items()],
+            columns=["قاعده", "شاخص", "عملگر", "آستانه", "شدت", "فعال"],
+        ),
+        column_config={
+            "قاعده": st.column_config.TextColumn(disabled=True),
+            "شاخص": st.column_config.TextColumn(disabled=True),
+            "عملگر": st.column_config.SelectboxColumn(options=list(RULE_OPERATORS), required=True),
+            "آستانه": st.column_config.NumberColumn(required=True),
+            "شدت": st.column_config.SelectboxColumn(options=SEVERITIES, required=True),
+        },
+        hide_index=True,
+        key="recommendation_rules",
+    )
+active_rules = {
+    r["قاعده"]: (r["شاخص"], r["عملگر"], r["آستانه"], r["شدت"], RECOMMENDATION_RULES[r["قاعده"]][4])
+    for _, r in rules_table.iterrows()
+    if r["فعال"]
+}
 
 # -------------------------------------------------
 # 3. خلاصه مدیریتی بالا
 # -------------------------------------------------
+profiler.section("3. خلاصه مدیریتی بالا")
 st.subheader("📈 خلاصه عملکرد مدیریت (Consolidated View)")
 
 col1, col2, col3, col4 = st.columns(4)
 
-top_company_row = scored_df.loc[scored_df["امتیاز کل"].idxmax()]
-worst_cost_row = scored_df.loc[scored_df["Cost/Income"].idxmax()]
-best_eff_row = scored_df.loc[scored_df["امتیاز بهره‌وری"].idxmax()]
-best_fin_row = scored_df.loc[scored_df["امتیاز مالی"].idxmax()]
+# بیشینه هر چهار ستون در یک گذر روی ماتریس
+summary_argmax = np.nanargmax(
+    scored_df[["امتیاز کل", "Cost/Income", "امتیاز بهره‌وری", "امتیاز مالی"]].to_numpy(dtype=np.float64),
+    axis=0,
+)
+# فقط همین چهار سطر برای نمایش به float64 دقیق گسترش می‌یابند (بدون ارقام نویز float32)
+summary_rows = گسترش_فشرده(scored_df.iloc[summary_argmax])
+top_company_row, worst_cost_row, best_eff_row, best_fin_row = (
+    summary_rows.iloc[i] for i in range(len(summary_rows))
+)
 
 col1.metric(
     "بهترین شرکت از نظر امتیاز کل",
@@ -263,6 +533,7 @@ st.divider()
 # -------------------------------------------------
 # 4. جدول امتیاز نهایی و رتبه
 # -------------------------------------------------
+profiler.section("4. جدول امتیاز نهایی و رتبه")
 st.subheader("🏆 رتبه و امتیاز کل شرکت‌ها")
 
 display_cols = [
@@ -276,248 +547,272 @@ display_cols = [
     "امتیاز کل",
 ]
 
-styled_df = scored_df[display_cols].sort_values("رتبه").copy()
-styled_df = styled_df.round(2)
+# صفحه‌بندی سمت سرور: فقط k ردیف برتر تا انتهای صفحه جاری با انتخاب جزئی
+# پیدا و مرتب می‌شوند و تنها همان صفحه به مرورگر فرستاده می‌شود.
+col_page_size, col_page = st.columns([1, 3])
+page_size = col_page_size.selectbox("ردیف در هر صفحه", [10, 25, 50, 100], index=1)
+page_count = max(1, -(-len(scored_df) // page_size))
+page = col_page.number_input("صفحه", min_value=1, max_value=page_count, value=1, step=1)
+
+page_start = (page - 1) * page_size
+page_rows = برترین_ها(scored_df["امتیاز کل"].to_numpy(), page_start + page_size)[page_start:]
+
+styled_df = scored_df[display_cols].iloc[page_rows].round(2)
 
 st.dataframe(
     styled_df,
     use_container_width=True,
     hide_index=True
 )
-
-st.divider()
+st.caption(f"ردیف {page_start + 1} تا {page_start + len(styled_df)} از {len(scored_df)} شرکت")
 
 # -------------------------------------------------
-# 5. نمودارهای مقایسه‌ای
+# 4.1. حساسیت رتبه به وزن‌ها
+# همه سناریوهای وزن با یک ضرب ماتریسی تکه‌ای امتیاز می‌گیرند (scenarios.py)؛
+# نتیجه تا تغییر داده یا تنظیمات در نشست می‌ماند.
 # -------------------------------------------------
-col_chart1, col_chart2 = st.columns(2)
-
-with col_chart1:
-    st.subheader("📊 امتیاز کل شرکت‌ها")
-    
-    fig1, ax1 = plt.subplots(figsize=(8, 5))
-    colors = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728']
-    bars = ax1.barh(scored_df["شرکت"], scored_df["امتیاز کل"], color=colors[:len(scored_df)])
-    ax1.set_xlabel("Total Score")
-    ax1.set_title("Company Total Score Comparison")
-    ax1.grid(axis='x', alpha=0.3)
-    
-    for i, bar in enumerate(bars):
-        width = bar.get_width()
-        ax1.text(width, bar.get_y() + bar.get_height()/2, 
-                f'{width:.1f}', ha='left', va='center', fontsize=9)
-    
-    plt.tight_layout()
-    st.pyplot(fig1)
+profiler.section("4.1. حساسیت رتبه به وزن‌ها")
+with st.expander("🎲 پایداری رتبه در برابر تغییر وزن‌ها"):
+    col_mode, col_size, col_k = st.columns(3)
+    sweep_mode = col_mode.radio(
+        "سناریوهای وزن", ["شبکه منظم", "تصادفی یکنواخت", "تصادفی اطراف وزن‌های فعلی"]
+    )
+    if sweep_mode == "شبکه منظم":
+        sweep_size = col_size.select_slider("گام شبکه (%)", [5, 10, 20, 25], value=10)
+    else:
+        sweep_size = col_size.number_input("تعداد سناریو", 100, 100_000, 5_000, step=1_000)
+    sweep_k = col_k.number_input("k برتر", 1, max(1, len(scored_df)), min(3, len(scored_df)))
+
+    current_weights = (weight_financial, weight_efficiency, weight_growth, weight_risk, weight_synergy)
+    # محورها و نام‌ها فقط با داده عوض می‌شوند؛ نسخه داده همان اثر انگشتی است که امتیازدهی ساخته
+    sweep_key = (
+        st.session_state["data_version"],
+        sweep_mode, sweep_size, sweep_k,
+        current_weights if sweep_mode == "تصادفی اطراف وزن‌های فعلی" else None,
+    )
+    if st.button("اجرای تحلیل حساسیت"):
+        if sweep_mode == "شبکه منظم":
+            scenario_weights = شبکه_وزن(sweep_size)
+        elif sweep_mode == "تصادفی یکنواخت":
+            scenario_weights = نمونه_سیمپلکس(sweep_size)
+        else:
+            scenario_weights = نمونه_سیمپلکس(sweep_size, center=current_weights)
+        with st.spinner(f"امتیازدهی {len(scenario_weights):,} سناریو..."):
+            sweep = تحلیل_حساسیت_وزن(scored_df[axis_cols].to_numpy(), scenario_weights, top_k=sweep_k)
+        sweep.insert(0, "شرکت", scored_df["شرکت"].to_numpy())
+        sweep.insert(1, "رتبه فعلی", scored_df["رتبه"].array)
+        sweep = sweep.sort_values(
+            ["احتمال حضور در k برتر", "میانه رتبه"], ascending=[False, True], ignore_index=True
+        )
+        st.session_state["sweep_state"] = {"key": sweep_key, "result": sweep, "count": len(scenario_weights)}
+
+    sweep_state = st.session_state.get("sweep_state")
+    if sweep_state is not None and sweep_state["key"] == sweep_key:
+        st.caption(f"نتیجه {sweep_state['count']:,} سناریو؛ احتمال حضور در {sweep_k} رتبه برتر")
+        st.dataframe(sweep_state["result"].head(100).round(3), use_container_width=True, hide_index=True)
 
-with col_chart2:
-    st.subheader("💰 شاخص‌های مالی کلیدی")
-    
-    fig2, ax2 = plt.subplots(figsize=(8, 5))
-    x = np.arange(len(scored_df["شرکت"]))
-    width = 0.25
-    
-    ax2.bar(x - width, scored_df["ROE"], width, label='ROE', alpha=0.8)
-    ax2.bar(x, scored_df["ROI"], width, label='ROI', alpha=0.8)
-    ax2.bar(x + width, scored_df["EVA"], width, label='EVA', alpha=0.8)
-    
-    ax2.set_ylabel('Value')
-    ax2.set_title('Key Financial Metrics')
-    ax2.set_xticks(x)
-    ax2.set_xticklabels(scored_df["شرکت"], rotation=20, ha='right')
-    ax2.legend()
-    ax2.grid(axis='y', alpha=0.3)
-    
-    plt.tight_layout()
-    st.pyplot(fig2)
+# -------------------------------------------------
+# 4.2. بازه اطمینان رتبه (مونت‌کارلو)
+# KPIها با مدل خطای هر ستون آشفته و دوباره امتیازدهی می‌شوند؛ دسته‌های
+# قرعه روی استخر پردازه‌ها پخش می‌شوند و نتیجه با اثر انگشت داده و وزن‌ها کش می‌شود.
+# -------------------------------------------------
+profiler.section("4.2. بازه اطمینان رتبه (مونت‌کارلو)")
+with st.expander("🎯 بازه اطمینان رتبه با شبیه‌سازی خطای KPIها"):
+    error_kinds = {"relative": "نسبی (%)", "absolute": "مطلق"}
+    error_table = st.data_editor(
+        pd.DataFrame({
+            "شاخص": list(DEFAULT_ERROR_MODELS),
+            "نوع خطا": [error_kinds[kind] for kind, _ in DEFAULT_ERROR_MODELS.values()],
+            "انحراف معیار": [size * 100 if kind == "relative" else size
+                             for kind, size in DEFAULT_ERROR_MODELS.values()],
+        }),
+        column_config={
+            "شاخص": st.column_config.TextColumn(disabled=True),
+            "نوع خطا": st.column_config.SelectboxColumn(options=list(error_kinds.values()), required=True),
+            "انحراف معیار": st.column_config.NumberColumn(min_value=0.0, required=True),
+        },
+        hide_index=True,
+        use_container_width=True,
+        key="error_models",
+    )
+    error_models = {
+        row["شاخص"]: ("relative", row["انحراف معیار"] / 100) if row["نوع خطا"] == error_kinds["relative"]
+        else ("absolute", row["انحراف معیار"])
+        for _, row in error_table.iterrows()
+    }
+
+    col_draws, col_level = st.columns(2)
+    mc_draws = col_draws.number_input("تعداد قرعه", 1_000, 500_000, 20_000, step=10_000)
+    mc_level = col_level.select_slider("سطح اطمینان", [0.8, 0.9, 0.95, 0.99], value=0.9)
+
+    mc_cache = st.session_state.get("mc_cache")
+    if mc_cache is None or mc_cache.max_bytes != MC_CACHE_BUDGET_MB * 2**20:
+        mc_cache = st.session_state["mc_cache"] = BoundedLRU(MC_CACHE_BUDGET_MB * 2**20)
+    # score_version همان کلید جدول امتیاز است (اثر انگشت داده و وزن‌ها)
+    mc_key = (score_version, tuple(sorted(error_models.items())), mc_draws, mc_level)
+    if st.button("اجرای شبیه‌سازی") and mc_key not in mc_cache:
+        with st.spinner(f"شبیه‌سازی {mc_draws:,} قرعه..."):
+            intervals = بازه_اطمینان_رتبه(
+                scored_df, current_weights, error_models, draws=mc_draws, level=mc_level
+            )
+        intervals.insert(0, "شرکت", scored_df["شرکت"].to_numpy())
+        intervals.insert(1, "رتبه فعلی", scored_df["رتبه"].array)
+        intervals = intervals.sort_values(["میانه رتبه", "رتبه فعلی"], ignore_index=True)
+        mc_cache.put(mc_key, intervals, int(intervals.memory_usage(deep=True).sum()))
+
+    intervals = mc_cache.get(mc_key)
+    if intervals is not None:
+        st.caption(f"بازه {mc_level:.0%} رتبه هر شرکت از {mc_draws:,} قرعه")
+        st.dataframe(intervals.head(100), use_container_width=True, hide_index=True)
 
 st.divider()
 
 # -------------------------------------------------
-# 6. نمودار رادار (Spider Chart)
+# 5. نمودارهای مقایسه‌ای
+# بخش‌های نمودار، ماتریس، همبستگی و بنچمارک در expanderهایی با on_change="rerun"
+# هستند و فقط وقتی باز باشند محاسبه و رسم می‌شوند؛ صفحه اول بدون هیچ نموداری کامل می‌شود.
 # -------------------------------------------------
-st.subheader("🕸️ نمودار مقایسه چندبعدی محورها (Radar Chart)")
-
-metric_cols = [
-    "امتیاز مالی",
-    "امتیاز بهره‌وری",
-    "امتیاز رشد پایدار",
-    "امتیاز ریسک و حاکمیت",
-    "امتیاز هم‌افزایی",
-]
-
-fig3, ax3 = plt.subplots(figsize=(10, 8), subplot_kw=dict(projection='polar'))
-
-angles = np.linspace(0, 2 * np.pi, len(metric_cols), endpoint=False).tolist()
-angles += angles[:1]
-
-colors_radar = ['#FF6B6B', '#4ECDC4', '#45B7D1', '#FFA07A']
-
-for idx, row in scored_df.iterrows():
-    values = [row[col] for col in metric_cols]
-    values += values[:1]
-    ax3.plot(angles, values, 'o-', linewidth=2, label=row["شرکت"], color=colors_radar[idx % len(colors_radar)])
-    ax3.fill(angles, values, alpha=0.15, color=colors_radar[idx % len(colors_radar)])
+profiler.section("5. نمودارهای مقایسه‌ای")
+with st.expander("📊 نمودارهای مقایسه‌ای", key="section_compare", on_change="rerun") as section:
+    if section.open:
+        col_chart1, col_chart2 = st.columns(2)
+
+        with col_chart1:
+            st.subheader("📊 امتیاز کل شرکت‌ها")
+            if large_portfolio:
+                نمایش_نمودار("fig1-hist", scored_df[["امتیاز کل"]], رسم_توزیع_امتیاز_کل)
+            else:
+                نمایش_نمودار("fig1", scored_df[["شرکت", "امتیاز کل"]], رسم_امتیاز_کل)
+
+        with col_chart2:
+            st.subheader("💰 شاخص‌های مالی کلیدی")
+            fig2_data = scored_df[["شرکت", "ROE", "ROI", "EVA"]]
+            if large_portfolio:
+                fig2_data = برش_برترین(fig2_data, scored_df["امتیاز کل"].to_numpy(), chart_top_n)
+            نمایش_نمودار("fig2", fig2_data, رسم_شاخص_مالی)
 
-ax3.set_xticks(angles[:-1])
-ax3.set_xticklabels(['Financial', 'Efficiency', 'Growth', 'Risk Gov', 'Synergy'], fontsize=10)
-ax3.set_ylim(0, max(scored_df[metric_cols].max()) * 1.1)
-ax3.set_title("Multi-dimensional Performance Comparison", size=14, pad=20)
-ax3.legend(loc='upper right', bbox_to_anchor=(1.3, 1.0))
-ax3.grid(True)
 
-plt.tight_layout()
-st.pyplot(fig3)
+# -------------------------------------------------
+# 6. نمودار رادار (Spider Chart)
+# -------------------------------------------------
+profiler.section("6. نمودار رادار (Spider Chart)")
+with st.expander("🕸️ نمودار مقایسه چندبعدی محورها (Radar Chart)", key="section_radar", on_change="rerun") as section:
+    if section.open:
+        نمایش_نمودار(
+            "fig3",
+            سری_رادار(scored_df[["شرکت"] + axis_cols], scored_df["امتیاز کل"].to_numpy()),
+            رسم_رادار,
+        )
 
-st.divider()
 
 # -------------------------------------------------
 # 7. نمودار مقایسه محورها (Grouped Bar)
 # -------------------------------------------------
-st.subheader("📊 مقایسه تفصیلی محورها بین شرکت‌ها")
-
-fig4, ax4 = plt.subplots(figsize=(12, 6))
-x = np.arange(len(scored_df["شرکت"]))
-width = 0.15
+profiler.section("7. نمودار مقایسه محورها (Grouped Bar)")
+with st.expander("📊 مقایسه تفصیلی محورها بین شرکت‌ها", key="section_axes", on_change="rerun") as section:
+    if section.open:
+        fig4_data = scored_df[["شرکت"] + axis_cols]
+        if large_portfolio:
+            fig4_data = برش_برترین(fig4_data, scored_df["امتیاز کل"].to_numpy(), chart_top_n)
+        نمایش_نمودار("fig4", fig4_data, رسم_مقایسه_محورها)
 
-for i, col in enumerate(metric_cols):
-    ax4.bar(
-        x + i*width - (len(metric_cols)*width/2 - width/2),
-        scored_df[col],
-        width=width,
-        label=col.replace("امتیاز ", "")
-    )
-
-ax4.set_xticks(x)
-ax4.set_xticklabels(scored_df["شرکت"], rotation=15, ha='right')
-ax4.set_ylabel('Score')
-ax4.set_title('Detailed Axis Comparison Between Companies')
-ax4.legend(loc="best", fontsize=9, ncol=2)
-ax4.grid(axis='y', alpha=0.3)
-
-plt.tight_layout()
-st.pyplot(fig4)
-
-st.divider()
 
 # -------------------------------------------------
 # 8. تحلیل هزینه و بهره‌وری
 # -------------------------------------------------
-st.subheader("💼 تحلیل هزینه و بهره‌وری")
-
-col_eff1, col_eff2 = st.columns(2)
-
-with col_eff1:
-    st.subheader("هزینه/درآمد (Cost to Income)")
-    fig5, ax5 = plt.subplots(figsize=(8, 5))
-    bars = ax5.barh(scored_df["شرکت"], scored_df["Cost/Income"], 
-                    color=['green' if x < 45 else 'orange' if x < 50 else 'red' 
-                           for x in scored_df["Cost/Income"]])
-    ax5.set_xlabel('Cost/Income (%)')
-    ax5.set_title('Cost Efficiency (Lower is Better)')
-    ax5.axvline(x=45, color='green', linestyle='--', alpha=0.5, label='Excellent (<45%)')
-    ax5.axvline(x=50, color='orange', linestyle='--', alpha=0.5, label='Warning (>50%)')
-    ax5.legend()
-    ax5.grid(axis='x', alpha=0.3)
-    
-    for i, bar in enumerate(bars):
-        width = bar.get_width()
-        ax5.text(width, bar.get_y() + bar.get_height()/2, 
-                f'{width:.1f}%', ha='left', va='center', fontsize=9)
-    
-    plt.tight_layout()
-    st.pyplot(fig5)
-
-with col_eff2:
-    st.subheader("درآمد به ازای کارمند")
-    fig6, ax6 = plt.subplots(figsize=(8, 5))
-    bars = ax6.barh(scored_df["شرکت"], scored_df["درآمد به ازای کارمند"], color='#2ecc71')
-    ax6.set_xlabel('Revenue per Employee')
-    ax6.set_title('Employee Productivity')
-    ax6.grid(axis='x', alpha=0.3)
-    
-    for i, bar in enumerate(bars):
-        width = bar.get_width()
-        ax6.text(width, bar.get_y() + bar.get_height()/2, 
-                f'{int(width)}', ha='left', va='center', fontsize=9)
-    
-    plt.tight_layout()
-    st.pyplot(fig6)
+profiler.section("8. تحلیل هزینه و بهره‌وری")
+with st.expander("💼 تحلیل هزینه و بهره‌وری", key="section_efficiency", on_change="rerun") as section:
+    if section.open:
+        col_eff1, col_eff2 = st.columns(2)
+
+        with col_eff1:
+            st.subheader("هزینه/درآمد (Cost to Income)")
+            if large_portfolio:
+                نمایش_نمودار("fig5-hist", scored_df[["Cost/Income"]], رسم_توزیع_هزینه_درآمد)
+            else:
+                نمایش_نمودار("fig5", scored_df[["شرکت", "Cost/Income"]], رسم_هزینه_درآمد)
+
+        with col_eff2:
+            st.subheader("درآمد به ازای کارمند")
+            fig6_data = scored_df[["شرکت", "درآمد به ازای کارمند"]]
+            if large_portfolio:
+                fig6_data = برش_برترین(fig6_data, scored_df["امتیاز کل"].to_numpy(), chart_top_n)
+            نمایش_نمودار("fig6", fig6_data, رسم_درآمد_کارمند)
 
-st.divider()
 
 # -------------------------------------------------
 # 9. تحلیل ریسک
 # -------------------------------------------------
-st.subheader("⚠️ تحلیل ریسک و حاکمیت")
-
-col_risk1, col_risk2 = st.columns(2)
-
-with col_risk1:
-    st.subheader("نسبت بدهی به حقوق صاحبان سهام")
-    fig7, ax7 = plt.subplots(figsize=(8, 5))
-    colors_debt = ['green' if x < 0.5 else 'orange' if x < 0.7 else 'red' 
-                   for x in scored_df["Debt/Equity"]]
-    bars = ax7.barh(scored_df["شرکت"], scored_df["Debt/Equity"], color=colors_debt)
-    ax7.set_xlabel('Debt/Equity Ratio')
-    ax7.set_title('Leverage Risk Assessment')
-    ax7.axvline(x=0.5, color='green', linestyle='--', alpha=0.5, label='Safe (<0.5)')
-    ax7.axvline(x=0.7, color='red', linestyle='--', alpha=0.5, label='Risky (>0.7)')
-    ax7.legend()
-    ax7.grid(axis='x', alpha=0.3)
-    
-    for i, bar in enumerate(bars):
-        width = bar.get_width()
-        ax7.text(width, bar.get_y() + bar.get_height()/2, 
-                f'{width:.2f}', ha='left', va='center', fontsize=9)
-    
-    plt.tight_layout()
-    st.pyplot(fig7)
-
-with col_risk2:
-    st.subheader("Compliance و کنترل داخلی")
-    fig8, ax8 = plt.subplots(figsize=(8, 5))
-    x = np.arange(len(scored_df["شرکت"]))
-    width = 0.35
-    
-    ax8.bar(x - width/2, scored_df["Compliance"], width, label='Compliance', alpha=0.8)
-    ax8.bar(x + width/2, scored_df["کنترل داخلی"], width, label='Internal Control', alpha=0.8)
-    
-    ax8.set_ylabel('Score')
-    ax8.set_title('Governance Quality')
-    ax8.set_xticks(x)
-    ax8.set_xticklabels(scored_df["شرکت"], rotation=20, ha='right')
-    ax8.legend()
-    ax8.grid(axis='y', alpha=0.3)
-    ax8.set_ylim(0, 100)
-    
-    plt.tight_layout()
-    st.pyplot(fig8)
+profiler.section("9. تحلیل ریسک")
+with st.expander("⚠️ تحلیل ریسک و حاکمیت", key="section_risk", on_change="rerun") as section:
+    if section.open:
+        col_risk1, col_risk2 = st.columns(2)
+
+        with col_risk1:
+            st.subheader("نسبت بدهی به حقوق صاحبان سهام")
+            if large_portfolio:
+                نمایش_نمودار("fig7-hist", scored_df[["Debt/Equity"]], رسم_توزیع_اهرم)
+            else:
+                نمایش_نمودار("fig7", scored_df[["شرکت", "Debt/Equity"]], رسم_اهرم)
+
+        with col_risk2:
+            st.subheader("Compliance و کنترل داخلی")
+            fig8_data = scored_df[["شرکت", "Compliance", "کنترل داخلی"]]
+            if large_portfolio:
+                fig8_data = برش_برترین(fig8_data, scored_df["امتیاز کل"].to_numpy(), chart_top_n)
+            نمایش_نمودار("fig8", fig8_data, رسم_حاکمیت)
 
 st.divider()
 
 # -------------------------------------------------
 # 10. جزئیات یک شرکت انتخابی (Drilldown)
 # -------------------------------------------------
+profiler.section("10. جزئیات یک شرکت انتخابی (Drilldown)")
 st.subheader("🔍 تحلیل Drilldown یک شرکت")
 
-selected_company = st.selectbox(
-    "شرکت مورد بررسی:",
-    scored_df["شرکت"].tolist()
-)
+# نمایه نام -> سطر یک بار برای هر نسخه داده ساخته می‌شود (مشترک بین نشست‌ها)؛ سطر خام
+# و امتیازدار هر دو با همان شماره سطر و بدون مقایسه روی کل ستون نام خوانده می‌شوند.
+@st.cache_resource(max_entries=SHARED_DATA_ENTRIES, show_spinner=False)
+def نمایه_شرکت_ها(data_version, _names):
+    return CompanyIndex(_names)
+
+
+company_index = نمایه_شرکت_ها(st.session_state["data_version"], scored_df["شرکت"])
+
+if len(company_index.duplicates):
+    st.warning(
+        f"⚠️ {len(company_index.duplicates)} نام شرکت تکراری است و هر تکرار با شماره سطرش جدا نمایش داده می‌شود: "
+        + "، ".join(company_index.duplicates.index[:10].astype(str))
+    )
+
+company_options = list(company_index.labels)
+if len(company_index) > DRILLDOWN_OPTIONS_MAX:
+    company_query = st.text_input("جستجوی شرکت (نام یا بخشی از آن):", key="drilldown_search")
+    company_options = company_index.search(company_query, DRILLDOWN_OPTIONS_MAX)
+    if not company_options:
+        st.info("شرکتی با این عبارت پیدا نشد.")
+        company_options = company_index.search("", DRILLDOWN_OPTIONS_MAX)
 
-row = scored_df[scored_df["شرکت"] == selected_company].iloc[0]
+selected_label = st.selectbox("شرکت مورد بررسی:", company_options)
+company_pos = company_index.position(selected_label)
+selected_company = scored_df["شرکت"].iloc[company_pos]
+
+row = گسترش_فشرده(scored_df.iloc[[company_pos]]).iloc[0]
 
 # نمایش امتیازها
-st.markdown(f"### 🏅 امتیازهای {selected_company}")
+st.markdown(f"### 🏅 امتیازهای {selected_label}")
 col_score1, col_score2, col_score3, col_score4, col_score5 = st.columns(5)
 col_score1.metric("امتیاز مالی", f"{round(row['امتیاز مالی'], 1)}")
 col_score2.metric("امتیاز بهره‌وری", f"{round(row['امتیاز بهره‌وری'], 1)}")
 col_score3.metric("امتیاز رشد", f"{round(row['امتیاز رشد پایدار'], 1)}")
 col_score4.metric("امتیاز ریسک", f"{round(row['امتیاز ریسک و حاکمیت'], 1)}")
-col_score5.metric("امتیاز کل", f"{round(row['امتیاز کل'], 1)}", delta=f"رتبه {int(row['رتبه'])}")
+col_score5.metric(
+    "امتیاز کل",
+    f"{round(row['امتیاز کل'], 1)}",
+    delta=None if pd.isna(row["رتبه"]) else f"رتبه {int(row['رتبه'])}",
+)
 
-st.markdown(f"### 📊 شاخص‌های کلیدی {selected_company}")
+st.markdown(f"### 📊 شاخص‌های کلیدی {selected_label}")
 col_kpi1, col_kpi2, col_kpi3, col_kpi4, col_kpi5, col_kpi6 = st.columns(6)
 col_kpi1.metric("ROE", f"{row['ROE']}%")
 col_kpi2.metric("ROI", f"{row['ROI']}%")
@@ -526,29 +821,37 @@ col_kpi4.metric("Cost/Income", f"{row['Cost/Income']}%")
 col_kpi5.metric("D/E Ratio", f"{row['Debt/Equity']}")
 col_kpi6.metric("NPS", f"{row['رضایت مشتری (NPS)']}")
 
+
+# صدک شرکت در هر شاخص: برای هر شاخص فقط یک جستجوی دودویی در آرایه مرتب همتایان
+with st.expander("📐 جایگاه در میان همتایان", key="section_peer_position", on_change="rerun") as section:
+    if section.open:
+        st.markdown(f"### 📐 جایگاه {selected_label} در میان همتایان")
+        company_percentiles = peer_index.percentiles(
+            scored_df.iloc[[company_pos]], by_group=peer_by_sector
+        ).iloc[0]
+        نمایش_نمودار("peer-percentile", company_percentiles.to_frame(), lambda d: رسم_صدک(d.iloc[:, 0]))
+
+# روند دوره‌ای: فقط سطرهای همین شرکت از ایندکس تاریخچه خوانده می‌شوند
+with st.expander("📈 روند دوره‌ای", key="section_trend", on_change="rerun") as section:
+    if section.open:
+        st.markdown(f"### 📈 روند دوره‌ای {selected_label}")
+        trend_metrics = st.multiselect("شاخص‌های روند", TREND_METRICS, default=["امتیاز کل", "Cost/Income"])
+        company_history = history_store.company_history(selected_company, trend_metrics)
+        if company_history.empty:
+            st.info("هنوز دوره‌ای برای این شرکت ذخیره نشده است؛ از نوار کناری امتیازهای فعلی را ذخیره کنید.")
+        elif trend_metrics:
+            نمایش_نمودار("trend", company_history, رسم_روند)
+
 # جدول جزئیات کامل
-st.markdown(f"### 📋 جزئیات کامل شاخص‌های {selected_company}")
-company_detail = edited_df[edited_df["شرکت"] == selected_company].T
+st.markdown(f"### 📋 جزئیات کامل شاخص‌های {selected_label}")
+company_detail = گسترش_فشرده(edited_df.iloc[[company_pos]]).T
 company_detail.columns = ['مقدار']
 st.dataframe(company_detail, use_container_width=True)
 
 # توصیه‌های بهبود
-st.markdown(f"### 💡 توصیه‌های بهبود برای {selected_company}")
-
-recommendations = []
-
-if row["Cost/Income"] > 45:
-    recommendations.append("🔴 نسبت هزینه به درآمد بالاست. کاهش هزینه‌های عملیاتی توصیه می‌شود.")
-if row["Debt/Equity"] > 0.6:
-    recommendations.append("🔴 نسبت بدهی به حقوق صاحبان سهام بالاست. کاهش اهرم مالی ضروری است.")
-if row["رضایت مشتری (NPS)"] < 85:
-    recommendations.append("🟡 رضایت مشتری قابل بهبود است. تمرکز بر کیفیت خدمات توصیه می‌شود.")
-if row["نوآوری مالی"] < 4:
-    recommendations.append("🟡 سرمایه‌گذاری بیشتر در نوآوری و فناوری پیشنهاد می‌شود.")
-if row["ROE"] > 20:
-    recommendations.append("🟢 عملکرد مالی عالی! حفظ این روند ضروری است.")
-if row["امتیاز بهره‌وری"] > 80:
-    recommendations.append("🟢 بهره‌وری بالا! این مزیت رقابتی را حفظ کنید.")
+st.markdown(f"### 💡 توصیه‌های بهبود برای {selected_label}")
+
+recommendations = توصیه_ها(row, active_rules)
 
 if recommendations:
     for rec in recommendations:
@@ -558,9 +861,109 @@ else:
 
 st.divider()
 
+# -------------------------------------------------
+# 10.1. جدول هشدارهای کل هلدینگ
+# همه قواعد یک‌جا به صورت ماسک روی کل scored_df ارزیابی می‌شوند.
+# -------------------------------------------------
+profiler.section("10.1. جدول هشدارهای کل هلدینگ")
+st.subheader("🚨 هشدارها و توصیه‌های همه شرکت‌ها")
+
+alerts = جدول_هشدار(scored_df, active_rules)
+severity_counts = alerts["شدت"].value_counts()
+for col_sev, severity in zip(st.columns(len(SEVERITIES)), SEVERITIES):
+    col_sev.metric(severity, f"{severity_counts.get(severity, 0):,}")
+
+col_filter_sev, col_filter_rule, col_filter_company = st.columns(3)
+alert_severities = col_filter_sev.multiselect("شدت", SEVERITIES, default=SEVERITIES[:2])
+alert_rules = col_filter_rule.multiselect("قاعده", list(active_rules))
+alert_search = col_filter_company.text_input("جستجوی شرکت")
+
+alert_mask = alerts["شدت"].isin(alert_severities).to_numpy()
+if alert_rules:
+    alert_mask = alert_mask & alerts["قاعده"].isin(alert_rules).to_numpy()
+if alert_search:
+    alert_mask = alert_mask & alerts["شرکت"].str.contains(alert_search, regex=False).to_numpy()
+
+st.dataframe(
+    alerts.loc[alert_mask, ["شرکت", "قاعده", "شاخص", "مقدار", "آستانه", "شدت"]].round(2),
+    use_container_width=True,
+    hide_index=True,
+)
+st.caption(f"{alert_mask.sum():,} هشدار از {len(alerts):,}")
+
+st.divider()
+
+# -------------------------------------------------
+# 10.2. ساختار سلسله‌مراتبی هلدینگ
+# جمع‌ها، امتیاز و رتبه در والد هر گره در مکعب تجمیع (analytics.RollupCube)
+# نگه داشته می‌شوند؛ ویرایش یک برگ فقط مسیر آن تا ریشه را به‌روز می‌کند و
+# باز کردن هر گره فقط سطرهای فرزندانش را می‌خواند.
+# -------------------------------------------------
+profiler.section("10.2. ساختار سلسله‌مراتبی هلدینگ")
+st.subheader("🌳 ساختار سلسله‌مراتبی هلدینگ")
+
+
+def مکعب_تجمیع(df, axis_weights):
+    structure = اثر_انگشت_داده(df[["شرکت", PARENT_COL]])
+    leaf_data = df[[*axis_cols, *([AUM_COL] if AUM_COL in df.columns else [])]]
+    row_hashes = هش_سطرها(leaf_data)
+    axes = leaf_data[axis_cols].to_numpy(dtype=np.float64)
+    weights = leaf_data[AUM_COL].to_numpy(dtype=np.float64) if AUM_COL in df.columns else np.ones(len(df))
+
+    state = st.session_state.get("cube_state")
+    if state is None or state["structure"] != structure:
+        cube = RollupCube(df["شرکت"], df[PARENT_COL], axes, weights, axis_weights)
+    else:
+        cube = state["cube"].set_axis_weights(axis_weights)
+        changed = np.flatnonzero(state["hashes"] != row_hashes)
+        if len(changed):
+            cube.update(changed, axes[changed], weights[changed])
+    st.session_state["cube_state"] = {"structure": structure, "hashes": row_hashes, "cube": cube}
+    return cube
+
+
+if PARENT_COL not in scored_df.columns:
+    st.info(
+        f"برای نمای درختی، ستون «{PARENT_COL}» (و در صورت تمایل «{AUM_COL}» برای میانگین وزنی) "
+        "را در فایل ورودی اضافه کنید."
+    )
+else:
+    try:
+        cube = مکعب_تجمیع(scored_df, current_weights)
+    except ValueError as e:
+        st.error(f"خطا در ساختار سلسله‌مراتب: {e}")
+    else:
+        node_cols = ["سطح", "تعداد زیرمجموعه", "جمع وزن", *axis_cols, "امتیاز کل", "امتیاز کل وزنی", "رتبه در والد"]
+
+        # هر سطح یک انتخابگر؛ انتخاب «—» پیمایش را در همان سطح نگه می‌دارد
+        node = None
+        level = 0
+        while True:
+            children = cube.children_table(axis_cols, node).set_index("گره")
+            if children.empty:
+                break
+            st.dataframe(children[node_cols].round(2), use_container_width=True)
+            choice = st.selectbox(
+                "ریشه‌ها" if node is None else f"زیرمجموعه‌های {node}",
+                ["—", *children.index],
+                key=f"tree_{level}_{node}",
+            )
+            if choice == "—":
+                break
+            node = choice
+            level += 1
+            info = children.loc[node]
+            col_node1, col_node2, col_node3 = st.columns(3)
+            col_node1.metric(f"امتیاز کل وزنی {node}", f"{info['امتیاز کل وزنی']:.1f}")
+            col_node2.metric("تعداد زیرمجموعه", f"{info['تعداد زیرمجموعه']:,}")
+            col_node3.metric("رتبه در والد", "-" if pd.isna(info["رتبه در والد"]) else int(info["رتبه در والد"]))
+
+st.divider()
+
 # -------------------------------------------------
 # 11. خلاصه نهایی و توصیه‌های کلی
 # -------------------------------------------------
+profiler.section("11. خلاصه نهایی و توصیه‌های کلی")
 st.subheader("📝 خلاصه تحلیل و توصیه‌های کلی هلدینگ")
 
 col_summary1, col_summary2 = st.columns(2)
@@ -604,164 +1007,167 @@ st.divider()
 # -------------------------------------------------
 # 12. ماتریس عملکرد (Performance Matrix)
 # -------------------------------------------------
-st.subheader("🎯 ماتریس عملکرد: سودآوری vs بهره‌وری")
-
-fig9, ax9 = plt.subplots(figsize=(10, 7))
-
-# رسم نقاط
-for idx, row in scored_df.iterrows():
-    ax9.scatter(row["امتیاز بهره‌وری"], row["امتیاز مالی"], 
-               s=row["سهم بازار"]*50, alpha=0.6, 
-               label=row["شرکت"])
-    ax9.annotate(row["شرکت"], 
-                (row["امتیاز بهره‌وری"], row["امتیاز مالی"]),
-                xytext=(5, 5), textcoords='offset points', fontsize=9)
-
-# خطوط میانگین
-avg_eff = scored_df["امتیاز بهره‌وری"].mean()
-avg_fin = scored_df["امتیاز مالی"].mean()
-
-ax9.axhline(y=avg_fin, color='red', linestyle='--', alpha=0.5, label='Avg Financial')
-ax9.axvline(x=avg_eff, color='blue', linestyle='--', alpha=0.5, label='Avg Efficiency')
-
-# برچسب‌های چهار ربع
-ax9.text(ax9.get_xlim()[1]*0.95, ax9.get_ylim()[1]*0.95, 'Stars', 
-        ha='right', va='top', fontsize=12, weight='bold', 
-        bbox=dict(boxstyle='round', facecolor='lightgreen', alpha=0.5))
-ax9.text(ax9.get_xlim()[0]*1.05, ax9.get_ylim()[1]*0.95, 'Cash Cows', 
-        ha='left', va='top', fontsize=12, weight='bold',
-        bbox=dict(boxstyle='round', facecolor='lightyellow', alpha=0.5))
-ax9.text(ax9.get_xlim()[1]*0.95, ax9.get_ylim()[0]*1.05, 'Question Marks', 
-        ha='right', va='bottom', fontsize=12, weight='bold',
-        bbox=dict(boxstyle='round', facecolor='lightcoral', alpha=0.5))
-ax9.text(ax9.get_xlim()[0]*1.05, ax9.get_ylim()[0]*1.05, 'Dogs', 
-        ha='left', va='bottom', fontsize=12, weight='bold',
-        bbox=dict(boxstyle='round', facecolor='lightgray', alpha=0.5))
-
-ax9.set_xlabel('Efficiency Score', fontsize=11)
-ax9.set_ylabel('Financial Score', fontsize=11)
-ax9.set_title('Performance Matrix (Bubble size = Market Share)', fontsize=13)
-ax9.grid(True, alpha=0.3)
-ax9.legend(loc='upper left', fontsize=9)
-
-plt.tight_layout()
-st.pyplot(fig9)
-
-st.info("""
-**راهنمای ماتریس:**
-- **Stars (ستاره‌ها):** سودآوری و بهره‌وری بالا - حفظ و سرمایه‌گذاری
-- **Cash Cows (گاوهای شیرده):** سودآوری بالا، بهره‌وری متوسط - بهینه‌سازی عملیات
-- **Question Marks (علامت سوال):** بهره‌وری بالا، سودآوری پایین - بررسی استراتژی
-- **Dogs (سگ‌ها):** هر دو پایین - نیاز به بازسازی یا خروج
-""")
+profiler.section("12. ماتریس عملکرد (Performance Matrix)")
+with st.expander("🎯 ماتریس عملکرد: سودآوری vs بهره‌وری", key="section_matrix", on_change="rerun") as section:
+    if section.open:
+        if large_portfolio:
+            نمایش_نمودار("fig9-hexbin", scored_df[["امتیاز بهره‌وری", "امتیاز مالی"]], رسم_چگالی_ماتریس_عملکرد)
+        else:
+            نمایش_نمودار("fig9", scored_df[["شرکت", "امتیاز بهره‌وری", "امتیاز مالی", "سهم بازار"]], رسم_ماتریس_عملکرد)
+
+        st.info("""
+        **راهنمای ماتریس:**
+        - **Stars (ستاره‌ها):** سودآوری و بهره‌وری بالا - حفظ و سرمایه‌گذاری
+        - **Cash Cows (گاوهای شیرده):** سودآوری بالا، بهره‌وری متوسط - بهینه‌سازی عملیات
+        - **Question Marks (علامت سوال):** بهره‌وری بالا، سودآوری پایین - بررسی استراتژی
+        - **Dogs (سگ‌ها):** هر دو پایین - نیاز به بازسازی یا خروج
+        """)
+
+        # تعداد شرکت‌ها در هر ربع (برداری، روی کل پورتفوی)
+        quadrant = ربع_عملکرد(scored_df["امتیاز بهره‌وری"].to_numpy(), scored_df["امتیاز مالی"].to_numpy())
+        quadrant_counts = np.bincount(quadrant, minlength=len(QUADRANTS))
+        quadrant_table = pd.DataFrame({
+            "ربع": QUADRANTS,
+            "تعداد شرکت": quadrant_counts,
+            "درصد": 100 * quadrant_counts / max(len(scored_df), 1),
+            "میانگین امتیاز کل": np.bincount(
+                quadrant, weights=scored_df["امتیاز کل"].to_numpy(), minlength=len(QUADRANTS)
+            ) / np.maximum(quadrant_counts, 1),
+        }).iloc[::-1]
+
+        st.dataframe(quadrant_table.round(1), use_container_width=True, hide_index=True)
 
-st.divider()
 
 # -------------------------------------------------
 # 13. تحلیل همبستگی
 # -------------------------------------------------
-st.subheader("🔗 تحلیل همبستگی شاخص‌ها")
-
-correlation_metrics = [
-    "ROE", "ROI", "EVA", "Cost/Income", "درآمد به ازای کارمند",
-    "رضایت مشتری (NPS)", "Compliance", "Debt/Equity"
-]
+profiler.section("13. تحلیل همبستگی")
+
+def همبستگی_افزایشی(df, columns):
+    # انباشتگر کوواریانس بین rerunها نگه داشته می‌شود؛ سطرهای حذف/ویرایش‌شده
+    # از آن کم و سطرهای تازه اضافه می‌شوند. داده جدید با تکه‌های ثابت انباشته می‌شود.
+    values = np.column_stack([مقادیر_float64(df[col]) for col in columns])
+    row_hashes = pd.util.hash_pandas_object(pd.DataFrame(values), index=False).to_numpy()
+    state = st.session_state.get("corr_state")
+
+    if state is None or state["columns"] != columns:
+        acc = StreamingCorrelation(columns)
+        for start in range(0, len(values), DEFAULT_CHUNKSIZE):
+            acc.add(values[start:start + DEFAULT_CHUNKSIZE])
+    else:
+        acc = state["acc"].replace(state["hashes"], state["values"], row_hashes, values)
 
-corr_df = edited_df[correlation_metrics].corr()
+    st.session_state["corr_state"] = {"columns": columns, "hashes": row_hashes, "values": values, "acc": acc}
+    return acc.corr()
 
-fig10, ax10 = plt.subplots(figsize=(10, 8))
-im = ax10.imshow(corr_df, cmap='RdYlGn', aspect='auto', vmin=-1, vmax=1)
 
-ax10.set_xticks(np.arange(len(correlation_metrics)))
-ax10.set_yticks(np.arange(len(correlation_metrics)))
-ax10.set_xticklabels(correlation_metrics, rotation=45, ha='right', fontsize=9)
-ax10.set_yticklabels(correlation_metrics, fontsize=9)
+with st.expander("🔗 تحلیل همبستگی شاخص‌ها", key="section_correlation", on_change="rerun") as section:
+    if section.open:
+        correlation_metrics = [
+            "ROE", "ROI", "EVA", "Cost/Income", "درآمد به ازای کارمند",
+            "رضایت مشتری (NPS)", "Compliance", "Debt/Equity"
+        ]
 
-# افزودن مقادیر
-for i in range(len(correlation_metrics)):
-    for j in range(len(correlation_metrics)):
-        text = ax10.text(j, i, f'{corr_df.iloc[i, j]:.2f}',
-                        ha="center", va="center", color="black", fontsize=8)
+        if st.checkbox("همبستگی بین همه شاخص‌های KPI", value=False):
+            correlation_metrics = [col for col in KPI_SCHEMA if col in edited_df.columns]
 
-ax10.set_title("Correlation Matrix of Key Metrics", fontsize=13, pad=20)
-plt.colorbar(im, ax=ax10)
-plt.tight_layout()
-st.pyplot(fig10)
+        corr_df = همبستگی_افزایشی(edited_df, correlation_metrics)
+        نمایش_نمودار("fig10", corr_df, رسم_همبستگی)
 
-st.divider()
 
 # -------------------------------------------------
 # 14. مقایسه با بنچمارک
 # -------------------------------------------------
-st.subheader("📏 مقایسه با بنچمارک صنعت")
-
-benchmark_data = {
-    "ROE": 18,
-    "ROI": 15,
-    "Cost/Income": 42,
-    "رضایت مشتری (NPS)": 85,
-    "Compliance": 88,
-    "Debt/Equity": 0.55
-}
-
-st.write("**بنچمارک‌های استاندارد صنعت مالی:**")
-
-col_bench1, col_bench2, col_bench3 = st.columns(3)
-
-for idx, (key, benchmark_value) in enumerate(benchmark_data.items()):
-    avg_value = scored_df[key].mean()
-    
-    if idx % 3 == 0:
-        col = col_bench1
-    elif idx % 3 == 1:
-        col = col_bench2
-    else:
-        col = col_bench3
-    
-    # محاسبه انحراف از بنچمارک
-    if key in ["Cost/Income", "Debt/Equity"]:
-        # برای این‌ها کمتر بودن بهتر است
-        deviation = benchmark_value - avg_value
-        status = "✅" if deviation >= 0 else "⚠️"
-    else:
-        # برای بقیه بیشتر بودن بهتر است
-        deviation = avg_value - benchmark_value
-        status = "✅" if deviation >= 0 else "⚠️"
-    
-    col.metric(
-        label=key,
-        value=f"{avg_value:.1f}",
-        delta=f"{deviation:+.1f} vs benchmark ({benchmark_value})",
-        delta_color="normal" if deviation >= 0 else "inverse"
-    )
+profiler.section("14. مقایسه با بنچمارک")
+with st.expander("📏 مقایسه با بنچمارک صنعت", key="section_benchmark", on_change="rerun") as section:
+    if section.open:
+        benchmark_data = {
+            "ROE": 18,
+            "ROI": 15,
+            "Cost/Income": 42,
+            "رضایت مشتری (NPS)": 85,
+            "Compliance": 88,
+            "Debt/Equity": 0.55
+        }
+
+        st.write("**بنچمارک‌های استاندارد صنعت مالی:**")
+
+        col_bench1, col_bench2, col_bench3 = st.columns(3)
+
+        for idx, (key, benchmark_value) in enumerate(benchmark_data.items()):
+            avg_value = scored_df[key].mean()
+
+            if idx % 3 == 0:
+                col = col_bench1
+            elif idx % 3 == 1:
+                col = col_bench2
+            else:
+                col = col_bench3
+
+            # محاسبه انحراف از بنچمارک
+            if key in ["Cost/Income", "Debt/Equity"]:
+                # برای این‌ها کمتر بودن بهتر است
+                deviation = benchmark_value - avg_value
+                status = "✅" if deviation >= 0 else "⚠️"
+            else:
+                # برای بقیه بیشتر بودن بهتر است
+                deviation = avg_value - benchmark_value
+                status = "✅" if deviation >= 0 else "⚠️"
+
+            col.metric(
+                label=key,
+                value=f"{avg_value:.1f}",
+                delta=f"{deviation:+.1f} vs benchmark ({benchmark_value})",
+                delta_color="normal" if deviation >= 0 else "inverse"
+            )
+
+        st.markdown("#### صدک هر شرکت در میان همتایان")
+        st.caption(
+            f"{len(peer_df):,} همتا"
+            + ("، نسبت به همتایان همان زیربخش" if peer_by_sector else "")
+            + "؛ برای " + "، ".join(sorted(LOWER_IS_BETTER)) + " مقدار کمتر صدک بالاتری می‌گیرد."
+        )
+        peer_table = peer_index.percentiles(scored_df, by_group=peer_by_sector).round(1)
+        peer_table.insert(0, "شرکت", scored_df["شرکت"].to_numpy())
+        st.dataframe(peer_table, use_container_width=True, hide_index=True)
 
 st.divider()
 
 # -------------------------------------------------
 # 15. گزارش PDF/Excel Export
 # -------------------------------------------------
+profiler.section("15. گزارش PDF/Excel Export")
 st.subheader("📥 دانلود داده‌ها")
 
-col_export1, col_export2 = st.columns(2)
+# خروجی فقط وقتی کاربر روی دانلود می‌زند ساخته می‌شود (تابع data در نخ جداگانه اجرا می‌شود)
+# و با نسخه امتیازها و قالب در کش مشترک نگه داشته می‌شود.
+EXPORT_LABELS = {
+    "csv": "CSV",
+    "excel": "Excel",
+    "parquet": "Parquet",
+    "arrow": "Arrow IPC",
+    "json": "JSON",
+}
 
-with col_export1:
-    # تبدیل به CSV
-    csv = scored_df.to_csv(index=False).encode('utf-8-sig')
-    st.download_button(
-        label="📊 دانلود گزارش کامل (CSV)",
-        data=csv,
-        file_name="financial_holding_report.csv",
-        mime="text/csv"
-    )
 
-with col_export2:
-    # تبدیل به JSON
-    json_data = scored_df.to_json(orient='records', force_ascii=False).encode('utf-8')
+def ساخت_خروجی(df, fmt, version):
+    def build():
+        with profiler.measure(f"15. ساخت خروجی {fmt}"):
+            return بایت_های_خروجی(df, fmt)
+    return lambda: shared_cache["exports"].get_or_compute((version, fmt), build, len)
+
+
+col_export_format, col_export_button = st.columns([1, 2])
+export_format = col_export_format.selectbox(
+    "قالب خروجی", list(EXPORT_LABELS), format_func=EXPORT_LABELS.get
+)
+export_ext, export_mime = EXPORT_FORMATS[export_format]
+with col_export_button:
     st.download_button(
-        label="📋 دانلود داده‌ها (JSON)",
-        data=json_data,
-        file_name="financial_holding_data.json",
-        mime="application/json"
+        label=f"📊 دانلود گزارش کامل ({EXPORT_LABELS[export_format]})",
+        data=ساخت_خروجی(scored_df, export_format, score_version),
+        file_name="financial_holding_report" + export_ext,
+        mime=export_mime,
     )
 
 st.divider()
@@ -769,6 +1175,7 @@ st.divider()
 # -------------------------------------------------
 # 16. Footer و اطلاعات تکمیلی
 # -------------------------------------------------
+profiler.section("16. Footer و اطلاعات تکمیلی")
 st.markdown("---")
 st.markdown("""
 ### 📌 درباره این داشبورد
@@ -805,4 +1212,51 @@ st.markdown("""
 
 st.caption("💡 برای سوالات یا پشتیبانی، با تیم توسعه تماس بگیرید.")
 
+# -------------------------------------------------
+# 17. پنل پروفایل بخش‌ها (مدیریت)
+# زمان دیواری، CPU و بیشینه حافظه هر بخش در هر اجرا در بافر حلقوی
+# پروفایلر (profiling.py) ثبت می‌شود؛ پنل فقط با ?admin=1 نمایش داده می‌شود.
+# -------------------------------------------------
+profiler.end_run()
+
+if profile_admin:
+    st.divider()
+    st.subheader("🛠️ پروفایل بخش‌ها")
+    st.toggle("ردیابی بیشینه حافظه (tracemalloc؛ اجراها را کندتر می‌کند)", key="profile_memory")
+
+    profile_records = profiler.records()
+    st.caption(
+        f"{len(profile_records):,} رکورد در بافر (سقف {PROFILE_BUFFER_SIZE:,}؛ قدیمی‌ترها کنار گذاشته می‌شوند)"
+    )
+    st.dataframe(profiler.summary().round(1), use_container_width=True, hide_index=True)
+
+    st.markdown("#### آخرین اجرای این نشست")
+    last_run = pd.DataFrame([r for r in profile_records if r["run"] == profile_run])
+    if not last_run.empty:
+        st.dataframe(pd.DataFrame({
+            "بخش": last_run["section"],
+            "wall (ms)": last_run["wall_s"] * 1e3,
+            "cpu (ms)": last_run["cpu_s"] * 1e3,
+            "حافظه (MB)": last_run["peak_bytes"].astype(np.float64) / 2**20,
+        }).round(1), use_container_width=True, hide_index=True)
+
+    st.markdown("#### کش‌های مشترک بین نشست‌ها")
+    cache_stats = pd.DataFrame([{"کش": name, **cache.stats()} for name, cache in shared_cache.items()])
+    st.dataframe(pd.DataFrame({
+        "کش": cache_stats["کش"],
+        "تعداد": cache_stats["entries"],
+        "حجم (MB)": cache_stats["nbytes"] / 2**20,
+        "سقف (MB)": cache_stats["max_bytes"] / 2**20,
+        "اصابت": cache_stats["hits"],
+        "محاسبه": cache_stats["misses"],
+    }).round(1), use_container_width=True, hide_index=True)
+
+    col_profile_export, col_profile_clear = st.columns(2)
+    col_profile_export.download_button(
+        "⬇️ دانلود رکوردها (JSON)", data=profiler.to_json,
+        file_name="section_profile.json", mime="application/json",
+    )
+    if col_profile_clear.button("پاک کردن بافر"):
+        profiler.clear()
+
 # پایان کد
@@ -0,0 +1,140 @@
+"""
+نوشتن جدول‌های امتیاز در قالب‌های خروجی (CSV، JSON، Parquet، Arrow IPC، Excel).
+
+هر قالب تکه‌به‌تکه نوشته می‌شود، پس حافظه اضافه فقط به اندازه یک تکه است
+و نه یک رشته یا جدول میانی از کل داده. مقصد می‌تواند مسیر فایل یا هر شیء
+فایل‌مانند باینری باشد.
+"""
+
+import io
+import os
+
+from ingest import گسترش_فشرده
+
+EXPORT_CHUNKSIZE = 50_000
+# حداکثر سطر داده در هر شیت اکسل (یک سطر برای سرستون‌ها کنار گذاشته می‌شود)
+EXCEL_MAX_ROWS = 1_048_575
+
+# قالب -> (پسوند فایل، نوع MIME)
+EXPORT_FORMATS = {
+    "csv": (".csv", "text/csv"),
+    "json": (".json", "application/json"),
+    "parquet": (".parquet", "application/vnd.apache.parquet"),
+    "arrow": (".arrow", "application/vnd.apache.arrow.file"),
+    "excel": (".xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+}
+
+_پسوندها = {ext: fmt for fmt, (ext, _) in EXPORT_FORMATS.items()}
+_پسوندها.update({".pq": "parquet", ".feather": "arrow", ".ipc": "arrow", ".txt": "csv"})
+
+
+def قالب_خروجی(name):
+    ext = os.path.splitext(name)[1].lower()
+    if ext not in _پسوندها:
+        raise ValueError(f"unsupported output format: {name}")
+    return _پسوندها[ext]
+
+
+class ExportWriter:
+    # write(df) را برای هر تکه صدا بزنید و در پایان close()؛ همه تکه‌ها باید ستون‌های یکسان داشته باشند
+
+    def __init__(self, sink, fmt=None):
+        self.format = fmt or قالب_خروجی(sink)
+        if self.format not in EXPORT_FORMATS:
+            raise ValueError(f"unsupported output format: {self.format}")
+        self._own = isinstance(sink, (str, os.PathLike))
+        self._sink = sink
+        self._file = open(sink, "wb") if self._own and self.format in ("csv", "json") else sink
+        self._writer = None
+        self._started = False
+        self._sheet = None
+        self._sheet_rows = 0
+        self._json_rows = False
+        self._schema = None
+
+    def write(self, df):
+        getattr(self, "_write_" + self.format)(df)
+        self._started = True
+
+    def _write_csv(self, df):
+        text = df.to_csv(index=False, header=not self._started)
+        self._file.write(text.encode("utf-8" if self._started else "utf-8-sig"))
+
+    def _write_json(self, df):
+        # آرایه رکوردها؛ هر تکه بدون براکت‌های بیرونی‌اش به آرایه اضافه می‌شود.
+        # ستون‌های float32 با مقدار ورودی‌شان نوشته می‌شوند، نه با ارقام اضافه float64
+        body = گسترش_فشرده(df).to_json(orient="records", force_ascii=False)[1:-1]
+        if not self._started:
+            self._file.write(b"[")
+        if body:
+            self._file.write((("," if self._json_rows else "") + body).encode("utf-8"))
+            self._json_rows = True
+
+    def _arrow_table(self, df):
+        import pyarrow as pa
+
+        # تکه‌های بعدی به طرح تکه اول تبدیل می‌شوند (مثلاً ستونی که در یک تکه تمام خالی است)
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if self._schema is None:
+            self._schema = table.schema
+        return table.cast(self._schema)
+
+    def _write_parquet(self, df):
+        import pyarrow.parquet as pq
+
+        table = self._arrow_table(df)
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self._sink, table.schema)
+        self._writer.write_table(table)
+
+    def _write_arrow(self, df):
+        import pyarrow as pa
+
+        table = self._arrow_table(df)
+        if self._writer is None:
+            self._writer = pa.ipc.new_file(self._sink, table.schema)
+        self._writer.write_table(table)
+
+    def _write_excel(self, df):
+        import openpyxl
+
+        if self._writer is None:
+            self._writer = openpyxl.Workbook(write_only=True)
+        header = [str(col) for col in df.columns]
+        if self._sheet is None:
+            self._new_sheet(header)
+        df = گسترش_فشرده(df)
+        for row in df.astype(object).where(df.notna(), None).to_numpy().tolist():
+            if self._sheet_rows == EXCEL_MAX_ROWS:
+                self._new_sheet(header)
+            self._sheet.append(row)
+            self._sheet_rows += 1
+
+    def _new_sheet(self, header):
+        # شیت راست‌به‌چپ با سرستون‌های فارسی؛ بعد از سقف سطر اکسل شیت بعدی شروع می‌شود
+        self._sheet = self._writer.create_sheet(f"Sheet{len(self._writer.worksheets) + 1}")
+        self._sheet.sheet_view.rightToLeft = True
+        self._sheet.append(header)
+        self._sheet_rows = 0
+
+    def close(self):
+        if self.format == "json":
+            self._file.write(b"]" if self._started else b"[]")
+        elif self.format == "excel" and self._writer is not None:
+            self._writer.save(self._sink)
+        elif self._writer is not None:
+            self._writer.close()
+        if self._own and self._file is not self._sink:
+            self._file.close()
+
+
+def بایت_های_خروجی(df, fmt, chunksize=EXPORT_CHUNKSIZE):
+    # کل خروجی در حافظه برای دکمه دانلود؛ سریال‌سازی تکه‌ای است
+    buf = io.BytesIO()
+    writer = ExportWriter(buf, fmt)
+    try:
+        for start in range(0, max(len(df), 1), chunksize):
+            writer.write(df.iloc[start:start + chunksize])
+    finally:
+        writer.close()
+    return buf.getvalue()
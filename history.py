@@ -0,0 +1,91 @@
+"""
+تاریخچه دوره‌ای امتیازها و KPIها در یک فایل SQLite محلی.
+
+جدول با کلید (شرکت، دوره) و بدون rowid ذخیره می‌شود، پس سطرهای هر شرکت
+کنار هم روی دیسک هستند و تاریخچه یک شرکت با یک پیمایش بازه‌ای از ایندکس
+خوانده می‌شود. ذخیره دوباره یک دوره سطرهای همان دوره را به‌روز می‌کند؛
+جدولی که نام شرکت تکراری دارد ذخیره نمی‌شود.
+"""
+
+import sqlite3
+import threading
+
+import numpy as np
+import pandas as pd
+
+from ingest import ID_COL, KPI_SCHEMA, گسترش_فشرده
+from scoring import axis_cols
+
+SNAPSHOT_COLUMNS = [*axis_cols, "امتیاز کل", "رتبه", *KPI_SCHEMA]
+
+
+def _نام(column):
+    return '"' + column.replace('"', '""') + '"'
+
+
+class HistoryStore:
+    # یک اتصال مشترک بین نشست‌ها؛ نوشتن و خواندن با قفل سریال می‌شوند
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._con = sqlite3.connect(path, check_same_thread=False)
+        self._con.execute("PRAGMA journal_mode=WAL")
+        columns = "".join(f", {_نام(col)} REAL" for col in SNAPSHOT_COLUMNS)
+        with self._con:
+            self._con.execute(
+                "CREATE TABLE IF NOT EXISTS snapshots ("
+                f"company TEXT NOT NULL, period TEXT NOT NULL{columns}, "
+                "PRIMARY KEY (company, period)) WITHOUT ROWID"
+            )
+            self._con.execute("CREATE INDEX IF NOT EXISTS snapshots_period ON snapshots (period)")
+            # فایل‌های قدیمی‌تر ممکن است ستون‌های تازه را نداشته باشند
+            existing = {r[1] for r in self._con.execute("PRAGMA table_info(snapshots)")}
+            for col in SNAPSHOT_COLUMNS:
+                if col not in existing:
+                    self._con.execute(f"ALTER TABLE snapshots ADD COLUMN {_نام(col)} REAL")
+
+    def append(self, df, period):
+        # df: جدول امتیاز (scored_df)؛ ستون‌هایی که در df نیستند خالی ذخیره می‌شوند
+        columns = [col for col in SNAPSHOT_COLUMNS if col in df.columns]
+        # هر شرکت در یک دوره یک سطر دارد؛ نام تکراری بی‌صدا روی سطر قبلی نوشته می‌شد
+        companies = df[ID_COL].astype(str)
+        duplicates = companies[companies.duplicated()].unique()
+        if len(duplicates):
+            raise ValueError("نام شرکت تکراری است و در تاریخچه قابل تفکیک نیست: " + "، ".join(duplicates[:5]))
+        # SQLite مقدار NaN را NULL ذخیره می‌کند، پس تبدیل سلول‌به‌سلول لازم نیست؛
+        # رتبه خالی (Int32 با NA) هم NaN می‌شود
+        values = گسترش_فشرده(df[columns]).to_numpy(dtype=np.float64, na_value=np.nan).tolist()
+        rows = [(company, str(period), *row) for company, row in zip(companies, values)]
+        names = ", ".join(_نام(col) for col in columns)
+        updates = ", ".join(f"{_نام(col)} = excluded.{_نام(col)}" for col in columns)
+        with self._lock, self._con:
+            self._con.executemany(
+                f"INSERT INTO snapshots (company, period, {names}) "
+                f"VALUES (?, ?{', ?' * len(columns)}) "
+                f"ON CONFLICT (company, period) DO UPDATE SET {updates}",
+                rows,
+            )
+        return len(rows)
+
+    def company_history(self, company, columns=None):
+        # فقط سطرهای همین شرکت از ایندکس کلید اصلی خوانده می‌شوند
+        columns = list(columns or SNAPSHOT_COLUMNS)
+        names = ", ".join(_نام(col) for col in columns)
+        with self._lock:
+            cursor = self._con.execute(
+                f"SELECT period, {names} FROM snapshots WHERE company = ? ORDER BY period",
+                (str(company),),
+            )
+            rows = cursor.fetchall()
+        history = pd.DataFrame(rows, columns=["دوره", *columns])
+        history[columns] = history[columns].astype(np.float64)
+        return history
+
+    def periods(self):
+        with self._lock:
+            return [r[0] for r in self._con.execute("SELECT DISTINCT period FROM snapshots ORDER BY period")]
+
+    def close(self):
+        with self._lock:
+            self._con.close()
@@ -0,0 +1,325 @@
+"""
+ورود داده KPI شرکت‌ها از فایل‌های بزرگ (CSV، Parquet، Excel).
+
+فایل به صورت تکه‌ای خوانده می‌شود، نام ستون‌ها به نام‌های فارسی داشبورد
+نگاشت می‌شود، نوع داده‌ها یک بار هنگام بارگذاری تبدیل می‌شود و محدوده
+مقادیر در یک گذر برداری بررسی می‌شود. ستون‌های KPI در کوچک‌ترین نوعی
+نگه داشته می‌شوند که مقدارشان را بدون تغییر نگه دارد (فشرده_سازی).
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_CHUNKSIZE = 100_000
+
+ID_COL = "شرکت"
+# ستون‌های اختیاری: زیربخش (مقایسه با همتایان)، والد در سلسله‌مراتب هلدینگ و حجم دارایی تحت مدیریت
+SECTOR_COL = "زیربخش"
+PARENT_COL = "شرکت مادر"
+AUM_COL = "AUM"
+OPTIONAL_COLUMNS = [SECTOR_COL, PARENT_COL, AUM_COL]
+
+# ستون‌های KPI: (نوع داده، حداقل مجاز، حداکثر مجاز)؛ None یعنی بدون حد
+KPI_SCHEMA = {
+    "ROE": ("float64", None, None),
+    "ROI": ("float64", None, None),
+    "EVA": ("float64", None, None),
+    "رشد سود خالص": ("float64", None, None),
+    "نسبت سود به درآمد": ("float64", -100, 100),
+    "Cost/Income": ("float64", 0, 300),
+    "درآمد به ازای کارمند": ("float64", 0, None),
+    "AUM/تحلیلگر": ("float64", 0, None),
+    "زمان تصمیم سرمایه‌گذاری": ("float64", 0, None),
+    "رشد AUM": ("float64", None, None),
+    "نوآوری مالی": ("float64", 0, 10),
+    "درآمد پایدار": ("float64", 0, 100),
+    "رضایت مشتری (NPS)": ("float64", -100, 100),
+    "Compliance": ("float64", 0, 100),
+    "Debt/Equity": ("float64", 0, 20),
+    "کنترل داخلی": ("float64", 0, 100),
+    "شفافیت گزارش": ("float64", 0, 100),
+    "هم‌افزایی": ("float64", 0, 100),
+    "پروژه‌های مشترک": ("float64", 0, None),
+    "سهم بازار": ("float64", 0, 100),
+}
+
+# نام‌های رایج همین ستون‌ها در خروجی‌های ERP
+COLUMN_ALIASES = {
+    "company": ID_COL,
+    "نام شرکت": ID_COL,
+    "sector": SECTOR_COL,
+    "sub-sector": SECTOR_COL,
+    "subsector": SECTOR_COL,
+    "زیر بخش": SECTOR_COL,
+    "parent": PARENT_COL,
+    "parent company": PARENT_COL,
+    "والد": PARENT_COL,
+    "assets under management": AUM_COL,
+    "دارایی تحت مدیریت": AUM_COL,
+    "net profit growth": "رشد سود خالص",
+    "profit margin": "نسبت سود به درآمد",
+    "cost to income": "Cost/Income",
+    "revenue per employee": "درآمد به ازای کارمند",
+    "aum per analyst": "AUM/تحلیلگر",
+    "decision time": "زمان تصمیم سرمایه‌گذاری",
+    "aum growth": "رشد AUM",
+    "innovation": "نوآوری مالی",
+    "recurring revenue": "درآمد پایدار",
+    "nps": "رضایت مشتری (NPS)",
+    "رضایت مشتری": "رضایت مشتری (NPS)",
+    "debt to equity": "Debt/Equity",
+    "d/e": "Debt/Equity",
+    "internal control": "کنترل داخلی",
+    "transparency": "شفافیت گزارش",
+    "synergy": "هم‌افزایی",
+    "joint projects": "پروژه‌های مشترک",
+    "market share": "سهم بازار",
+}
+
+# ستون KPI اعشاری فقط وقتی float32 نگه داشته می‌شود که با گرد کردن به این تعداد رقم اعشار
+# عیناً به همان مقدار float64 برگردد؛ یعنی فشرده‌سازی هیچ مقداری را تغییر نمی‌دهد
+COMPACT_DECIMALS = 4
+COMPACT_INT_TYPES = (np.int8, np.int16, np.int32)
+
+
+def _کلید(name):
+    # یکسان‌سازی نام ستون: ی/ک عربی، نیم‌فاصله، فاصله‌های اضافه و حروف بزرگ
+    name = str(name).replace("ي", "ی").replace("ك", "ک").replace("‌", " ")
+    return " ".join(name.split()).lower()
+
+
+_نام_ستون = {_کلید(col): col for col in [ID_COL, *OPTIONAL_COLUMNS, *KPI_SCHEMA]}
+_نام_ستون.update({_کلید(alias): col for alias, col in COLUMN_ALIASES.items()})
+
+
+def نگاشت_ستونها(columns):
+    return {col: _نام_ستون.get(_کلید(col), col) for col in columns}
+
+
+def قالب_فایل(name):
+    ext = os.path.splitext(name)[1].lower()
+    if ext in (".parquet", ".pq"):
+        return "parquet"
+    if ext in (".xlsx", ".xlsm"):
+        return "excel"
+    if ext in (".csv", ".txt", ".gz"):
+        return "csv"
+    raise ValueError(f"unsupported file format: {name}")
+
+
+def تبدیل_انواع(df):
+    df = df.rename(columns=نگاشت_ستونها(df.columns))
+    for col, (dtype, _, _) in KPI_SCHEMA.items():
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype(dtype)
+    if ID_COL in df.columns:
+        df[ID_COL] = df[ID_COL].astype(str).str.strip()
+    for col in (SECTOR_COL, PARENT_COL):
+        if col in df.columns:
+            df[col] = df[col].astype("string").str.strip()
+    if AUM_COL in df.columns:
+        df[AUM_COL] = pd.to_numeric(df[AUM_COL], errors="coerce").astype("float64")
+    return df
+
+
+def _نوع_جا_می_شود(values, finite, dtype):
+    # آیا همه مقادیر بدون تغییر در dtype نگه داشته می‌شوند
+    dtype = np.dtype(dtype)
+    if dtype.kind in "iu":
+        if not finite.all() or not np.array_equal(values, np.round(values)):
+            return False
+        info = np.iinfo(dtype)
+        return len(values) == 0 or (info.min <= values.min() and values.max() <= info.max)
+    if dtype == np.float32:
+        with np.errstate(over="ignore"):
+            back = np.round(values.astype(np.float32).astype(np.float64), COMPACT_DECIMALS)
+        return np.array_equal(back[finite], values[finite])
+    return dtype == np.float64
+
+
+def فشرده_سازی(df, like=None):
+    # نوع نگهداری هر ستون KPI: عدد صحیح بدون جای خالی -> کوچک‌ترین int8/int16/int32،
+    # اعشاری با حداکثر COMPACT_DECIMALS رقم -> float32، و در غیر این صورت float64.
+    # با like (مثلاً جدول منبع یک نسخه ویرایش‌شده) نوع همان ستون در like اگر جا شود مقدم است
+    # تا هش سطرهای ویرایش‌نشده با منبع یکی بماند.
+    compact = {}
+    for col in df.columns:
+        if col not in KPI_SCHEMA:
+            if like is not None and col in like.columns and df[col].dtype != like[col].dtype:
+                compact[col] = df[col].astype(like[col].dtype)
+            continue
+        if len(df) == 0:
+            continue
+        values = مقادیر_float64(df[col])
+        finite = np.isfinite(values)
+        candidates = [*COMPACT_INT_TYPES, np.float32]
+        if like is not None and col in like.columns and isinstance(like[col].dtype, np.dtype):
+            candidates.insert(0, like[col].dtype)
+        dtype = next((t for t in candidates if _نوع_جا_می_شود(values, finite, t)), np.float64)
+        compact[col] = values.astype(dtype)
+    return df.assign(**compact) if compact else df
+
+
+def مقادیر_float64(series):
+    # عکس فشرده_سازی: float32 با گرد کردن به COMPACT_DECIMALS دقیقاً به همان مقدار ورودی برمی‌گردد
+    if series.dtype == np.float32:
+        # همان np.round(values, COMPACT_DECIMALS)، در جای همان آرایه تازه بدون موقت‌های اضافه
+        values = series.to_numpy(dtype=np.float64)
+        scale = 10.0**COMPACT_DECIMALS
+        np.multiply(values, scale, out=values)
+        np.rint(values, out=values)
+        return np.divide(values, scale, out=values)
+    return pd.to_numeric(series, errors="coerce").to_numpy(dtype=np.float64)
+
+
+def گسترش_فشرده(df, integers=False):
+    # نسخه float64 ستون‌های float32 (برای خروجی‌های متنی و SQLite) و با integers=True ستون‌های
+    # صحیح KPI هم (برای ویرایشگر، تا مقدار اعشاری یا بزرگ‌تر از بازه نوع فشرده قابل ورود باشد)؛
+    # بقیه ستون‌ها کپی نمی‌شوند
+    wide = {
+        col: مقادیر_float64(df[col])
+        for col in df.columns
+        if df[col].dtype == np.float32 or (integers and col in KPI_SCHEMA and df[col].dtype.kind in "iu")
+    }
+    return df.assign(**wide) if wide else df
+
+
+def _تکه_های_اکسل(source, chunksize):
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(source, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        batch = []
+        for values in rows:
+            batch.append(values)
+            if len(batch) == chunksize:
+                yield pd.DataFrame(batch, columns=header)
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=header)
+    finally:
+        workbook.close()
+
+
+def خواندن_تکه_ای(source, name=None, chunksize=DEFAULT_CHUNKSIZE):
+    # source مسیر فایل یا شیء فایل‌مانند است؛ برای شیء فایل، name قالب را مشخص می‌کند
+    fmt = قالب_فایل(name or source)
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        chunks = (b.to_pandas() for b in pq.ParquetFile(source).iter_batches(batch_size=chunksize))
+    elif fmt == "excel":
+        chunks = _تکه_های_اکسل(source, chunksize)
+    else:
+        chunks = pd.read_csv(source, chunksize=chunksize)
+
+    for chunk in chunks:
+        yield تبدیل_انواع(chunk)
+
+
+def اعتبارسنجی(df):
+    # یک ماسک برداری برای هر ستون؛ خروجی: جدول سطر × ستون × مقدار × مشکل
+    issues = []
+    for col, (_, lo, hi) in KPI_SCHEMA.items():
+        if col not in df.columns:
+            continue
+        values = df[col].to_numpy()
+        missing = np.isnan(values)
+        out_of_range = np.zeros(len(values), dtype=bool)
+        if lo is not None:
+            out_of_range |= values < lo
+        if hi is not None:
+            out_of_range |= values > hi
+
+        for mask, problem in ((missing, "مقدار نامعتبر یا خالی"), (out_of_range, "خارج از محدوده")):
+            rows = np.flatnonzero(mask)
+            if len(rows):
+                issues.append(pd.DataFrame({
+                    "سطر": df.index[rows],
+                    ID_COL: df[ID_COL].to_numpy()[rows] if ID_COL in df.columns else None,
+                    "ستون": col,
+                    "مقدار": values[rows],
+                    "مشکل": problem,
+                }))
+
+    if not issues:
+        return pd.DataFrame(columns=["سطر", ID_COL, "ستون", "مقدار", "مشکل"])
+    return pd.concat(issues).sort_values("سطر", kind="stable", ignore_index=True)
+
+
+def بارگذاری(source, name=None, chunksize=DEFAULT_CHUNKSIZE):
+    chunks = list(خواندن_تکه_ای(source, name, chunksize))
+    if not chunks:
+        raise ValueError("فایل ورودی خالی است")
+    df = pd.concat(chunks, ignore_index=True)
+
+    missing = [col for col in [ID_COL, *KPI_SCHEMA] if col not in df.columns]
+    if missing:
+        raise ValueError("ستون‌های لازم در فایل نیست: " + "، ".join(missing))
+
+    df = df[[ID_COL, *[col for col in OPTIONAL_COLUMNS if col in df.columns], *KPI_SCHEMA]]
+    return فشرده_سازی(df), اعتبارسنجی(df)
+
+
+class CompanyIndex:
+    # نمایه نام شرکت -> شماره سطر، یک بار برای هر نسخه داده ساخته می‌شود.
+    # نام‌های تکراری صریحاً شناسایی می‌شوند و هر تکرار برچسب یکتای خودش را
+    # با شماره سطر می‌گیرد، پس هیچ سطری زیر سطر دیگری پنهان نمی‌شود.
+
+    def __init__(self, names):
+        names = pd.Series(names, dtype=object).astype(str).reset_index(drop=True)
+        counts = names.value_counts(sort=False)
+        self.duplicates = counts[counts > 1]
+        duplicated = names.isin(self.duplicates.index).to_numpy()
+        labels = names.to_numpy(dtype=object).copy()
+        # برچسب ساخته‌شده ممکن است خودش نام شرکت دیگری باشد (مثلاً «X (سطر 2)»)؛ آن وقت شماره
+        # دیگری می‌گیرد تا دو برچسب به یک سطر اشاره نکنند
+        taken = set(labels[~duplicated])
+        for i in np.flatnonzero(duplicated):
+            label = f"{names[i]} (سطر {i + 1})"
+            k = 2
+            while label in taken:
+                label = f"{names[i]} (سطر {i + 1}، {k})"
+                k += 1
+            taken.add(label)
+            labels[i] = label
+
+        self.labels = labels
+        self._position = {label: i for i, label in enumerate(labels)}
+        order = np.argsort(labels.astype(str), kind="stable")
+        self._sorted = labels[order].astype(str)
+        self._last_search = None
+
+    def __len__(self):
+        return len(self.labels)
+
+    def position(self, label):
+        return self._position[label]
+
+    def search(self, query, limit=50):
+        # ابتدا پیشوند با جستجوی دودویی در برچسب‌های مرتب؛ اگر کم بود، جستجوی زیررشته
+        # آخرین نتیجه نگه داشته می‌شود تا rerunهای بعدی با همان عبارت دوباره پیمایش نکنند.
+        # شاخص بین نشست‌ها مشترک است؛ تاپل یک بار خوانده می‌شود تا جستجوی هم‌زمان نشست دیگری
+        # بین مقایسه و خواندن نتیجه، نتیجه عبارت دیگری را برنگرداند
+        query = query.strip()
+        last = self._last_search
+        if last is not None and last[0] == query and last[1] == limit:
+            return last[2]
+        if not query:
+            found = list(self.labels[:limit])
+        else:
+            lo = np.searchsorted(self._sorted, query, side="left")
+            hi = np.searchsorted(self._sorted, query + "\U0010ffff", side="left")
+            found = self._sorted[lo:min(hi, lo + limit)].tolist()
+            if len(found) < limit:
+                contains = pd.Series(self.labels, dtype=object).str.contains(query, regex=False).to_numpy()
+                seen = set(found)
+                found += [label for label in self.labels[contains] if label not in seen][:limit - len(found)]
+        self._last_search = (query, limit, found)
+        return found
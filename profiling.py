@@ -0,0 +1,161 @@
+"""
+زمان‌سنجی بخش‌های داشبورد در هر اجرا: زمان دیواری، زمان CPU نخ اجرا و
+بیشینه حافظه تخصیص‌یافته (tracemalloc).
+
+رکوردها در یک بافر حلقوی با اندازه ثابت نگه داشته می‌شوند، پس حافظه
+پروفایلر به تعداد اجراها بستگی ندارد. بخش‌های پی‌درپی یک اجرا با
+section(name) از هم جدا می‌شوند و کارهای تودرتو (مثلاً رسم یک نمودار یا
+ساخت خروجی) با measure(name).
+"""
+
+import itertools
+import json
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+# تعداد رکوردهای زمان‌سنجی بخش‌ها که در حافظه نگه داشته می‌شود (مشترک بین نشست‌ها)
+PROFILE_BUFFER_SIZE = 5_000
+PROFILE_PERCENTILES = (50, 90, 99)
+RUN_TOTAL = "کل اجرا"
+
+
+class _Frame:
+    __slots__ = ("name", "wall", "cpu", "mem", "peak")
+
+    def __init__(self, name, mem):
+        self.name = name
+        self.wall = time.perf_counter()
+        self.cpu = time.thread_time()
+        self.mem = mem
+        self.peak = 0
+
+
+class SectionProfiler:
+    # یک نمونه مشترک بین نشست‌ها؛ پشته بخش‌های باز برای هر نخ جداست.
+    # tracemalloc سراسری است، پس با چند نشست هم‌زمان بیشینه حافظه تقریبی است.
+
+    def __init__(self, maxlen=PROFILE_BUFFER_SIZE):
+        self._records = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._runs = itertools.count(1)
+
+    @property
+    def track_memory(self):
+        return tracemalloc.is_tracing()
+
+    @track_memory.setter
+    def track_memory(self, enabled):
+        # ردیابی حافظه اجرای داشبورد را چند برابر کند می‌کند و فقط به درخواست روشن می‌شود
+        if enabled and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        elif not enabled and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def _stack(self):
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+            self._local.run = None
+            self._local.lap = False
+        return self._local.stack
+
+    def _push(self, name):
+        stack = self._stack()
+        mem = None
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            # بیشینه والد تا این لحظه کنار گذاشته می‌شود تا بعد از بازنشانی گم نشود
+            if stack:
+                stack[-1].peak = max(stack[-1].peak, peak)
+            tracemalloc.reset_peak()
+            mem = current
+        stack.append(_Frame(name, mem))
+
+    def _pop(self):
+        stack = self._stack()
+        frame = stack.pop()
+        peak = None
+        if frame.mem is not None and tracemalloc.is_tracing():
+            top = max(frame.peak, tracemalloc.get_traced_memory()[1])
+            peak = max(top - frame.mem, 0)
+            if stack:
+                stack[-1].peak = max(stack[-1].peak, top)
+        record = {
+            "run": self._local.run,
+            "time": time.time(),
+            "section": frame.name,
+            "wall_s": time.perf_counter() - frame.wall,
+            "cpu_s": time.thread_time() - frame.cpu,
+            "peak_bytes": peak,
+        }
+        with self._lock:
+            self._records.append(record)
+        return record
+
+    def begin_run(self):
+        # اجرای قبلی این نخ اگر با st.stop یا rerun نیمه‌کاره مانده باشد دور ریخته می‌شود
+        stack = self._stack()
+        stack.clear()
+        self._local.run = next(self._runs)
+        self._push(RUN_TOTAL)
+        self._local.lap = False
+        return self._local.run
+
+    def section(self, name):
+        # پایان بخش قبلی همین اجرا و شروع بخش بعدی
+        if not self._stack():
+            return
+        if self._local.lap:
+            self._pop()
+        self._push(name)
+        self._local.lap = True
+
+    def end_run(self):
+        stack = self._stack()
+        if not stack:
+            return
+        if self._local.lap:
+            self._pop()
+        self._pop()
+        self._local.lap = False
+
+    @contextmanager
+    def measure(self, name):
+        self._push(name)
+        try:
+            yield
+        finally:
+            self._pop()
+
+    def records(self):
+        with self._lock:
+            return list(self._records)
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+
+    def summary(self, percentiles=PROFILE_PERCENTILES):
+        # برای هر بخش: تعداد، صدک‌های زمان دیواری/CPU (میلی‌ثانیه) و بیشینه حافظه (مگابایت)
+        df = pd.DataFrame(self.records(), columns=["run", "time", "section", "wall_s", "cpu_s", "peak_bytes"])
+        rows = []
+        for section, group in df.groupby("section", sort=False):
+            row = {"بخش": section, "تعداد": len(group)}
+            for label, col, scale in (("wall", "wall_s", 1e3), ("cpu", "cpu_s", 1e3)):
+                values = group[col].to_numpy(dtype=np.float64) * scale
+                for q, v in zip(percentiles, np.percentile(values, percentiles)):
+                    row[f"{label} p{q} (ms)"] = v
+            peak = group["peak_bytes"].dropna().to_numpy(dtype=np.float64) / 2**20
+            row["حافظه p50 (MB)"] = np.median(peak) if len(peak) else np.nan
+            row["حافظه max (MB)"] = peak.max() if len(peak) else np.nan
+            rows.append(row)
+        return pd.DataFrame(rows)
+
+    def to_json(self):
+        return json.dumps(self.records(), ensure_ascii=False, indent=1)
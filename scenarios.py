@@ -0,0 +1,285 @@
+"""
+تحلیل سناریو روی امتیازها: حساسیت رتبه شرکت‌ها به وزن محورها و به خطای KPIها.
+
+همه سناریوها با ضرب ماتریس محورها (N×5) در ماتریس وزن‌ها (5×S) امتیاز
+می‌گیرند؛ سناریوها تکه‌تکه پردازش می‌شوند تا حافظه محدود بماند.
+شبیه‌سازی مونت‌کارلو در دسته‌های مستقل روی چند پردازه اجرا می‌شود و هر
+دسته فقط هیستوگرام رتبه‌ها را برمی‌گرداند.
+"""
+
+import math
+import multiprocessing
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+
+from ingest import KPI_SCHEMA, گسترش_فشرده
+from scoring import ماتریس_محورها
+
+# سقف تعداد خانه‌های ماتریس امتیاز (شرکت × سناریو) در هر تکه
+MAX_CELLS = 2**23
+# تعداد خانه‌های هیستوگرام رتبه برای هر شرکت (برای محاسبه میانه بدون نگه‌داشتن همه رتبه‌ها)
+RANK_BINS = 1024
+# اگر رتبه‌های همه سناریوها در این بودجه جا شوند، گذر دوم دوباره رتبه‌بندی نمی‌کند
+RANK_CACHE_BUDGET_MB = 256
+# سقف حافظه شمارنده‌های هیستوگرام رتبه؛ در تحلیل حساسیت بیشتر از آن شرکت‌ها بلوک‌بلوک شمرده
+# می‌شوند و در مونت‌کارلو تعداد خانه‌ها (تا حداقل √N) کم می‌شود
+HIST_BUDGET_MB = 64
+
+# مدل خطای پیش‌فرض هر KPI: (نوع، مقیاس)؛ relative یعنی انحراف معیار نسبت به |مقدار|،
+# absolute یعنی انحراف معیار ثابت به واحد خود ستون
+DEFAULT_ERROR_MODELS = {col: ("relative", 0.05) for col in KPI_SCHEMA}
+# تعداد قرعه در هر کار پردازه؛ ثابت است تا نتیجه به تعداد پردازه‌ها بستگی نداشته باشد
+MC_TASK_DRAWS = 2_000
+# سقف سطرهای (قرعه × شرکت) که هر بار یکجا امتیاز می‌گیرند
+MC_BATCH_ROWS = 2**17
+# اندازه ثابت استخر پردازه‌های مونت‌کارلو (مشترک بین همه نشست‌ها)
+MC_WORKERS = os.cpu_count() or 1
+
+
+def شبکه_وزن(step=10):
+    # همه بردارهای وزن با گام step درصد که جمعشان 100 است
+    m = 100 // step
+    grid = np.indices((m + 1,) * 4).reshape(4, -1).T
+    grid = grid[grid.sum(axis=1) <= m]
+    return np.column_stack([grid, m - grid.sum(axis=1)]) * step
+
+
+def نمونه_سیمپلکس(n, center=None, concentration=50.0, seed=0):
+    # نمونه تصادفی یکنواخت از سیمپلکس وزن‌ها، یا اطراف center (درصد) با پراکندگی concentration
+    rng = np.random.default_rng(seed)
+    if center is None:
+        alpha = np.ones(5)
+    else:
+        alpha = np.asarray(center, dtype=np.float64) / 100 * concentration + 0.5
+    return rng.dirichlet(alpha, size=n) * 100
+
+
+def رتبه_سطری(neg_totals):
+    # رتبه min در هر سطر ماتریس S×N از منفی امتیازها (مانند rank(method="min", ascending=False))؛
+    # ترتیب داخل امتیازهای برابر مهم نیست، پس مرتب‌سازی پایدار لازم نیست
+    order = np.argsort(neg_totals, axis=1)
+    sorted_totals = np.take_along_axis(neg_totals, order, axis=1)
+    position = np.broadcast_to(np.arange(neg_totals.shape[1], dtype=np.int32), neg_totals.shape)
+
+    # امتیازهای برابر رتبه اولین عضو گروهشان را می‌گیرند
+    group_start = np.ones(neg_totals.shape, dtype=bool)
+    group_start[:, 1:] = sorted_totals[:, 1:] != sorted_totals[:, :-1]
+    first = np.where(group_start, position, 0)
+    np.maximum.accumulate(first, axis=1, out=first)
+
+    ranks = np.empty(neg_totals.shape, dtype=np.int32)
+    np.put_along_axis(ranks, order, first + 1, axis=1)
+    return ranks
+
+
+def _تکه_های_رتبه(axes, weights, max_cells):
+    # هر تکه ماتریس رتبه S×N است: هر سطر یک سناریو
+    chunk = max(1, max_cells // max(len(axes), 1))
+    for start in range(0, len(weights), chunk):
+        yield رتبه_سطری((weights[start:start + chunk] / -100) @ axes.T)
+
+
+def _با_جای_خالی(values, valid, dtype="Int64"):
+    # شرکت‌هایی که محور نامعتبر دارند در سناریوها شرکت نمی‌کنند و خالی می‌مانند
+    out = pd.array(np.full(len(valid), pd.NA), dtype=dtype)
+    out[valid] = values
+    return out
+
+
+def تحلیل_حساسیت_وزن(axes, weights, top_k=10, max_cells=MAX_CELLS, bins=RANK_BINS):
+    # axes: ماتریس محورها N×5 ؛ weights: سناریوهای وزن S×5 (درصد)
+    # خروجی برای هر شرکت: بهترین/بدترین رتبه، میانه رتبه و احتمال حضور در k برتر
+    axes = np.asarray(axes, dtype=np.float64)
+    weights = np.asarray(weights, dtype=np.float64)
+    valid = ~np.isnan(axes).any(axis=1)
+    a = axes[valid]
+    n, s = len(a), len(weights)
+
+    best = np.full(n, np.iinfo(np.int32).max, dtype=np.int64)
+    worst = np.zeros(n, dtype=np.int64)
+    in_top = np.zeros(n, dtype=np.int64)
+    median = np.zeros(n, dtype=np.int64)
+
+    # هیستوگرام دو مرحله‌ای: خانه‌های درشت (bins) و سپس رتبه‌های داخل خانه میانه (width).
+    # میانه به تعداد خانه‌ها بستگی ندارد؛ بیش از √N خانه فقط حافظه گذر اول را زیاد می‌کند
+    bins = max(1, min(bins, n, math.isqrt(max(n - 1, 0)) + 1))
+    width = -(-n // bins)
+    # شمارنده‌ها حداکثر به S می‌رسند؛ هر بلوک شرکت‌ها با شمارنده‌هایش و آرایه موقت int64
+    # bincount در HIST_BUDGET_MB جا می‌شود
+    count_dtype = np.int16 if s < 2**15 else np.int32
+    cell_bytes = np.dtype(count_dtype).itemsize + np.dtype(np.int64).itemsize
+    block = max(1, HIST_BUDGET_MB * 2**20 // ((bins + width) * cell_bytes))
+
+    rank_dtype = np.uint16 if n < 2**16 else np.uint32
+    keep = n * s * np.dtype(rank_dtype).itemsize <= RANK_CACHE_BUDGET_MB * 2**20
+    kept = []
+
+    def تکه_ها():
+        # رتبه‌ها یک بار ساخته و اگر در بودجه جا شوند برای گذرها و بلوک‌های بعدی نگه داشته می‌شوند
+        if kept:
+            yield from kept
+            return
+        for ranks in _تکه_های_رتبه(a, weights, max_cells):
+            if keep:
+                kept.append(ranks.astype(rank_dtype))
+            yield ranks
+
+    # میانه پایینی: رتبه شماره ceil(S/2) در ترتیب صعودی
+    target = (s + 1) // 2
+    for start in range(0, n, block):
+        cols = slice(start, min(start + block, n))
+        m = cols.stop - cols.start
+        local = np.arange(m)
+
+        # گذر اول: هیستوگرام درشت رتبه‌های این بلوک (m×bins)؛ بهترین/بدترین و k برتر یک بار برای همه
+        hist = np.zeros((m, bins), dtype=count_dtype)
+        for ranks in تکه_ها():
+            if start == 0:
+                np.minimum(best, ranks.min(axis=0), out=best)
+                np.maximum(worst, ranks.max(axis=0), out=worst)
+                in_top += (ranks <= top_k).sum(axis=0)
+            coarse = (ranks[:, cols].astype(np.int64) - 1) // width
+            hist += np.bincount((local * bins + coarse).ravel(), minlength=m * bins).reshape(m, bins)
+        np.cumsum(hist, axis=1, out=hist)
+        median_bin = (hist >= target).argmax(axis=1)
+        below = np.where(median_bin > 0, hist[local, median_bin - 1], 0)
+        lo = median_bin * width
+        del hist
+
+        if width == 1:
+            median[cols] = lo + 1
+            continue
+        # گذر دوم: فقط رتبه‌های داخل خانه میانه هر شرکت شمرده می‌شوند (m×width)
+        fine = np.zeros((m, width), dtype=count_dtype)
+        for ranks in تکه_ها():
+            offset = ranks[:, cols].astype(np.int64) - 1 - lo
+            inside = (offset >= 0) & (offset < width)
+            fine += np.bincount(
+                np.broadcast_to(local * width, offset.shape)[inside] + offset[inside],
+                minlength=m * width,
+            ).reshape(m, width)
+        np.cumsum(fine, axis=1, out=fine)
+        median[cols] = lo + (fine >= (target - below)[:, None]).argmax(axis=1) + 1
+
+    return pd.DataFrame({
+        "بهترین رتبه": _با_جای_خالی(best, valid),
+        "بدترین رتبه": _با_جای_خالی(worst, valid),
+        "میانه رتبه": _با_جای_خالی(median, valid),
+        "احتمال حضور در k برتر": _با_جای_خالی(in_top / max(s, 1), valid, "Float64"),
+    })
+
+
+def _هیستوگرام_به_رتبه(cumulative, counts, width, n, upper=False):
+    # اولین خانه‌ای که تجمعی‌اش به counts می‌رسد؛ با خانه‌های پهن‌تر از یک رتبه،
+    # حد پایین از ابتدای خانه و حد بالا از انتهای آن گزارش می‌شود تا بازه تنگ‌تر نشود
+    bin_ = (cumulative >= counts).argmax(axis=1)
+    if upper:
+        return np.minimum(bin_ * width + width, n)
+    return bin_ * width + 1
+
+
+def _شبیه_سازی_کار(values, scale, lo, hi, weights, draws, seed, bins):
+    # یک کار مستقل: draws نمونه از KPIها، امتیاز برداری و هیستوگرام رتبه هر شرکت
+    rng = np.random.default_rng(seed)
+    n, k = values.shape
+    width = -(-n // bins)
+    company = np.arange(n)
+    # شمارنده‌ها حداکثر به draws می‌رسند و همین آرایه کوچک به پردازه اصلی برمی‌گردد
+    hist = np.zeros(n * bins, dtype=np.int16 if draws < 2**15 else np.int32)
+    w = np.asarray(weights, dtype=np.float64) / -100
+    batch = max(1, MC_BATCH_ROWS // n)
+    for start in range(0, draws, batch):
+        b = min(batch, draws - start)
+        sample = values + rng.standard_normal((b, n, k)) * scale
+        np.clip(sample, lo, hi, out=sample)
+        frame = pd.DataFrame(sample.reshape(b * n, k), columns=list(KPI_SCHEMA))
+        ranks = رتبه_سطری((ماتریس_محورها(frame) @ w).reshape(b, n))
+        flat = (company * bins + (ranks - 1) // width).ravel()
+        if len(hist) <= len(flat) * 8:
+            hist += np.bincount(flat, minlength=len(hist)).astype(hist.dtype)
+        else:
+            # bincount یک آرایه int64 به اندازه کل هیستوگرام می‌سازد؛ فقط خانه‌های دیده‌شده جمع می‌شوند
+            cells, counts = np.unique(flat, return_counts=True)
+            hist[cells] += counts.astype(hist.dtype)
+    return hist.reshape(n, bins)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _استخر():
+    # استخر یک بار با اندازه ثابت ساخته می‌شود و بین اجراها و نشست‌ها زنده می‌ماند؛ هیچ
+    # فراخوانی آن را نمی‌بندد تا map در جریان نشست دیگری لغو نشود. سرور Streamlit چندنخی
+    # است و fork آن امن نیست، پس پردازه‌ها با forkserver (یا spawn) ساخته می‌شوند.
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            _pool = ProcessPoolExecutor(max_workers=MC_WORKERS, mp_context=multiprocessing.get_context(method))
+        return _pool
+
+
+def بازه_اطمینان_رتبه(df, weights, error_models=None, draws=10_000, level=0.9,
+                      seed=0, workers=None, bins=RANK_BINS):
+    # df: جدول KPI شرکت‌ها؛ weights: پنج وزن محور (درصد)؛ error_models: ستون -> (نوع، مقیاس)
+    # خروجی برای هر شرکت: حد پایین، میانه و حد بالای رتبه در بازه اطمینان level
+    if error_models is None:
+        error_models = DEFAULT_ERROR_MODELS
+    columns = list(KPI_SCHEMA)
+    values = گسترش_فشرده(df[columns]).to_numpy(dtype=np.float64)
+    valid = ~np.isnan(ماتریس_محورها(df)).any(axis=1)
+    values = values[valid]
+    n = len(values)
+
+    scale = np.zeros_like(values)
+    for j, col in enumerate(columns):
+        kind, size = error_models.get(col, ("absolute", 0.0))
+        scale[:, j] = size * np.abs(values[:, j]) if kind == "relative" else size
+    lo = np.array([-np.inf if KPI_SCHEMA[c][1] is None else KPI_SCHEMA[c][1] for c in columns])
+    hi = np.array([np.inf if KPI_SCHEMA[c][2] is None else KPI_SCHEMA[c][2] for c in columns])
+
+    # بدون گذر دوم (نمونه‌ها دوباره ساخته نمی‌شوند) دقت بازه همان پهنای خانه است، پس خانه‌ها
+    # فقط وقتی هیستوگرام N×bins در HIST_BUDGET_MB جا نشود کم می‌شوند، و نه کمتر از √N
+    count_dtype = np.int32 if draws < 2**31 else np.int64
+    fit = HIST_BUDGET_MB * 2**20 // max(n * np.dtype(count_dtype).itemsize, 1)
+    bins = max(1, min(bins, n, max(fit, math.isqrt(max(n - 1, 0)) + 1)))
+    sizes = [min(MC_TASK_DRAWS, draws - start) for start in range(0, draws, MC_TASK_DRAWS)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    args = [(values, scale, lo, hi, weights, size, task_seed, bins) for size, task_seed in zip(sizes, seeds)]
+
+    # workers=1 همه کارها را در همین پردازه اجرا می‌کند؛ در غیر این صورت کارها به استخر مشترک
+    # می‌روند و فقط workers کار همزمان در جریان است تا هیستوگرام‌های برگشتی روی هم انباشته نشوند
+    workers = min(workers or MC_WORKERS, len(args))
+    hist = np.zeros((n, bins), dtype=count_dtype)
+    if n and workers > 1:
+        pool = _استخر()
+        pending = set()
+        for task in args:
+            if len(pending) == workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    hist += future.result()
+            pending.add(pool.submit(_شبیه_سازی_کار, *task))
+        for future in pending:
+            hist += future.result()
+    elif n:
+        for task in args:
+            hist += _شبیه_سازی_کار(*task)
+
+    width = -(-n // bins) if n else 1
+    tail = (1 - level) / 2
+    counts = lambda q: max(1, int(np.ceil(q * draws)))
+    np.cumsum(hist, axis=1, out=hist)
+
+    return pd.DataFrame({
+        "حد پایین رتبه": _با_جای_خالی(_هیستوگرام_به_رتبه(hist, counts(tail), width, n), valid),
+        "میانه رتبه": _با_جای_خالی(_هیستوگرام_به_رتبه(hist, counts(0.5), width, n), valid),
+        "حد بالای رتبه": _با_جای_خالی(
+            _هیستوگرام_به_رتبه(hist, counts(1 - tail), width, n, upper=True), valid
+        ),
+    }, index=df.index)
@@ -0,0 +1,317 @@
+"""
+منطق امتیازدهی و رتبه‌بندی داشبورد هلدینگ، مستقل از Streamlit.
+
+استفاده خط فرمان (ورودی CSV/Parquet/Excel، خروجی CSV/JSON/Parquet/Arrow/Excel، پردازش تکه‌ای):
+
+    python scoring.py input.csv ranked.parquet --weights 40 30 15 10 5
+"""
+
+import argparse
+import sys
+
+import numpy as np
+import pandas as pd
+
+from export import ExportWriter
+from ingest import DEFAULT_CHUNKSIZE, خواندن_تکه_ای, مقادیر_float64
+
+DEFAULT_WEIGHTS = (40, 30, 15, 10, 5)
+
+# -------------------------------------------------
+# توابع محاسبه KPI محوری
+# -------------------------------------------------
+
+def محور_مالی(row):
+    return (
+        row["ROE"]
+        + row["ROI"]
+        + row["EVA"]
+        + row["رشد سود خالص"]
+        + row["نسبت سود به درآمد"]
+    ) / 5.0
+
+
+def محور_بهره_وری(row):
+    return (
+        (100 - row["Cost/Income"]) +
+        (row["درآمد به ازای کارمند"] / 3) +
+        row["AUM/تحلیلگر"] +
+        ((10 - row["زمان تصمیم سرمایه‌گذاری"]) * 10)
+    ) / 4.0
+
+
+def محور_رشد_پایدار(row):
+    return (
+        row["رشد AUM"] +
+        row["نوآوری مالی"] * 10 +
+        row["درآمد پایدار"] +
+        row["رضایت مشتری (NPS)"]
+    ) / 4.0
+
+
+def محور_ریسک_و_حاکمیت(row):
+    سلامت_اهرم = (1 - min(row["Debt/Equity"] / 2, 1)) * 100
+    return (
+        row["Compliance"] +
+        سلامت_اهرم +
+        row["کنترل داخلی"] +
+        row["شفافیت گزارش"]
+    ) / 4.0
+
+
+def محور_هم_افزایی(row):
+    return (
+        row["هم‌افزایی"] +
+        row["پروژه‌های مشترک"] * 15 +
+        row["سهم بازار"] * 10
+    ) / 3.0
+
+
+# -------------------------------------------------
+# موتور امتیازدهی ستونی (برداری)
+# همان فرمول‌های توابع بالا، ولی روی کل ستون‌ها به جای هر سطر؛
+# ترتیب جمع‌ها عیناً حفظ شده تا خروجی با نسخه سطری یکسان باشد.
+# -------------------------------------------------
+
+axis_cols = [
+    "امتیاز مالی",
+    "امتیاز بهره‌وری",
+    "امتیاز رشد پایدار",
+    "امتیاز ریسک و حاکمیت",
+    "امتیاز هم‌افزایی",
+]
+
+
+def _ستون(df, name):
+    # ستون‌های فشرده (float32/int) با همان مقادیر ورودی به float64 برمی‌گردند
+    return مقادیر_float64(df[name])
+
+
+def ماتریس_محورها(df):
+    c = lambda name: _ستون(df, name)
+
+    مالی = (
+        c("ROE")
+        + c("ROI")
+        + c("EVA")
+        + c("رشد سود خالص")
+        + c("نسبت سود به درآمد")
+    ) / 5.0
+
+    بهره_وری = (
+        (100 - c("Cost/Income")) +
+        (c("درآمد به ازای کارمند") / 3) +
+        c("AUM/تحلیلگر") +
+        ((10 - c("زمان تصمیم سرمایه‌گذاری")) * 10)
+    ) / 4.0
+
+    رشد = (
+        c("رشد AUM") +
+        c("نوآوری مالی") * 10 +
+        c("درآمد پایدار") +
+        c("رضایت مشتری (NPS)")
+    ) / 4.0
+
+    سلامت_اهرم = (1 - np.minimum(c("Debt/Equity") / 2, 1)) * 100
+    ریسک = (
+        c("Compliance") +
+        سلامت_اهرم +
+        c("کنترل داخلی") +
+        c("شفافیت گزارش")
+    ) / 4.0
+
+    هم_افزایی = (
+        c("هم‌افزایی") +
+        c("پروژه‌های مشترک") * 15 +
+        c("سهم بازار") * 10
+    ) / 3.0
+
+    # ماتریس N×5 به ترتیب axis_cols
+    return np.column_stack([مالی, بهره_وری, رشد, ریسک, هم_افزایی])
+
+
+def امتیاز_کل(axes, w_fin, w_eff, w_grow, w_risk, w_syn):
+    # ضرب ماتریس N×5 در بردار وزن 5×1
+    weights = np.array([w_fin, w_eff, w_grow, w_risk, w_syn], dtype=np.float64) / 100
+    return axes @ weights
+
+
+def رتبه_بندی(total):
+    # مانند رتبه_در_مرجع، امتیاز نامعتبر (KPI خالی یا خارج از نوع) رتبه ندارد
+    return total.rank(ascending=False, method="min").astype("Int32")
+
+
+def رتبه_در_مرجع(total, sorted_reference):
+    # رتبه min نزولی نسبت به آرایه مرتب‌شده همه امتیازها (برای پردازش تکه‌ای)
+    # برابر است با 1 + تعداد امتیازهای بزرگ‌تر؛ امتیاز نامعتبر رتبه ندارد
+    greater = len(sorted_reference) - np.searchsorted(sorted_reference, total, side="right")
+    rank = pd.array(greater + 1, dtype="Int64")
+    rank[np.isnan(total)] = pd.NA
+    return rank
+
+
+def برترین_ها(total, k):
+    # اندیس k شرکت برتر به ترتیب نزولی امتیاز؛ انتخاب جزئی (argpartition)
+    # به جای مرتب‌سازی کل آرایه. امتیاز نامعتبر آخر قرار می‌گیرد و
+    # امتیازهای برابر به ترتیب سطر می‌آیند.
+    key = -np.asarray(total, dtype=np.float64)
+    key[np.isnan(key)] = np.inf
+    k = max(0, min(int(k), len(key)))
+    if k == 0:
+        return np.empty(0, dtype=np.intp)
+    if k < len(key):
+        kth = np.partition(key, k - 1)[k - 1]
+        better = np.flatnonzero(key < kth)
+        ties = np.flatnonzero(key == kth)[:k - len(better)]
+        idx = np.concatenate([better, ties])
+    else:
+        idx = np.arange(len(key))
+    return idx[np.lexsort((idx, key[idx]))]
+
+
+# ربع‌های ماتریس عملکرد؛ اندیس = (بهره‌وری بالا) + 2 × (سودآوری بالا)
+QUADRANTS = ["Dogs", "Question Marks", "Cash Cows", "Stars"]
+
+
+def ربع_عملکرد(eff, fin):
+    # بالا یعنی بزرگ‌تر یا مساوی میانگین همان محور
+    return (eff >= np.nanmean(eff)).astype(np.intp) + 2 * (fin >= np.nanmean(fin))
+
+
+def جدول_امتیاز(df, axes, w_fin, w_eff, w_grow, w_risk, w_syn):
+    # ستون‌های df کپی نمی‌شوند (pandas با کپی هنگام نوشتن آن‌ها را مشترک نگه می‌دارد) و
+    # پنج ستون محور یک بلوک روی همان ماتریس axes هستند، نه پنج ستون کپی‌شده
+    scores = pd.DataFrame(np.asarray(axes, dtype=np.float64), index=df.index, columns=axis_cols, copy=False)
+    scores["امتیاز کل"] = امتیاز_کل(axes, w_fin, w_eff, w_grow, w_risk, w_syn)
+    scores["رتبه"] = رتبه_بندی(scores["امتیاز کل"])
+    return pd.concat([df.drop(columns=scores.columns, errors="ignore"), scores], axis=1)
+
+
+def محاسبه_امتیازها(df, w_fin, w_eff, w_grow, w_risk, w_syn):
+    return جدول_امتیاز(df, ماتریس_محورها(df), w_fin, w_eff, w_grow, w_risk, w_syn)
+
+
+# -------------------------------------------------
+# قواعد توصیه (اعلانی)
+# هر قاعده: (ستون، عملگر، آستانه، شدت، پیام)؛ روی کل جدول به صورت ماسک
+# برداری ارزیابی می‌شوند و مقدار خالی هیچ قاعده‌ای را فعال نمی‌کند.
+# -------------------------------------------------
+
+SEVERITIES = ["بحرانی", "هشدار", "مثبت"]
+
+RULE_OPERATORS = {
+    ">": np.greater,
+    ">=": np.greater_equal,
+    "<": np.less,
+    "<=": np.less_equal,
+}
+
+RECOMMENDATION_RULES = {
+    "هزینه بالا": ("Cost/Income", ">", 45, "بحرانی",
+                   "🔴 نسبت هزینه به درآمد بالاست. کاهش هزینه‌های عملیاتی توصیه می‌شود."),
+    "اهرم بالا": ("Debt/Equity", ">", 0.6, "بحرانی",
+                  "🔴 نسبت بدهی به حقوق صاحبان سهام بالاست. کاهش اهرم مالی ضروری است."),
+    "رضایت پایین": ("رضایت مشتری (NPS)", "<", 85, "هشدار",
+                    "🟡 رضایت مشتری قابل بهبود است. تمرکز بر کیفیت خدمات توصیه می‌شود."),
+    "نوآوری پایین": ("نوآوری مالی", "<", 4, "هشدار",
+                     "🟡 سرمایه‌گذاری بیشتر در نوآوری و فناوری پیشنهاد می‌شود."),
+    "بازده عالی": ("ROE", ">", 20, "مثبت",
+                   "🟢 عملکرد مالی عالی! حفظ این روند ضروری است."),
+    "بهره‌وری بالا": ("امتیاز بهره‌وری", ">", 80, "مثبت",
+                      "🟢 بهره‌وری بالا! این مزیت رقابتی را حفظ کنید."),
+}
+
+
+def ماسک_قواعد(df, rules=None):
+    # ماتریس بولی N×R: سطر i قاعده j را فعال کرده است
+    rules = RECOMMENDATION_RULES if rules is None else rules
+    mask = np.zeros((len(df), len(rules)), dtype=bool)
+    for j, (col, op, threshold, _, _) in enumerate(rules.values()):
+        mask[:, j] = RULE_OPERATORS[op](_ستون(df, col), threshold)
+    return mask
+
+
+def جدول_هشدار(df, rules=None):
+    # یک سطر برای هر (شرکت، قاعده فعال)، مرتب بر اساس شدت و سپس ترتیب جدول
+    rules = RECOMMENDATION_RULES if rules is None else rules
+    rows, rule_idx = np.nonzero(ماسک_قواعد(df, rules))
+    spec = list(rules.values())
+    per_rule = lambda values: np.array(values, dtype=object)[rule_idx]
+
+    cols = per_rule([col for col, *_ in spec])
+    values = np.empty(len(rows))
+    for col in np.unique(cols):
+        hit = cols == col
+        values[hit] = _ستون(df, col)[rows[hit]]
+
+    alerts = pd.DataFrame({
+        "شرکت": df["شرکت"].to_numpy()[rows],
+        "قاعده": per_rule(list(rules)),
+        "شاخص": cols,
+        "مقدار": values,
+        "آستانه": per_rule([f"{op} {threshold:g}" for _, op, threshold, _, _ in spec]),
+        "شدت": pd.Categorical(per_rule([sev for *_, sev, _ in spec]), categories=SEVERITIES, ordered=True),
+        "پیام": per_rule([message for *_, message in spec]),
+    })
+    return alerts.sort_values("شدت", kind="stable", ignore_index=True)
+
+
+def توصیه_ها(row, rules=None):
+    rules = RECOMMENDATION_RULES if rules is None else rules
+    return [
+        message
+        for col, op, threshold, _, message in rules.values()
+        if RULE_OPERATORS[op](row[col], threshold)
+    ]
+
+
+# -------------------------------------------------
+# امتیازدهی دسته‌ای فایل‌های بزرگ (خط فرمان)
+# -------------------------------------------------
+
+def امتیازدهی_فایل(input_path, output_path, weights=DEFAULT_WEIGHTS, chunksize=DEFAULT_CHUNKSIZE):
+    # دو گذر روی ورودی: گذر اول فقط امتیاز کل را نگه می‌دارد (8 بایت برای هر
+    # شرکت) تا رتبه سراسری معلوم شود؛ گذر دوم هر تکه را دوباره امتیاز می‌دهد،
+    # رتبه را از آرایه مرتب‌شده برمی‌دارد و تکه را به خروجی اضافه می‌کند.
+    totals = [
+        امتیاز_کل(ماتریس_محورها(chunk), *weights)
+        for chunk in خواندن_تکه_ای(input_path, chunksize=chunksize)
+    ]
+    totals = np.concatenate(totals) if totals else np.empty(0)
+    reference = np.sort(totals[~np.isnan(totals)])
+
+    writer = ExportWriter(output_path)
+    rows = 0
+    try:
+        for chunk in خواندن_تکه_ای(input_path, chunksize=chunksize):
+            axes = ماتریس_محورها(chunk)
+            for j, col in enumerate(axis_cols):
+                chunk[col] = axes[:, j]
+            chunk["امتیاز کل"] = امتیاز_کل(axes, *weights)
+            chunk["رتبه"] = رتبه_در_مرجع(chunk["امتیاز کل"].to_numpy(), reference)
+            writer.write(chunk)
+            rows += len(chunk)
+    finally:
+        writer.close()
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="امتیازدهی و رتبه‌بندی شرکت‌های هلدینگ بدون رابط کاربری")
+    parser.add_argument("input", help="فایل ورودی (CSV، Parquet یا Excel)")
+    parser.add_argument("output", help="فایل خروجی رتبه‌بندی‌شده (CSV، JSON، Parquet، Arrow یا Excel)")
+    parser.add_argument(
+        "--weights", nargs=5, type=float, default=DEFAULT_WEIGHTS,
+        metavar=("FIN", "EFF", "GROW", "RISK", "SYN"),
+        help="وزن محورها به درصد (پیش‌فرض: 40 30 15 10 5)",
+    )
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE, help="تعداد سطر هر تکه")
+    args = parser.parse_args(argv)
+
+    rows = امتیازدهی_فایل(args.input, args.output, tuple(args.weights), args.chunksize)
+    print(f"{rows} rows scored -> {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,254 @@
+"""
+سرویس محلی امتیازدهی روی HTTP/JSON، جدا از رابط Streamlit.
+
+همان فرمول‌های محورها و وزن‌دهی scoring.py. هر درخواست می‌تواند چند شرکت و
+چند بردار وزن داشته باشد؛ ماتریس محورهای هر داده با اثر انگشت محتوایش کش
+می‌شود، پس داده تکراری (یا شناسه dataset پاسخ قبلی) فقط ضرب وزن و رتبه‌بندی
+می‌خواهد. اتصال‌ها روی asyncio خوانده و نوشته می‌شوند و محاسبه در یک
+استخر نخ انجام می‌شود تا درخواست‌های هم‌زمان پشت هم نمانند.
+
+    python service.py --port 8765
+
+    POST /score   {"companies": [{"شرکت": ..., "ROE": ..., ...}, ...],
+                   "weights": [[40, 30, 15, 10, 5], [25, 25, 25, 15, 10]]}
+    POST /score   {"dataset": "<شناسه از پاسخ قبلی>", "weights": [40, 30, 15, 10, 5]}
+    GET  /health
+
+companies می‌تواند فهرست رکوردها یا نگاشت ستون -> فهرست مقادیر باشد و نام
+ستون‌ها مانند فایل‌های ورودی یکسان‌سازی می‌شود. پاسخ برای هر بردار وزن
+«امتیاز کل» و «رتبه» همه شرکت‌ها را به ترتیب ورودی برمی‌گرداند.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+
+import numpy as np
+import pandas as pd
+
+from cache import BoundedLRU, اثر_انگشت_داده
+from ingest import ID_COL, KPI_SCHEMA, تبدیل_انواع
+from scoring import DEFAULT_WEIGHTS, axis_cols, امتیاز_کل, ماتریس_محورها
+
+SERVICE_HOST = "127.0.0.1"
+SERVICE_PORT = 8765
+SERVICE_WORKERS = min(8, os.cpu_count() or 1)
+# سقف حافظه کش ماتریس محورها (مگابایت)
+AXIS_CACHE_MB = 256
+MAX_BODY_BYTES = 64 * 2**20
+MAX_WEIGHT_VECTORS = 1_000
+KEEPALIVE_TIMEOUT = 30
+
+
+class ServiceError(ValueError):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _json_list(values, dtype=np.float64):
+    # NaN در JSON معتبر نیست و null نوشته می‌شود
+    valid = ~np.isnan(values)
+    values = np.where(valid, values, 0).astype(dtype)
+    if valid.all():
+        return values.tolist()
+    return [v if ok else None for v, ok in zip(values.tolist(), valid.tolist())]
+
+
+def بردارهای_وزن(weights):
+    if weights is None:
+        weights = DEFAULT_WEIGHTS
+    try:
+        w = np.array(weights, dtype=np.float64)
+    except (TypeError, ValueError):
+        raise ServiceError(HTTPStatus.BAD_REQUEST, "weights must be numbers") from None
+    if w.ndim == 1:
+        w = w[None, :]
+    if w.ndim != 2 or w.shape[1] != len(axis_cols):
+        raise ServiceError(HTTPStatus.BAD_REQUEST, f"each weight vector needs {len(axis_cols)} numbers")
+    if not 0 < len(w) <= MAX_WEIGHT_VECTORS:
+        raise ServiceError(HTTPStatus.BAD_REQUEST, f"between 1 and {MAX_WEIGHT_VECTORS} weight vectors per request")
+    if not np.isfinite(w).all():
+        raise ServiceError(HTTPStatus.BAD_REQUEST, "weights must be finite")
+    return w
+
+
+class ScoringService:
+    # منطق سرویس بدون HTTP؛ handle بدنه درخواست را می‌گیرد و بدنه پاسخ را برمی‌گرداند (خطا: ServiceError)
+
+    def __init__(self, cache_mb=AXIS_CACHE_MB):
+        self.axes = BoundedLRU(cache_mb * 2**20)
+
+    def _dataset(self, companies):
+        try:
+            df = تبدیل_انواع(pd.DataFrame(companies))
+        except (TypeError, ValueError) as e:
+            raise ServiceError(HTTPStatus.BAD_REQUEST, f"companies: {e}") from None
+        missing = [col for col in [ID_COL, *KPI_SCHEMA] if col not in df.columns]
+        if missing:
+            raise ServiceError(HTTPStatus.BAD_REQUEST, "missing columns: " + ", ".join(missing))
+        df = df[[ID_COL, *KPI_SCHEMA]]
+
+        # نام‌ها و ماتریس محورها با اثر انگشت همین ستون‌ها کش می‌شوند
+        key = اثر_انگشت_داده(df)
+        entry = self.axes.get_or_compute(
+            key,
+            lambda: {"names": df[ID_COL].tolist(), "axes": ماتریس_محورها(df)},
+            lambda entry: entry["axes"].nbytes + 64 * len(entry["names"]),
+        )
+        return key, entry
+
+    def score(self, request):
+        if not isinstance(request, dict):
+            raise ServiceError(HTTPStatus.BAD_REQUEST, "request body must be a JSON object")
+        if "companies" in request:
+            key, entry = self._dataset(request["companies"])
+        elif "dataset" in request:
+            key = request["dataset"]
+            entry = self.axes.get(key) if isinstance(key, str) else None
+            if entry is None:
+                raise ServiceError(HTTPStatus.NOT_FOUND, "unknown or evicted dataset; send companies again")
+        else:
+            raise ServiceError(HTTPStatus.BAD_REQUEST, "request needs companies or dataset")
+
+        axes = entry["axes"]
+        weights = بردارهای_وزن(request.get("weights"))
+        totals = np.column_stack([امتیاز_کل(axes, *w) for w in weights])
+        # رتبه min نزولی مانند scoring.رتبه_بندی، همه بردارهای وزن با یک فراخوانی؛ امتیاز نامعتبر رتبه ندارد
+        ranks = pd.DataFrame(totals).rank(ascending=False, method="min").to_numpy()
+        results = [
+            {"weights": w.tolist(), "امتیاز کل": _json_list(totals[:, k]), "رتبه": _json_list(ranks[:, k], np.int64)}
+            for k, w in enumerate(weights)
+        ]
+
+        response = {"dataset": key, ID_COL: entry["names"], "results": results}
+        if request.get("include_axes"):
+            response["axes"] = {col: _json_list(axes[:, j]) for j, col in enumerate(axis_cols)}
+        return response
+
+    def handle(self, body):
+        try:
+            request = json.loads(body)
+        except ValueError as e:
+            raise ServiceError(HTTPStatus.BAD_REQUEST, f"invalid JSON: {e}") from None
+        return json.dumps(self.score(request), ensure_ascii=False).encode("utf-8")
+
+    def health(self):
+        return json.dumps({"status": "ok", "axis_cache": self.axes.stats()}).encode("utf-8")
+
+
+# -------------------------------------------------
+# لایه HTTP/1.1 روی asyncio (اتصال‌های keep-alive، بدنه با Content-Length)
+# -------------------------------------------------
+
+def _پاسخ(status, body, keep_alive):
+    status = HTTPStatus(status)
+    head = (
+        f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+        "Content-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    return head.encode("latin-1") + body
+
+
+def _بدنه_خطا(message):
+    return json.dumps({"error": message}, ensure_ascii=False).encode("utf-8")
+
+
+class ScoringServer:
+    def __init__(self, service=None, workers=SERVICE_WORKERS):
+        self.service = service or ScoringService()
+        self._pool = ThreadPoolExecutor(workers, thread_name_prefix="scoring")
+
+    async def _dispatch(self, method, path, body):
+        loop = asyncio.get_running_loop()
+        try:
+            if path == "/health" and method == "GET":
+                return HTTPStatus.OK, self.service.health()
+            if path == "/score" and method == "POST":
+                return HTTPStatus.OK, await loop.run_in_executor(self._pool, self.service.handle, body)
+            if path in ("/health", "/score"):
+                return HTTPStatus.METHOD_NOT_ALLOWED, _بدنه_خطا(f"{method} not allowed on {path}")
+            return HTTPStatus.NOT_FOUND, _بدنه_خطا(f"no such endpoint: {path}")
+        except ServiceError as e:
+            return e.status, _بدنه_خطا(str(e))
+        except Exception as e:
+            traceback.print_exc()
+            return HTTPStatus.INTERNAL_SERVER_ERROR, _بدنه_خطا(f"{type(e).__name__}: {e}")
+
+    async def _connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    line = await asyncio.wait_for(reader.readline(), KEEPALIVE_TIMEOUT)
+                except TimeoutError:
+                    break
+                if not line:
+                    break
+                parts = line.decode("latin-1").split()
+                headers = {}
+                while True:
+                    header = await reader.readline()
+                    if header in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = header.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                if len(parts) != 3:
+                    writer.write(_پاسخ(HTTPStatus.BAD_REQUEST, _بدنه_خطا("malformed request line"), False))
+                    break
+                method, path, version = parts
+                try:
+                    length = int(headers.get("content-length", 0))
+                except ValueError:
+                    length = -1
+                if not 0 <= length <= MAX_BODY_BYTES:
+                    writer.write(_پاسخ(HTTPStatus.REQUEST_ENTITY_TOO_LARGE if length > 0 else HTTPStatus.BAD_REQUEST,
+                                       _بدنه_خطا(f"body must be at most {MAX_BODY_BYTES} bytes"), False))
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                status, payload = await self._dispatch(method, path.split("?", 1)[0], body)
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                writer.write(_پاسخ(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host=SERVICE_HOST, port=SERVICE_PORT):
+        server = await asyncio.start_server(self._connection, host, port)
+        host, port = server.sockets[0].getsockname()[:2]
+        # خط اول خروجی آدرس واقعی است (برای --port 0 و بار‌سنج)
+        print(f"listening on http://{host}:{port}", flush=True)
+        async with server:
+            await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local HTTP/JSON scoring service")
+    parser.add_argument("--host", default=SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=SERVICE_PORT, help="0 picks a free port")
+    parser.add_argument("--workers", type=int, default=SERVICE_WORKERS, help="Scoring threads")
+    parser.add_argument("--cache-mb", type=float, default=AXIS_CACHE_MB, help="Axis-matrix cache budget; 0 disables it")
+    args = parser.parse_args(argv)
+
+    server = ScoringServer(ScoringService(args.cache_mb), args.workers)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# ماژول‌های داشبورد در ریشه مخزن هستند، نه در یک بسته
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,31 @@
+"""
+انباشتگر افزایشی همبستگی در برابر DataFrame.corr روی کل جدول.
+"""
+
+import numpy as np
+import pandas as pd
+
+from analytics import StreamingCorrelation
+
+
+def هش_سطرها(values):
+    return pd.util.hash_pandas_object(pd.DataFrame(values), index=False).to_numpy()
+
+
+def test_replace_tracks_duplicate_counts():
+    a, b, c, d = [1.0, 2.0], [2.0, 1.0], [3.0, 5.0], [4.0, 3.0]
+    old = np.array([a, a, b, c, d])
+    new = np.array([a, b, b, c, d])   # همان مجموعه هش‌ها، فقط تعداد تکرار عوض شده
+    acc = StreamingCorrelation(["x", "y"]).add(old)
+    acc.replace(هش_سطرها(old), old, هش_سطرها(new), new)
+    np.testing.assert_allclose(acc.corr().to_numpy(), pd.DataFrame(new).corr().to_numpy())
+
+
+def test_replace_matches_full_recompute():
+    rng = np.random.default_rng(3)
+    old = rng.integers(0, 4, size=(200, 3)).astype(np.float64)
+    old[rng.random(old.shape) < 0.1] = np.nan
+    new = np.vstack([old[rng.permutation(len(old))[:150]], old[:30], rng.normal(size=(40, 3))])
+    acc = StreamingCorrelation(["x", "y", "z"]).add(old)
+    acc.replace(هش_سطرها(old), old, هش_سطرها(new), new)
+    np.testing.assert_allclose(acc.corr().to_numpy(), pd.DataFrame(new).corr().to_numpy(), atol=1e-12)
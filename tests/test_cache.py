@@ -0,0 +1,85 @@
+"""
+کش LRU با سقف بایت: ترتیب بیرون‌رانی و محاسبه یک‌باره برای درخواست‌های هم‌زمان.
+"""
+
+import threading
+
+import pytest
+
+from cache import BoundedLRU
+
+
+def test_evicts_least_recently_used_within_budget():
+    cache = BoundedLRU(100)
+    cache.put("a", "A", 40)
+    cache.put("b", "B", 40)
+    assert cache.get("a") == "A"   # a تازه‌تر از b می‌شود
+    cache.put("c", "C", 40)
+    assert "b" not in cache
+    assert cache.get("a") == "A" and cache.get("c") == "C"
+    assert cache.nbytes == 80
+
+    cache.put("a", "A2", 70)       # جایگزینی همان کلید اندازه قبلی را کم می‌کند
+    assert "c" not in cache and cache.get("a") == "A2"
+    assert cache.nbytes == 70
+
+    cache.put("huge", "H", 101)    # بزرگ‌تر از سقف کش نمی‌شود و چیزی را بیرون نمی‌راند
+    assert "huge" not in cache and "a" in cache
+
+
+def test_get_or_compute_runs_once_for_concurrent_callers():
+    cache = BoundedLRU(1000)
+    calls = []
+    started, release = threading.Event(), threading.Event()
+
+    def compute():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "value"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(cache.get_or_compute("k", compute, len)))
+    leader.start()
+    started.wait(5)
+    followers = [
+        threading.Thread(target=lambda: results.append(cache.get_or_compute("k", compute, len)))
+        for _ in range(4)
+    ]
+    for thread in followers:
+        thread.start()
+    release.set()
+    for thread in [leader, *followers]:
+        thread.join(5)
+
+    assert results == ["value"] * 5
+    assert len(calls) == 1
+    assert cache.misses == 1 and cache.hits == 4
+    assert cache.get_or_compute("k", compute, len) == "value" and len(calls) == 1
+
+
+def test_failed_compute_is_retried_by_waiting_caller():
+    cache = BoundedLRU(1000)
+    started, release = threading.Event(), threading.Event()
+
+    def failing():
+        started.set()
+        release.wait(5)
+        raise RuntimeError("rerun")
+
+    def leader():
+        with pytest.raises(RuntimeError):
+            cache.get_or_compute("k", failing, len)
+
+    results = []
+    first = threading.Thread(target=leader)
+    first.start()
+    started.wait(5)
+    second = threading.Thread(target=lambda: results.append(cache.get_or_compute("k", lambda: "ok", len)))
+    second.start()
+    release.set()
+    first.join(5)
+    second.join(5)
+    assert results == ["ok"]
+    assert cache.get("k") == "ok"
+    assert not cache._flights
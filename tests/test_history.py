@@ -0,0 +1,23 @@
+"""
+ذخیره و خواندن تاریخچه دوره‌ای در SQLite.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from history import HistoryStore
+from ingest import ID_COL
+
+
+def test_duplicate_company_names_are_rejected(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.sqlite"))
+    df = pd.DataFrame({ID_COL: ["الف", "ب", "الف"], "امتیاز کل": [70.0, 60.0, 50.0]})
+    with pytest.raises(ValueError, match="الف"):
+        store.append(df, "1403-Q1")
+    assert store.periods() == []
+
+    assert store.append(df.iloc[:2], "1403-Q1") == 2
+    history = store.company_history("الف", ["امتیاز کل"])
+    np.testing.assert_array_equal(history["امتیاز کل"], [70.0])
+    store.close()
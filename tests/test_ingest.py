@@ -0,0 +1,35 @@
+"""
+فشرده‌سازی ستون‌های KPI و بازگشت دقیق مقادیر float32 برای نمایش، و نمایه نام شرکت‌ها.
+"""
+
+import numpy as np
+import pandas as pd
+
+from ingest import ID_COL, CompanyIndex, فشرده_سازی, گسترش_فشرده
+
+
+def test_widened_float32_kpi_formats_exactly():
+    df = فشرده_سازی(pd.DataFrame({
+        ID_COL: ["کارگزاری الف", "کارگزاری ب"],
+        "Debt/Equity": [1.25, 0.6],
+        "Cost/Income": [61.2, 45.3],
+    }))
+    assert df["Debt/Equity"].dtype == np.float32
+    assert df["Cost/Income"].dtype == np.float32
+
+    # همان مسیر ستون جزئیات و خلاصه داشبورد: سطر انتخابی قبل از قالب‌بندی گسترش می‌یابد
+    row = گسترش_فشرده(df.iloc[[1]]).iloc[0]
+    assert f"{row['Debt/Equity']}" == "0.6"
+    assert f"{round(row['Cost/Income'], 1)}%" == "45.3%"
+
+    detail = گسترش_فشرده(df.iloc[[1]]).T
+    assert [f"{v}" for v in detail.iloc[1:, 0]] == ["0.6", "45.3"]
+
+
+def test_duplicate_labels_do_not_collide_with_real_names():
+    names = ["X", "X", "X (سطر 2)", "Y"]
+    index = CompanyIndex(names)
+    assert len(set(index.labels)) == len(names)
+    assert [index.position(label) for label in index.labels] == list(range(len(names)))
+    assert index.labels[2] == "X (سطر 2)"
+    assert index.labels[1] != "X (سطر 2)"
@@ -0,0 +1,112 @@
+"""
+مکعب تجمیع سلسله‌مراتبی در برابر محاسبه مستقیم با groupby روی برگ‌های هر گره.
+"""
+
+import numpy as np
+import pandas as pd
+
+from analytics import RollupCube
+
+COLUMNS = ["a", "b", "c", "d", "e"]
+
+
+def درخت_تصادفی(rng):
+    # هلدینگ ← زیرهلدینگ ← شرکت ← صندوق، با ترتیب سطرهای به هم ریخته
+    subs = [f"S{i}" for i in range(4)]
+    companies = [f"C{i}" for i in range(20)]
+    funds = [f"F{i}" for i in range(200)]
+    names = ["H", *subs, *companies, *funds]
+    parents = [None, *["H"] * 4, *[subs[i % 4] for i in range(20)], *[companies[i % 20] for i in range(200)]]
+    order = rng.permutation(len(names))
+    return np.array(names, dtype=object)[order], np.array(parents, dtype=object)[order]
+
+
+def جدول_مرجع(names, parents, values, weights, axis_weights):
+    # جمع هر برگ معتبر در همه اجدادش؛ سطر میانی (گره‌ای که فرزند دارد) سهمی ندارد
+    parent_of = dict(zip(names, parents))
+    leaves = set(names) - {p for p in parents if p is not None}
+    pairs = []
+    for i, name in enumerate(names):
+        if name not in leaves or np.isnan(values[i]).any():
+            continue
+        node = name
+        while node is not None:
+            pairs.append((node, i))
+            node = parent_of[node]
+    pairs = pd.DataFrame(pairs, columns=["گره", "سطر"])
+    leaf = pd.DataFrame(values[pairs["سطر"]], columns=COLUMNS)
+    w = np.nan_to_num(weights[pairs["سطر"]])
+    grouped = leaf.groupby(pairs["گره"])
+    means = grouped.mean()
+    weighted = leaf.mul(w, axis=0).groupby(pairs["گره"]).sum().div(pd.Series(w).groupby(pairs["گره"]).sum(), axis=0)
+    axis_w = np.asarray(axis_weights) / 100
+
+    reference = pd.DataFrame(index=pd.Index(names, name="گره"))
+    reference["والد"] = parents
+    reference[COLUMNS] = means.reindex(reference.index)
+    reference["تعداد زیرمجموعه"] = grouped.size().reindex(reference.index).fillna(0).astype(np.int64)
+    reference["امتیاز کل"] = reference[COLUMNS].to_numpy() @ axis_w
+    reference["امتیاز کل وزنی"] = weighted.reindex(reference.index).to_numpy() @ axis_w
+    return reference
+
+
+def رتبه_مرجع(table):
+    # رتبه از نو با groupby روی همه گره‌ها؛ روی امتیازهای خود مکعب تا برابری‌هایی که فقط با
+    # ترتیب جمع ممیز شناور شکسته می‌شوند در دو طرف یکی باشند
+    return (
+        table.groupby(table["والد"].fillna(""), sort=False)["امتیاز کل وزنی"]
+        .rank(ascending=False, method="min").astype("Int64")
+    )
+
+
+def بررسی(cube, names, parents, values, weights, axis_weights):
+    table = cube.table(COLUMNS).set_index("گره").loc[list(names)]
+    reference = جدول_مرجع(names, parents, values, weights, axis_weights)
+    for col in [*COLUMNS, "امتیاز کل", "امتیاز کل وزنی"]:
+        np.testing.assert_allclose(table[col], reference[col], rtol=1e-9, atol=1e-9, err_msg=col)
+    np.testing.assert_array_equal(table["تعداد زیرمجموعه"], reference["تعداد زیرمجموعه"])
+    assert table["رتبه در والد"].equals(رتبه_مرجع(table))
+
+
+def test_cube_matches_groupby_after_updates_and_reweights():
+    rng = np.random.default_rng(0)
+    names, parents = درخت_تصادفی(rng)
+    n = len(names)
+    # مقادیر صحیح تا امتیازهای برابر و رتبه‌های مشترک هم پیش بیایند
+    values = rng.integers(40, 60, size=(n, 5)).astype(np.float64)
+    values[rng.random(n) < 0.05, 2] = np.nan
+    weights = rng.integers(1, 5, size=n).astype(np.float64)
+    weights[rng.random(n) < 0.05] = np.nan
+    axis_weights = (40, 30, 15, 10, 5)
+
+    cube = RollupCube(names, parents, values, weights, axis_weights=axis_weights)
+    بررسی(cube, names, parents, values, weights, axis_weights)
+
+    for trial in range(15):
+        rows = rng.choice(n, rng.integers(1, 30), replace=False)
+        new_values = rng.integers(40, 60, size=(len(rows), 5)).astype(np.float64)
+        if trial % 3 == 0:
+            new_values[0, 0] = np.nan
+        new_weights = rng.integers(1, 5, size=len(rows)).astype(np.float64)
+        cube.update(rows, new_values, new_weights)
+        values[rows], weights[rows] = new_values, new_weights
+        بررسی(cube, names, parents, values, weights, axis_weights)
+
+        if trial % 5 == 4:
+            axis_weights = tuple(rng.permutation([40, 30, 15, 10, 5]))
+            cube.set_axis_weights(axis_weights)
+            بررسی(cube, names, parents, values, weights, axis_weights)
+
+
+def test_children_table_matches_full_table():
+    rng = np.random.default_rng(1)
+    names, parents = درخت_تصادفی(rng)
+    values = rng.integers(40, 60, size=(len(names), 5)).astype(np.float64)
+    cube = RollupCube(names, parents, values, axis_weights=(20, 20, 20, 20, 20))
+    full = cube.table(COLUMNS).set_index("گره")
+    for node in [None, "H", "S1", "C3"]:
+        children = cube.children_table(COLUMNS, node).set_index("گره")
+        assert list(children.index) == cube.children(node)
+        pd.testing.assert_frame_equal(
+            children.fillna({"والد": ""}), full.loc[children.index].fillna({"والد": ""}), check_dtype=False
+        )
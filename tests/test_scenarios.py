@@ -0,0 +1,43 @@
+"""
+تحلیل حساسیت وزن در برابر رتبه‌بندی مستقیم همه سناریوها.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import scenarios
+from scenarios import تحلیل_حساسیت_وزن, شبکه_وزن
+
+
+def خلاصه_مستقیم(axes, weights, top_k):
+    # همه رتبه‌ها یکجا: رتبه min نزولی هر سناریو، میانه پایینی و سهم حضور در k برتر
+    valid = ~np.isnan(axes).any(axis=1)
+    totals = pd.DataFrame(weights / 100 @ axes[valid].T)
+    ranks = totals.rank(axis=1, ascending=False, method="min").to_numpy(dtype=np.int64)
+    median = np.sort(ranks, axis=0)[(len(weights) + 1) // 2 - 1]
+    return valid, {
+        "بهترین رتبه": ranks.min(axis=0),
+        "بدترین رتبه": ranks.max(axis=0),
+        "میانه رتبه": median,
+        "احتمال حضور در k برتر": (ranks <= top_k).mean(axis=0),
+    }
+
+
+@pytest.mark.parametrize("hist_mb, cache_mb, max_cells", [(64, 256, 2**23), (0, 0, 500), (0, 256, 2**23)])
+def test_sweep_matches_brute_force(monkeypatch, hist_mb, cache_mb, max_cells):
+    # بودجه صفر: هر بلوک یک شرکت و رتبه‌ها برای هر گذر دوباره ساخته می‌شوند
+    monkeypatch.setattr(scenarios, "HIST_BUDGET_MB", hist_mb)
+    monkeypatch.setattr(scenarios, "RANK_CACHE_BUDGET_MB", cache_mb)
+    rng = np.random.default_rng(7)
+    # محورهای صحیح با وزن‌های مضرب 25 امتیازهای دقیق می‌دهند؛ سطرهای تکراری رتبه مشترک می‌گیرند
+    axes = rng.integers(0, 6, size=(120, 5)).astype(np.float64)
+    axes[60:90] = axes[:30]
+    axes[rng.random(len(axes)) < 0.1, 3] = np.nan
+    weights = np.vstack([شبکه_وزن(25), rng.integers(0, 5, size=(31, 5)) * 25])
+
+    result = تحلیل_حساسیت_وزن(axes, weights, top_k=5, max_cells=max_cells, bins=8)
+    valid, expected = خلاصه_مستقیم(axes, weights, 5)
+    assert result["میانه رتبه"].isna().to_numpy().tolist() == (~valid).tolist()
+    for col, values in expected.items():
+        np.testing.assert_array_equal(result[col].to_numpy(dtype=np.float64)[valid], values, err_msg=col)
@@ -0,0 +1,83 @@
+"""
+برابری موتور ستونی ماتریس_محورها با توابع سطری محور_* روی سطرهای تصادفی.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ingest import ID_COL, KPI_SCHEMA, فشرده_سازی
+from scoring import (
+    DEFAULT_WEIGHTS,
+    axis_cols,
+    جدول_امتیاز,
+    رتبه_بندی,
+    ماتریس_محورها,
+    محور_بهره_وری,
+    محور_رشد_پایدار,
+    محور_ریسک_و_حاکمیت,
+    محور_مالی,
+    محور_هم_افزایی,
+)
+
+ROW_AXES = [محور_مالی, محور_بهره_وری, محور_رشد_پایدار, محور_ریسک_و_حاکمیت, محور_هم_افزایی]
+
+
+def سطرهای_تصادفی(n, seed, nan_fraction=0.0):
+    # مقادیر دو رقم اعشار در محدوده هر KPI؛ Debt/Equity تا 5 تا سقف 2 در سلامت اهرم هم پوشش داده شود
+    rng = np.random.default_rng(seed)
+    data = {ID_COL: [f"شرکت {i}" for i in range(n)]}
+    for col, (_, lo, hi) in KPI_SCHEMA.items():
+        lo = -50.0 if lo is None else lo
+        hi = 5.0 if col == "Debt/Equity" else (500.0 if hi is None else hi)
+        values = rng.uniform(lo, hi, n).round(2)
+        values[rng.random(n) < nan_fraction] = np.nan
+        data[col] = values
+    return pd.DataFrame(data)
+
+
+def محورهای_سطری(df):
+    return np.column_stack([df.apply(axis, axis=1).to_numpy(dtype=np.float64) for axis in ROW_AXES])
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_matrix_matches_row_functions(seed):
+    df = سطرهای_تصادفی(500, seed)
+    np.testing.assert_array_equal(ماتریس_محورها(df), محورهای_سطری(df))
+
+
+def test_debt_equity_clamp():
+    df = سطرهای_تصادفی(4, 0)
+    for col in ["Compliance", "کنترل داخلی", "شفافیت گزارش"]:
+        df[col] = df.loc[0, col]
+    df["Debt/Equity"] = [0.0, 1.0, 2.0, 4.5]
+    axes = ماتریس_محورها(df)
+    np.testing.assert_array_equal(axes, محورهای_سطری(df))
+    # سلامت اهرم: 100 در D/E صفر، 50 در 1 و از 2 به بالا صفر
+    risk = axes[:, axis_cols.index("امتیاز ریسک و حاکمیت")]
+    np.testing.assert_allclose(risk[:3] - risk[2], [25.0, 12.5, 0.0])
+    assert risk[3] == risk[2]
+
+
+def test_nan_inputs_propagate():
+    df = سطرهای_تصادفی(300, 3, nan_fraction=0.05)
+    axes = ماتریس_محورها(df)
+    np.testing.assert_array_equal(axes, محورهای_سطری(df))
+    assert np.isnan(axes).any()
+
+
+def test_compact_dtypes_give_identical_axes():
+    df = سطرهای_تصادفی(500, 4, nan_fraction=0.02)
+    df["پروژه‌های مشترک"] = df["پروژه‌های مشترک"].round()
+    compact = فشرده_سازی(df)
+    assert (compact.dtypes != df.dtypes).any()
+    np.testing.assert_array_equal(ماتریس_محورها(compact), ماتریس_محورها(df))
+
+
+def test_invalid_rows_are_unranked():
+    df = سطرهای_تصادفی(6, 5)
+    df.loc[2, "ROE"] = np.nan
+    scored = جدول_امتیاز(df, ماتریس_محورها(df), *DEFAULT_WEIGHTS)
+    assert scored["رتبه"].isna().tolist() == [False, False, True, False, False, False]
+    valid = scored["رتبه"].dropna()
+    assert sorted(valid) == sorted(رتبه_بندی(scored["امتیاز کل"].dropna()))